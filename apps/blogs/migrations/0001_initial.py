@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:28
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogPost',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255, unique=True)),
+                ('content', models.TextField()),
+                ('excerpt', models.TextField(blank=True, help_text='Brief summary of the blog post', max_length=500)),
+                ('author_user_id', models.CharField(help_text='User ID from identity microservice', max_length=255)),
+                ('author_name', models.CharField(blank=True, help_text='Author display name (first_name + last_name)', max_length=255, null=True)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('archived', 'Archived')], default='draft', max_length=20)),
+                ('featured_image', models.ImageField(blank=True, null=True, upload_to='blog_images/')),
+                ('image_1', models.ImageField(blank=True, null=True, upload_to='blog_images/')),
+                ('image_2', models.ImageField(blank=True, null=True, upload_to='blog_images/')),
+                ('image_3', models.ImageField(blank=True, null=True, upload_to='blog_images/')),
+                ('tags', models.CharField(blank=True, help_text='Comma-separated tags', max_length=255)),
+                ('meta_title', models.CharField(blank=True, help_text='SEO title', max_length=255)),
+                ('meta_description', models.TextField(blank=True, help_text='SEO description', max_length=160)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['id'], name='blogs_blogp_id_292429_idx'), models.Index(fields=['status', 'published_at'], name='blogs_blogp_status_ca12a6_idx'), models.Index(fields=['author_user_id'], name='blogs_blogp_author__72548d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('user_user_id', models.CharField(help_text='User ID from identity microservice', max_length=255)),
+                ('user_name', models.CharField(blank=True, help_text='User display name (first_name + last_name)', max_length=255, null=True)),
+                ('content', models.TextField()),
+                ('is_approved', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('blog_post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='blogs.blogpost')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='blogs.comment')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['id'], name='blogs_comme_id_5888ac_idx'), models.Index(fields=['blog_post', 'is_approved'], name='blogs_comme_blog_po_992509_idx'), models.Index(fields=['user_user_id'], name='blogs_comme_user_us_4ecdee_idx')],
+            },
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.urls import path
 from django.http import HttpResponse
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import EmailConfiguration, EmailLog
+from .models import EmailConfiguration, EmailLog, EmailTemplate
 
 
 @admin.register(EmailConfiguration)
@@ -247,4 +247,17 @@ class EmailLogAdmin(admin.ModelAdmin):
         """Mark selected emails as pending"""
         updated = queryset.update(status='pending')
         self.message_user(request, f'{updated} email(s) marked as pending.')
-    mark_as_pending.short_description = "Mark selected emails as pending"
\ No newline at end of file
+    mark_as_pending.short_description = "Mark selected emails as pending"
+
+@admin.register(EmailTemplate)
+class EmailTemplateAdmin(admin.ModelAdmin):
+    list_display = ('email_type', 'version', 'is_active', 'created_at')
+    list_filter = ('email_type', 'is_active')
+    search_fields = ('email_type',)
+    ordering = ('email_type', '-version')
+
+    def get_readonly_fields(self, request, obj=None):
+        """Workers compile each version once, so a saved version's content is frozen; add a new version instead"""
+        if obj is not None:
+            return ('email_type', 'version', 'html', 'text', 'created_at', 'updated_at')
+        return ('version', 'created_at', 'updated_at')
@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EmailServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.email_service'
     verbose_name = 'Email Service'
+
+    def ready(self):
+        from .search import install_search_backend  # Full-text index lives outside the ORM schema
+        post_migrate.connect(install_search_backend, sender=self)
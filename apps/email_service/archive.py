@@ -0,0 +1,194 @@
+# apps/email_service/archive.py
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import closing
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailLog
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    'DIRECTORY': os.path.join(settings.BASE_DIR, 'archive', 'email_logs'),
+    'RETENTION_DAYS': 90,
+    'CHUNK_SIZE': 1000,
+}
+
+ARCHIVED_FIELDS = [
+    'id', 'email', 'email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text',
+    'status', 'created_at', 'sent_at', 'error', 'attempts', 'error_class',
+]
+
+
+def get_archive_settings():
+    archive_settings = dict(DEFAULT_ARCHIVE_SETTINGS)
+    archive_settings.update(getattr(settings, 'EMAIL_ARCHIVE', {}))
+    return archive_settings
+
+
+class EmailLogArchive:
+    """
+    Cold storage for EmailLog rows past retention.
+
+    Rows are appended to one gzip NDJSON file per UTC day
+    (`YYYY/MM/email_logs-YYYY-MM-DD.ndjson.gz`), one gzip member per archived
+    chunk. `index.sqlite3` next to the files maps each id and recipient to the
+    file and byte offset of its member, so a lookup decompresses a single chunk
+    instead of the whole day.
+    """
+
+    def __init__(self, directory=None):
+        self._directory = directory
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return self._directory or get_archive_settings()['DIRECTORY']
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, 'index.sqlite3')
+
+    def _connect(self):
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(self.index_path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS archived_logs ("
+            " id INTEGER PRIMARY KEY, email TEXT NOT NULL, created_at TEXT NOT NULL,"
+            " path TEXT NOT NULL, member_offset INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS archived_logs_email ON archived_logs (email, created_at)")
+        return conn
+
+    def day_path(self, day):
+        return os.path.join(f'{day:%Y}', f'{day:%m}', f'email_logs-{day:%Y-%m-%d}.ndjson.gz')
+
+    def write(self, rows):
+        """
+        Append serialized rows (dicts of ARCHIVED_FIELDS) to their day files and index them.
+
+        Each file gets one new gzip member that is fsync'ed before the index is
+        committed, so an indexed row is always readable from disk.
+        """
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row['created_at'].astimezone(dt_timezone.utc).date(), []).append(row)
+
+        with self._lock, closing(self._connect()) as conn:
+            for day, day_rows in sorted(by_day.items()):
+                relative_path = self.day_path(day)
+                full_path = os.path.join(self.directory, relative_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+                payload = ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in day_rows)
+                with open(full_path, 'ab') as fh:
+                    offset = fh.tell()
+                    fh.write(gzip.compress(payload.encode('utf-8')))
+                    fh.flush()
+                    os.fsync(fh.fileno())
+
+                # INSERT OR REPLACE: a chunk re-archived after an interrupted run points at its newest copy
+                conn.executemany(
+                    "INSERT OR REPLACE INTO archived_logs (id, email, created_at, path, member_offset)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [(row['id'], row['email'].lower(), row['created_at'].isoformat(), relative_path, offset)
+                     for row in day_rows],
+                )
+            conn.commit()
+
+    def _read_member(self, relative_path, offset):
+        with open(os.path.join(self.directory, relative_path), 'rb') as fh:
+            fh.seek(offset)
+            # A gzip-mode decompressor stops at the end of this member
+            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            blocks = []
+            while not decompressor.eof:
+                block = fh.read(64 * 1024)
+                if not block:
+                    break
+                blocks.append(decompressor.decompress(block))
+        data = b''.join(blocks)
+        return [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+
+    def get(self, email_log_id):
+        """Return the archived log as a dict, or None."""
+        if not os.path.exists(self.index_path):
+            return None
+        with closing(self._connect()) as conn:
+            location = conn.execute(
+                "SELECT path, member_offset FROM archived_logs WHERE id = ?", (email_log_id,)
+            ).fetchone()
+        if location is None:
+            return None
+        return next((row for row in self._read_member(*location) if row['id'] == email_log_id), None)
+
+    def find_by_email(self, email, limit=50):
+        """Return up to `limit` archived logs for a recipient, newest first."""
+        if not os.path.exists(self.index_path):
+            return []
+        with closing(self._connect()) as conn:
+            locations = conn.execute(
+                "SELECT id, path, member_offset FROM archived_logs WHERE email = ?"
+                " ORDER BY created_at DESC, id DESC LIMIT ?",
+                (email.strip().lower(), limit),
+            ).fetchall()
+
+        members = {}
+        for email_log_id, relative_path, offset in locations:
+            members.setdefault((relative_path, offset), set()).add(email_log_id)
+
+        found = {}
+        for (relative_path, offset), ids in members.items():
+            for row in self._read_member(relative_path, offset):
+                if row['id'] in ids:
+                    found[row['id']] = row
+        return [found[email_log_id] for email_log_id, _, _ in locations if email_log_id in found]
+
+
+email_log_archive = EmailLogArchive()
+
+
+def archive_email_logs(older_than_days=None, chunk_size=None, archive=None, max_chunks=None, dry_run=False):
+    """
+    Move EmailLog rows created more than `older_than_days` ago to the archive.
+
+    Rows are handled `chunk_size` at a time in (created_at, id) order: the
+    chunk is written and indexed first, then deleted by primary key, so each
+    DELETE touches a bounded set of rows and never holds long locks on the hot
+    table. The hourly stats rollups are left as they are.
+
+    Returns a dict with the archived/deleted/chunks counts.
+    """
+    archive_settings = get_archive_settings()
+    older_than_days = archive_settings['RETENTION_DAYS'] if older_than_days is None else older_than_days
+    chunk_size = chunk_size or archive_settings['CHUNK_SIZE']
+    archive = archive or email_log_archive
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    counts = {'archived': 0, 'deleted': 0, 'chunks': 0}
+    queryset = EmailLog.objects.filter(created_at__lt=cutoff).order_by('created_at', 'id')
+
+    if dry_run:
+        counts['archived'] = queryset.count()
+        return counts
+
+    while max_chunks is None or counts['chunks'] < max_chunks:
+        rows = list(queryset.values(*ARCHIVED_FIELDS)[:chunk_size])
+        if not rows:
+            break
+
+        archive.write(rows)
+        counts['archived'] += len(rows)
+        with transaction.atomic():
+            _, deleted = EmailLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        counts['deleted'] += deleted.get(EmailLog._meta.label, 0)
+        counts['chunks'] += 1
+
+    return counts
@@ -0,0 +1,246 @@
+# apps/email_service/benchmark.py
+import math
+import platform
+import threading
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import smtp_pool
+from .models import EmailLog
+from .rollups import hour_bucket, rebuild_rollups, record_created
+from .tasks import send_bulk_email_chunk, send_direct_email, send_generic_email_task
+
+BENCHMARK_PATHS = ('single', 'bulk', 'direct')
+
+
+class QueryCounter:
+    """connection.execute_wrapper counting statements across threads."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(q / 100.0 * len(sorted_values)) - 1, 0)]
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+
+    def rounded(value):
+        return round(value, 6) if value is not None else None
+
+    return {
+        'unit': 'seconds',
+        'mean': rounded(sum(values) / len(values)) if values else None,
+        'p50': rounded(percentile(values, 50)),
+        'p95': rounded(percentile(values, 95)),
+        'p99': rounded(percentile(values, 99)),
+        'max': rounded(values[-1] if values else None),
+    }
+
+
+class EmailPipelineBenchmark:
+    """
+    Drive the send paths against a LocalSMTPSink and measure them.
+
+    single: send_generic_email_task run eagerly (log creation, status updates, send)
+    direct: send_direct_email, the fallback used when no broker is reachable
+    bulk:   EmailLog bulk insert plus send_bulk_email_chunk, one operation per chunk
+
+    Every EmailLog written is tagged with `email_type` and removed afterwards
+    (with the touched rollup hours rebuilt) unless `keep_logs` is set.
+    """
+
+    def __init__(self, sink, concurrency=1, bulk_chunk_size=None, email_type='benchmark', keep_logs=False):
+        self.sink = sink
+        self.concurrency = max(int(concurrency), 1)
+        self.bulk_chunk_size = bulk_chunk_size or getattr(settings, 'EMAIL_BULK_CHUNK_SIZE', 100)
+        self.email_type = email_type
+        self.keep_logs = keep_logs
+        self._sequence = 0
+        self._sequence_lock = threading.Lock()
+
+    def _recipient(self):
+        with self._sequence_lock:
+            self._sequence += 1
+            return f'bench{self._sequence}@example.com'
+
+    def _fields(self):
+        return {
+            'email_type': self.email_type,
+            'subject': 'Benchmark',
+            'action': 'benchmark',
+            'message': 'Email pipeline benchmark message',
+        }
+
+    # One operation per path; each returns (emails attempted, error per failed email)
+
+    def _send_single(self, size):
+        result = send_generic_email_task.apply(
+            kwargs=dict(self._fields(), user_email=self._recipient()),
+            headers={'enqueued_at': time.time()},
+        ).result
+        if isinstance(result, dict) and result.get('status') == 'success':
+            return 1, []
+        return 1, [result.get('error') if isinstance(result, dict) else repr(result)]
+
+    def _send_direct(self, size):
+        result = send_direct_email(self._recipient(), **self._fields())
+        return 1, [] if result['status'] == 'success' else [result.get('error')]
+
+    def _send_bulk(self, size):
+        fields = self._fields()
+        email_logs = EmailLog.objects.bulk_create([
+            EmailLog(email=self._recipient(), status='queued', **fields) for _ in range(size)
+        ])
+        record_created(email_logs)
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in email_logs]
+        fields.pop('email_type')
+        result = send_bulk_email_chunk(recipients, email_type=self.email_type, **fields)
+        return size, list(result['errors'].values())
+
+    def _operations(self, path, count):
+        if path == 'bulk':
+            chunks = [self.bulk_chunk_size] * (count // self.bulk_chunk_size)
+            if count % self.bulk_chunk_size:
+                chunks.append(count % self.bulk_chunk_size)
+            return self._send_bulk, chunks
+        return {'single': self._send_single, 'direct': self._send_direct}[path], [1] * count
+
+    def _drive(self, operation, sizes, concurrency):
+        """Run the operations on `concurrency` threads; returns (latencies, totals, errors, queries, seconds)."""
+        counter = QueryCounter()
+        latencies = []
+        totals = {'emails': 0, 'failed': 0}
+        errors = {}
+        lock = threading.Lock()
+        pending = iter(sizes)
+
+        def worker(close_connection):
+            try:
+                with connection.execute_wrapper(counter):
+                    while True:
+                        with lock:
+                            size = next(pending, None)
+                        if size is None:
+                            return
+                        started = time.perf_counter()
+                        try:
+                            emails, failures = operation(size)
+                        except Exception as e:
+                            # e.g. SQLite lock timeouts under concurrency; counted, not fatal to the run
+                            emails, failures = size, [f'{type(e).__name__}: {e}'] * size
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            latencies.append(elapsed)
+                            totals['emails'] += emails
+                            totals['failed'] += len(failures)
+                            for error in failures:
+                                error = str(error)[:200]
+                                errors[error] = errors.get(error, 0) + 1
+            finally:
+                if close_connection:
+                    connection.close()
+
+        started = time.perf_counter()
+        if concurrency == 1:
+            worker(close_connection=False)
+        else:
+            threads = [threading.Thread(target=worker, args=(True,)) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return latencies, totals, errors, counter.count, time.perf_counter() - started
+
+    def _allocations(self, operation, sizes):
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            emails = sum(operation(size)[0] for size in sizes)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'sample_emails': emails,
+            'peak_bytes': peak - before,
+            'retained_bytes_per_email': round((after - before) / emails, 1) if emails else None,
+        }
+
+    def run_path(self, path, count, allocation_sample=0):
+        operation, sizes = self._operations(path, count)
+        latencies, totals, errors, queries, seconds = self._drive(operation, sizes, self.concurrency)
+        emails = totals['emails']
+        result = {
+            'path': path,
+            'emails': emails,
+            'failed': totals['failed'],
+            'errors': errors,
+            'operations': len(sizes),
+            'concurrency': self.concurrency,
+            'seconds': round(seconds, 6),
+            'emails_per_second': round(emails / seconds, 2) if seconds else None,
+            'latency_per_operation': latency_summary(latencies),
+            'queries_per_email': round(queries / emails, 3) if emails else None,
+        }
+        if path == 'bulk':
+            result['chunk_size'] = self.bulk_chunk_size
+        if allocation_sample:
+            _, sample_sizes = self._operations(path, allocation_sample)
+            result['allocations'] = self._allocations(operation, sample_sizes)
+        return result
+
+    def cleanup(self, since):
+        if self.keep_logs:
+            return 0
+        deleted = EmailLog.objects.filter(email_type=self.email_type, created_at__gte=since).delete()[0]
+        rebuild_rollups(since=hour_bucket(since))
+        return deleted
+
+    def run(self, paths=BENCHMARK_PATHS, count=100, allocation_sample=0):
+        """Benchmark each path in turn and return a JSON-serialisable report."""
+        started_at = timezone.now()
+        results = []
+        smtp_pool.reset_smtp_pool()
+        try:
+            # Every pooled connection goes to the sink, whatever server EmailConfiguration names
+            pool_settings = dict(smtp_pool.get_pool_settings(), SERVER=(self.sink.host, self.sink.port))
+            with override_settings(DEFAULT_FROM_EMAIL='benchmark@example.com', EMAIL_SMTP_POOL=pool_settings):
+                for path in paths:
+                    results.append(self.run_path(path, count, allocation_sample))
+                pool_stats = smtp_pool.get_smtp_pool().stats()
+        finally:
+            smtp_pool.reset_smtp_pool()
+            deleted = self.cleanup(started_at)
+
+        return {
+            'started_at': started_at.isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'status_write_behind': getattr(settings, 'EMAIL_STATUS_BUFFER', {}).get('WRITE_BEHIND', False),
+            },
+            'smtp_sink': {'messages': self.sink.messages_received, 'bytes': self.sink.bytes_received,
+                          'latency': self.sink.latency},
+            'smtp_pool': pool_stats,
+            'results': results,
+            'logs_deleted': deleted,
+        }
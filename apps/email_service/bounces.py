@@ -0,0 +1,135 @@
+# apps/email_service/bounces.py
+import logging
+import mailbox
+import os
+from email import policy
+from email.parser import BytesParser
+from email.utils import getaddresses
+
+from .models import EmailSuppression
+from .suppression import get_suppression_settings, normalize_email, suppress
+
+logger = logging.getLogger(__name__)
+
+FORMAT_AUTO = 'auto'
+FORMAT_MBOX = 'mbox'
+FORMAT_MAILDIR = 'maildir'
+FORMATS = (FORMAT_AUTO, FORMAT_MBOX, FORMAT_MAILDIR)
+
+_parser = BytesParser(policy=policy.default)
+
+
+def open_mailbox(path, fmt=FORMAT_AUTO):
+    """A read-only mailbox over a maildir directory or an mbox file."""
+    if fmt == FORMAT_AUTO:
+        fmt = FORMAT_MAILDIR if os.path.isdir(path) else FORMAT_MBOX
+    if fmt == FORMAT_MAILDIR:
+        if not os.path.isdir(os.path.join(path, 'cur')) and not os.path.isdir(os.path.join(path, 'new')):
+            raise FileNotFoundError(f"Not a maildir: {path}")
+        return mailbox.Maildir(path, factory=None, create=False)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No such mbox file: {path}")
+    return mailbox.mbox(path, factory=None, create=False)
+
+
+def iter_messages(path, fmt=FORMAT_AUTO):
+    """Parse the messages of a mailbox one at a time; only the current message is held in memory."""
+    box = open_mailbox(path, fmt)
+    try:
+        for key in box.iterkeys():
+            try:
+                yield _parser.parsebytes(box.get_bytes(key))
+            except Exception:
+                logger.warning("Skipping unreadable message %s in %s", key, path, exc_info=True)
+    finally:
+        box.close()
+
+
+def _address(field):
+    """The address of a DSN recipient field such as `rfc822; user@example.com`."""
+    value = str(field or '')
+    if ';' in value:
+        value = value.split(';', 1)[1]
+    return normalize_email(value.strip('<> \t'))
+
+
+def bounced_recipients(message):
+    """
+    (address, reason) pairs reported by a bounce or complaint message.
+
+    Understands RFC 3464 delivery status notifications (only `Action: failed`
+    with a 5.x.x status counts as a hard bounce; delays and 4.x.x are
+    ignored), RFC 5965 feedback reports, and the X-Failed-Recipients header
+    some MTAs send instead of a DSN.
+    """
+    found = []
+    for part in message.walk():
+        content_type = part.get_content_type()
+        if content_type == 'message/delivery-status':
+            for block in part.get_payload():
+                recipient = block.get('Final-Recipient') or block.get('Original-Recipient')
+                action = str(block.get('Action', '')).strip().lower()
+                status = str(block.get('Status', '')).strip()
+                if recipient and action == 'failed' and status.startswith('5'):
+                    found.append((_address(recipient), EmailSuppression.REASON_HARD_BOUNCE))
+        elif content_type == 'message/feedback-report':
+            report = part.get_payload()[0] if part.is_multipart() else _parser.parsebytes(part.get_content())
+            recipients = report.get_all('Original-Rcpt-To') or []
+            if not recipients:
+                # Fall back to the To of the complained-about message
+                for enclosed in message.walk():
+                    if enclosed.get_content_type() in ('message/rfc822', 'text/rfc822-headers'):
+                        original = enclosed.get_payload()[0] if enclosed.is_multipart() else enclosed
+                        recipients = [address for _, address in getaddresses(original.get_all('To') or [])]
+                        break
+            found.extend((_address(recipient), EmailSuppression.REASON_COMPLAINT) for recipient in recipients)
+
+    if not found:
+        failed = message.get_all('X-Failed-Recipients') or []
+        found = [(normalize_email(address), EmailSuppression.REASON_HARD_BOUNCE)
+                 for _, address in getaddresses([str(value) for value in failed])]
+    return [(address, reason) for address, reason in found if '@' in address]
+
+
+def import_bounce_reports(path, fmt=FORMAT_AUTO, scope=EmailSuppression.SCOPE_ALL, batch_size=None, dry_run=False):
+    """
+    Stream a mailbox of bounce and complaint reports into EmailSuppression.
+
+    Addresses are written in batches of `batch_size`; a complaint wins over a
+    bounce for the same address within a batch. Returns counts of messages
+    read, messages that yielded addresses, and distinct addresses suppressed.
+    """
+    batch_size = batch_size or get_suppression_settings()['IMPORT_BATCH_SIZE']
+    source = f"bounces:{os.path.basename(os.path.normpath(path))}"
+    counts = {'messages': 0, 'reports': 0, 'addresses': 0}
+    seen = set()
+    pending = {}
+
+    def write(batch):
+        if dry_run:
+            return
+        by_reason = {}
+        for address, reason in batch.items():
+            by_reason.setdefault(reason, []).append(address)
+        for reason, addresses in by_reason.items():
+            suppress(addresses, scope=scope, reason=reason, source=source)
+
+    for message in iter_messages(path, fmt):
+        counts['messages'] += 1
+        recipients = bounced_recipients(message)
+        if not recipients:
+            continue
+        counts['reports'] += 1
+        for address, reason in recipients:
+            if pending.get(address) != EmailSuppression.REASON_COMPLAINT:
+                pending[address] = reason
+            if address not in seen:
+                seen.add(address)
+                counts['addresses'] += 1
+        if len(pending) >= batch_size:
+            write(pending)
+            pending = {}
+
+    if pending:
+        write(pending)
+    return counts
@@ -0,0 +1,136 @@
+# apps/email_service/broker_health.py
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BREAKER_SETTINGS = {
+    'FAILURE_THRESHOLD': 1,
+    'RESET_TIMEOUT': 30,
+}
+
+
+class BrokerCircuitBreaker:
+    """
+    Per-process view of broker health, fed passively by apply_async outcomes.
+
+    closed     -> publish normally; FAILURE_THRESHOLD consecutive failures open the circuit.
+    open       -> skip the broker entirely for RESET_TIMEOUT seconds.
+    half_open  -> let exactly one publish through as the probe; its outcome
+                  closes or re-opens the circuit.
+
+    The request path never opens a connection just to ask whether the broker is up.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        self._metrics = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _setting(self, name):
+        breaker_settings = dict(DEFAULT_BREAKER_SETTINGS)
+        breaker_settings.update(getattr(settings, 'EMAIL_BROKER_BREAKER', {}))
+        return breaker_settings[name]
+
+    @property
+    def failure_threshold(self):
+        return self._failure_threshold if self._failure_threshold is not None else self._setting('FAILURE_THRESHOLD')
+
+    @property
+    def reset_timeout(self):
+        return self._reset_timeout if self._reset_timeout is not None else self._setting('RESET_TIMEOUT')
+
+    def _refresh(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_started_at = None
+        elif (self._state == self.HALF_OPEN and self._probe_started_at is not None
+              and now - self._probe_started_at >= self.reset_timeout):
+            # The probe never reported back; allow another one.
+            self._probe_started_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def is_available(self):
+        """True unless the circuit is open. Does not consume the half-open probe."""
+        return self.state != self.OPEN
+
+    def allow_request(self):
+        """Whether the caller may publish now; in half-open only the first caller gets through."""
+        now = time.monotonic()
+        with self._lock:
+            self._refresh(now)
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probe_started_at is None:
+                self._probe_started_at = now
+                return True
+            self._metrics['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._metrics['successes'] += 1
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._metrics['failures'] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._metrics['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started_at = None
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+
+    def stats(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return dict(self._metrics, state=self._state, consecutive_failures=self._failures)
+
+
+broker_breaker = BrokerCircuitBreaker()
+
+
+def publish_task(task, args=None, kwargs=None, **options):
+    """
+    Publish `task` through the circuit breaker.
+
+    Returns True when the message reached the broker, False when the circuit is
+    open or the publish failed; the caller then falls back to its non-broker path.
+    Publishing does not retry so an unreachable broker fails fast instead of
+    blocking the request. Messages carry an `enqueued_at` header (epoch seconds)
+    for the per-lane latency metrics.
+    """
+    if not broker_breaker.allow_request():
+        return False
+    headers = dict(options.pop('headers', None) or {})
+    headers.setdefault('enqueued_at', time.time())
+    try:
+        task.apply_async(args=args, kwargs=kwargs, retry=False, headers=headers, **options)
+    except Exception:
+        broker_breaker.record_failure()
+        return False
+    broker_breaker.record_success()
+    return True
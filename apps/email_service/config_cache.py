@@ -0,0 +1,120 @@
+# apps/email_service/config_cache.py
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class EmailConfigSnapshot:
+    """Immutable, read-mostly copy of the EmailConfiguration singleton."""
+    version: Optional[int]
+    brand_name: str
+    site_url: str
+    support_email: str
+    support_phone_number: str
+    email_backend: str
+    smtp_host: str
+    smtp_port: int
+    smtp_username: str
+    smtp_password: str
+    smtp_use_tls: bool
+    smtp_use_ssl: bool
+    brand_context: Mapping[str, object]
+
+    @classmethod
+    def from_instance(cls, config, version=None):
+        brand_context = {
+            'site_url': config.site_url or getattr(settings, 'SITE_URL', ''),
+            'support_email': config.support_email,
+            'support_phone_number': config.support_phone_number,
+            'brand_name': config.brand_name or 'KidsDesignCompany',
+            'brand_logo': config.get_brand_logo_url(),
+            'terms_of_service': config.terms_of_service,
+            'social_true': config.has_social_links(),
+            'fb_link': config.facebook_link,
+            'ig_link': config.instagram_link,
+            'x_link': config.twitter_link,
+            'linkedin_link': config.linkedin_link,
+            'tiktok_link': config.tiktok_link,
+        }
+        return cls(
+            version=version,
+            brand_name=brand_context['brand_name'],
+            site_url=brand_context['site_url'],
+            support_email=config.support_email,
+            support_phone_number=config.support_phone_number,
+            email_backend=config.email_backend,
+            smtp_host=config.smtp_host,
+            smtp_port=config.smtp_port,
+            smtp_username=config.smtp_username,
+            smtp_password=config.smtp_password,
+            smtp_use_tls=config.smtp_use_tls,
+            smtp_use_ssl=config.smtp_use_ssl,
+            brand_context=MappingProxyType(brand_context),
+        )
+
+
+_lock = threading.RLock()
+_snapshot = None
+_checked_at = 0.0
+
+
+def get_config_version():
+    """
+    Configuration version stamp shared by every process (None if no configuration was saved yet).
+
+    The stamp is EmailConfiguration.updated_at in microseconds, read from the
+    database, so a save in the admin reaches web and worker processes alike.
+    """
+    from .models import EmailConfiguration
+
+    updated_at = EmailConfiguration.objects.values_list('updated_at', flat=True).first()
+    return int(updated_at.timestamp() * 1_000_000) if updated_at else None
+
+
+def bump_config_version():
+    """
+    Rebuild this process' snapshot on its next read; called from EmailConfiguration.save().
+
+    Other processes notice the new `updated_at` at their next version check.
+    """
+    invalidate_config_snapshot()
+
+
+def invalidate_config_snapshot():
+    """Drop this process' snapshot so the next read rebuilds it."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def get_config_snapshot():
+    """
+    Return the cached EmailConfigSnapshot.
+
+    The shared version stamp is only consulted every
+    EMAIL_CONFIG_VERSION_CHECK_INTERVAL seconds, and the database is only hit
+    when the stamp differs from the one the snapshot was built with.
+    """
+    global _snapshot, _checked_at
+    from .models import EmailConfiguration
+
+    now = time.monotonic()
+    interval = getattr(settings, 'EMAIL_CONFIG_VERSION_CHECK_INTERVAL', 5.0)
+    snapshot = _snapshot
+    if snapshot is not None and now - _checked_at < interval:
+        return snapshot
+
+    version = get_config_version()
+    with _lock:
+        if _snapshot is not None and _snapshot.version == version:
+            _checked_at = now
+            return _snapshot
+
+        _snapshot = EmailConfigSnapshot.from_instance(EmailConfiguration.get_instance(), version=version)
+        _checked_at = now
+        return _snapshot
@@ -0,0 +1,151 @@
+# apps/email_service/deadletter.py
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .broker_health import publish_task
+from .models import EmailDeadLetter
+from .outbox import add_to_outbox, schedule_task
+from .status_buffer import update_email_statuses
+
+DEFAULT_DEAD_LETTER_SETTINGS = {
+    'REPLAY_CHUNK_SIZE': 100,
+    # Emails per second the replayed chunks are spread over (later chunks wait in the outbox); 0 sends all at once
+    'REPLAY_RATE': 20,
+    'REPLAY_MAX_PER_REQUEST': 5000,
+}
+
+
+def get_dead_letter_settings():
+    dead_letter_settings = dict(DEFAULT_DEAD_LETTER_SETTINGS)
+    dead_letter_settings.update(getattr(settings, 'EMAIL_DEAD_LETTER', {}))
+    return dead_letter_settings
+
+
+def record_dead_letter(task, kwargs, error, error_class=None, attempts=0):
+    """Keep a send task whose retries ran out, with the kwargs needed to run it again."""
+    recipients = kwargs.get('recipients')
+    return EmailDeadLetter.objects.create(
+        task_name=task.name,
+        kwargs=kwargs,
+        email_log_id=kwargs.get('email_log_id'),
+        email_type=kwargs.get('email_type') or '',
+        recipients=len(recipients) if recipients is not None else 1,
+        error=error,
+        error_class=error_class,
+        attempts=attempts,
+    )
+
+
+def pending_dead_letters(email_type=None, error_class=None, since=None, until=None):
+    """Dead letters not yet replayed, narrowed by email_type, error class and a [since, until) window."""
+    queryset = EmailDeadLetter.objects.filter(replayed_at__isnull=True)
+    if email_type:
+        queryset = queryset.filter(email_type=email_type)
+    if error_class:
+        queryset = queryset.filter(error_class=error_class)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset
+
+
+def claim_dead_letters(queryset, limit):
+    """Mark up to `limit` rows of `queryset` replayed and return them; concurrent replays skip locked rows."""
+    with transaction.atomic():
+        queryset = queryset.order_by('created_at', 'id')
+        if connection.features.has_select_for_update:
+            queryset = queryset.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            )
+        letters = list(queryset[:limit])
+        if letters:
+            EmailDeadLetter.objects.filter(id__in=[letter.id for letter in letters]).update(
+                replayed_at=timezone.now(),
+                replay_count=F('replay_count') + 1,
+            )
+    return letters
+
+
+def _email_log_ids(letter):
+    if letter.email_log_id:
+        return [letter.email_log_id]
+    return [recipient['email_log_id'] for recipient in letter.kwargs.get('recipients') or []]
+
+
+def _enqueue(letter, delay):
+    """
+    Publish the letter's task now, or schedule it in the outbox when it is due in `delay` seconds.
+
+    Delayed letters are never published with a countdown, which would hold
+    them unacked in worker memory; `drain_email_outbox` publishes them once due.
+    """
+    task = current_app.tasks[letter.task_name]
+    if delay > 0:
+        schedule_task(task, timezone.now() + timedelta(seconds=delay), kwargs=letter.kwargs)
+        return 'scheduled'
+    if publish_task(task, kwargs=letter.kwargs):
+        return 'celery'
+    add_to_outbox(task, kwargs=letter.kwargs)
+    return 'outbox'
+
+
+def replay_dead_letters(email_type=None, error_class=None, since=None, until=None, limit=None,
+                        chunk_size=None, rate=None, dry_run=False):
+    """
+    Re-enqueue pending dead letters matching the filters, oldest first.
+
+    Letters are claimed `chunk_size` at a time. The first chunk is published
+    right away; later ones are scheduled in the outbox, due when replayed
+    emails have reached the workers at about `rate` per second, instead of all
+    at once; nothing here sleeps. Returns counts of letters, emails and the
+    publish method used.
+    """
+    dead_letter_settings = get_dead_letter_settings()
+    chunk_size = chunk_size or dead_letter_settings['REPLAY_CHUNK_SIZE']
+    rate = dead_letter_settings['REPLAY_RATE'] if rate is None else rate
+    queryset = pending_dead_letters(email_type, error_class, since, until)
+
+    if dry_run:
+        matched = queryset.order_by('created_at', 'id')
+        if limit is not None:
+            matched = EmailDeadLetter.objects.filter(id__in=list(matched.values_list('id', flat=True)[:limit]))
+        counts = matched.aggregate(letters=Count('id'), emails=Sum('recipients'))
+        return {'letters': counts['letters'], 'emails': counts['emails'] or 0, 'chunks': 0, 'celery': 0, 'outbox': 0,
+                'scheduled': 0}
+
+    totals = {'letters': 0, 'emails': 0, 'chunks': 0, 'celery': 0, 'outbox': 0, 'scheduled': 0}
+    delay = 0.0
+    while limit is None or totals['letters'] < limit:
+        take = chunk_size if limit is None else min(chunk_size, limit - totals['letters'])
+        letters = claim_dead_letters(queryset, take)
+        if not letters:
+            break
+
+        update_email_statuses({
+            log_id: {'status': 'queued'} for letter in letters for log_id in _email_log_ids(letter)
+        })
+        for letter in letters:
+            totals[_enqueue(letter, delay)] += 1
+        emails = sum(letter.recipients for letter in letters)
+        totals['letters'] += len(letters)
+        totals['emails'] += emails
+        totals['chunks'] += 1
+        if rate:
+            delay += emails / rate
+    return totals
+
+
+def dead_letter_summary():
+    """Pending dead letters per (email_type, error_class)."""
+    return list(
+        EmailDeadLetter.objects.filter(replayed_at__isnull=True)
+        .values('email_type', 'error_class')
+        .annotate(letters=Count('id'), emails=Sum('recipients'))
+        .order_by('email_type', 'error_class')
+    )
@@ -0,0 +1,186 @@
+# apps/email_service/digest.py
+import hashlib
+import json
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .broker_health import broker_breaker
+from .models import EmailDigest, EmailDigestItem, EmailLog
+from .outbox import add_to_outbox, dispatch_task
+from .rollups import record_created
+from .tasks import send_generic_email_task
+
+DEFAULT_DIGEST_SETTINGS = {
+    # Seconds a digest stays open after its first message, unless the request asks for another window
+    'DEFAULT_WINDOW': 60,
+    'MAX_WINDOW': 3600,
+    # flush_at is rounded up to a multiple of this many seconds
+    'BUCKET_SECONDS': 10,
+    # A digest is flushed early once it holds this many distinct messages
+    'MAX_ITEMS': 50,
+    'FLUSH_BATCH_SIZE': 100,
+}
+
+# Fields of a send-email request kept per digest item, next to its extra template context
+DIGEST_ITEM_FIELDS = ('subject', 'action', 'message', 'otp', 'link', 'link_text')
+# Request fields that control digest mode and are not template context
+DIGEST_REQUEST_FIELDS = ('digest_key', 'digest_window')
+
+
+def get_digest_settings():
+    digest_settings = dict(DEFAULT_DIGEST_SETTINGS)
+    digest_settings.update(getattr(settings, 'EMAIL_DIGEST', {}))
+    return digest_settings
+
+
+def flush_bucket(moment, bucket_seconds):
+    """`moment` rounded up to the next multiple of `bucket_seconds` since the epoch."""
+    if bucket_seconds <= 1:
+        return moment
+    timestamp = math.ceil(moment.timestamp() / bucket_seconds) * bucket_seconds
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _fingerprint(fields):
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def add_to_digest(email, email_type, digest_key, fields, window=None, context=None):
+    """
+    Add one notification to the open digest of (email, email_type, digest_key), opening one if needed.
+
+    `context` is the request's extra template context. Returns the EmailDigest.
+    A message identical to one already in the digest, context included, only
+    increments that item's `occurrences`.
+    """
+    digest_settings = get_digest_settings()
+    window = min(window or digest_settings['DEFAULT_WINDOW'], digest_settings['MAX_WINDOW'])
+    fields = {field: fields.get(field) for field in DIGEST_ITEM_FIELDS}
+    if context:
+        fields['context'] = context
+    fingerprint = _fingerprint(fields)
+    lookup = {'email': email, 'email_type': email_type or '', 'digest_key': digest_key}
+
+    # The flusher may delete the digest between our read and the item insert; start over with a new one then
+    for attempt in range(3):
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                digest, _ = EmailDigest.objects.get_or_create(
+                    **lookup,
+                    defaults={'flush_at': flush_bucket(now + timedelta(seconds=window),
+                                                       digest_settings['BUCKET_SECONDS'])},
+                )
+                if not EmailDigestItem.objects.filter(digest=digest, fingerprint=fingerprint).update(
+                        occurrences=F('occurrences') + 1):
+                    EmailDigestItem.objects.create(digest=digest, fingerprint=fingerprint, fields=fields)
+                    EmailDigest.objects.filter(id=digest.id).update(items=F('items') + 1)
+                    digest.items += 1
+                    if digest.items >= digest_settings['MAX_ITEMS'] and digest.flush_at > now:
+                        digest.flush_at = now
+                        EmailDigest.objects.filter(id=digest.id).update(flush_at=now)
+            return digest
+        except IntegrityError:
+            if attempt == 2:
+                raise
+
+
+def _digest_email(items):
+    """Log fields and task kwargs of the single email a digest is sent as."""
+    if len(items) == 1 and items[0].occurrences == 1:
+        # Nothing was coalesced: send the message as it came
+        fields = dict(items[0].fields)
+        return fields, fields.pop('context', None) or {}
+
+    entries = [dict(item.fields, count=item.occurrences) for item in items]
+    # Extra template context of the items is merged, later items winning like `action`
+    context = {}
+    for entry in entries:
+        context.update(entry.pop('context', None) or {})
+    total = sum(item.occurrences for item in items)
+    subjects = {entry.get('subject') for entry in entries}
+    subject = entries[-1].get('subject') if len(subjects) == 1 else None
+    fields = {
+        'subject': f"{subject} ({total} updates)" if subject else f"{total} new notifications",
+        'action': entries[-1].get('action'),
+        'message': f"You have {total} new notifications.",
+        'otp': None,
+        'link': None,
+        'link_text': None,
+    }
+    return fields, dict(context, digest_items=entries)
+
+
+def claim_due_digests(batch_size, now=None):
+    """Lock and return up to `batch_size` digests whose window has closed, with their items; call in a transaction."""
+    queryset = EmailDigest.objects.filter(flush_at__lte=now or timezone.now()).order_by('flush_at', 'id')
+    if connection.features.has_select_for_update:
+        queryset = queryset.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+    digests = list(queryset[:batch_size])
+    items = {}
+    for item in EmailDigestItem.objects.filter(digest__in=digests).order_by('created_at', 'id'):
+        items.setdefault(item.digest_id, []).append(item)
+    return [(digest, items.get(digest.id, [])) for digest in digests]
+
+
+def flush_due_digests(batch_size=None, now=None):
+    """
+    Turn one batch of due digests into one queued email each and delete them.
+
+    The EmailLog rows, and outbox entries while the broker is down, are
+    written in the same transaction as the delete; tasks are published after
+    commit. Returns counts of digests flushed, notifications they held and
+    emails queued.
+    """
+    batch_size = batch_size or get_digest_settings()['FLUSH_BATCH_SIZE']
+    counts = {'digests': 0, 'notifications': 0, 'emails': 0}
+    broker_available = broker_breaker.is_available()
+    pending = []
+
+    with transaction.atomic():
+        claimed = claim_due_digests(batch_size, now)
+        if not claimed:
+            return counts
+
+        emails = []
+        for digest, items in claimed:
+            if items:
+                emails.append((digest, *_digest_email(items)))
+            counts['notifications'] += sum(item.occurrences for item in items)
+
+        email_logs = EmailLog.objects.bulk_create([
+            EmailLog(
+                email=digest.email,
+                email_type=digest.email_type,
+                subject=fields['subject'] or '',
+                action=fields['action'] or '',
+                message=fields['message'] or '',
+                otp=fields.get('otp'),
+                link=fields['link'],
+                link_text=fields['link_text'],
+                status='queued',
+            )
+            for digest, fields, _ in emails
+        ])
+        record_created(email_logs)
+
+        for (digest, fields, extra), email_log in zip(emails, email_logs):
+            task_kwargs = dict(extra, user_email=digest.email, email_type=digest.email_type or None,
+                               email_log_id=email_log.id, **fields)
+            if broker_available:
+                pending.append((task_kwargs, email_log))
+            else:
+                add_to_outbox(send_generic_email_task, kwargs=task_kwargs, email_log=email_log)
+
+        EmailDigest.objects.filter(id__in=[digest.id for digest, _ in claimed]).delete()
+        counts['digests'] = len(claimed)
+        counts['emails'] = len(email_logs)
+
+    for task_kwargs, email_log in pending:
+        dispatch_task(send_generic_email_task, kwargs=task_kwargs, email_log=email_log)
+    return counts
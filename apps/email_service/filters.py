@@ -0,0 +1,48 @@
+# apps/email_service/filters.py
+from django.db.models.functions import Lower
+from django_filters import rest_framework as django_filters
+from rest_framework import filters
+
+from .models import EmailLog
+from .search import get_search_backend, search_terms
+
+class EmailLogFilter(django_filters.FilterSet):
+    """Exact filters for the logs endpoint; `email` matches case-insensitively through an index."""
+    email = django_filters.CharFilter(method='filter_email')
+
+    class Meta:
+        model = EmailLog
+        fields = ['email', 'email_type', 'status']
+
+    def filter_email(self, queryset, name, value):
+        # Compiles to LOWER(email) = ..., which the functional index on EmailLog serves
+        return queryset.annotate(email_lower=Lower('email')).filter(email_lower=value.strip().lower())
+
+
+class EmailLogSearchFilter(filters.SearchFilter):
+    """
+    `?search=` through the database's full-text index when there is one.
+
+    Matching rows are annotated with `search_rank` (higher is better); other
+    databases fall back to SearchFilter's icontains over `search_fields`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        view.search_ranked = True
+        return backend.filter(queryset, terms)
+
+
+class EmailLogOrderingFilter(filters.OrderingFilter):
+    """Orders full-text results by relevance unless the client asked for an explicit ordering."""
+
+    def get_default_ordering(self, view):
+        if getattr(view, 'search_ranked', False):
+            return ['-search_rank', '-created_at']
+        return super().get_default_ordering(view)
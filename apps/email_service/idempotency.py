@@ -0,0 +1,154 @@
+# apps/email_service/idempotency.py
+import hashlib
+import json
+import threading
+from datetime import timedelta
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import EmailIdempotencyKey
+
+DEFAULT_IDEMPOTENCY_SETTINGS = {
+    'TTL_SECONDS': 24 * 60 * 60,
+    'MEMORY_SIZE': 10000,
+    'MEMORY_TTL_SECONDS': 300,
+    'MAX_KEY_LENGTH': 255,
+}
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FIELD = 'idempotency_key'
+
+
+def get_idempotency_settings():
+    idempotency_settings = dict(DEFAULT_IDEMPOTENCY_SETTINGS)
+    idempotency_settings.update(getattr(settings, 'EMAIL_IDEMPOTENCY', {}))
+    return idempotency_settings
+
+
+def get_idempotency_key(request):
+    """The client's idempotency key from the header or the request body, or None."""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None and hasattr(request.data, 'get'):
+        key = request.data.get(IDEMPOTENCY_FIELD)
+    if key is None:
+        return None
+    key = str(key).strip()
+    if not key or len(key) > get_idempotency_settings()['MAX_KEY_LENGTH']:
+        raise ValueError(f"{IDEMPOTENCY_HEADER} must be 1-{get_idempotency_settings()['MAX_KEY_LENGTH']} characters")
+    return key
+
+
+def request_fingerprint(data):
+    """Stable hash of a request body, ignoring the idempotency key itself."""
+    body = {k: v for k, v in dict(data).items() if k != IDEMPOTENCY_FIELD}
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    key -> (request fingerprint, original response) with a TTL.
+
+    Lookups go through a bounded per-process TTLCache, then the shared Django
+    cache, and only then the EmailIdempotencyKey table, which is the source of
+    truth: its unique (scope, key) constraint is what stops two concurrent
+    retries from both sending.
+    """
+
+    def __init__(self, memory_size=None, memory_ttl=None):
+        idempotency_settings = get_idempotency_settings()
+        self._memory = TTLCache(
+            maxsize=memory_size or idempotency_settings['MEMORY_SIZE'],
+            ttl=memory_ttl or idempotency_settings['MEMORY_TTL_SECONDS'],
+        )
+        self._lock = threading.Lock()
+        self._metrics = {'memory_hits': 0, 'cache_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def _cache_key(self, scope, key):
+        digest = hashlib.sha256(f'{scope}\0{key}'.encode()).hexdigest()
+        return f'email_service:idempotency:{digest}'
+
+    def _remember(self, scope, key, entry, ttl):
+        with self._lock:
+            self._memory[(scope, key)] = entry
+        cache.set(self._cache_key(scope, key), entry, timeout=max(int(ttl), 1))
+
+    def lookup(self, scope, key):
+        """Return {'request_hash', 'email_log_id', 'response'} for a live key, or None."""
+        with self._lock:
+            entry = self._memory.get((scope, key))
+        if entry is not None:
+            self._metrics['memory_hits'] += 1
+            return entry
+
+        entry = cache.get(self._cache_key(scope, key))
+        if entry is not None:
+            self._metrics['cache_hits'] += 1
+            with self._lock:
+                self._memory[(scope, key)] = entry
+            return entry
+
+        record = EmailIdempotencyKey.objects.filter(
+            scope=scope, key=key, expires_at__gt=timezone.now()
+        ).only('request_hash', 'email_log_id', 'response', 'expires_at').first()
+        if record is None:
+            self._metrics['misses'] += 1
+            return None
+
+        self._metrics['db_hits'] += 1
+        entry = {'request_hash': record.request_hash, 'email_log_id': record.email_log_id, 'response': record.response}
+        self._remember(scope, key, entry, (record.expires_at - timezone.now()).total_seconds())
+        return entry
+
+    def claim(self, scope, key, request_hash, email_log_id, response):
+        """
+        Record the key for a newly created EmailLog; call inside the log's transaction.
+
+        An expired row for the same key is replaced. Raises IntegrityError when a
+        concurrent request holds the key, which rolls the caller's transaction back.
+        """
+        ttl = get_idempotency_settings()['TTL_SECONDS']
+        now = timezone.now()
+        EmailIdempotencyKey.objects.filter(scope=scope, key=key, expires_at__lte=now).delete()
+        EmailIdempotencyKey.objects.create(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            email_log_id=email_log_id,
+            response=response,
+            expires_at=now + timedelta(seconds=ttl),
+        )
+
+    def complete(self, scope, key, request_hash, email_log_id, response, changed=True):
+        """
+        Publish the final response to the cache tiers once the request has been dispatched.
+
+        The stored row is only rewritten when the response differs from the one claimed.
+        """
+        if changed:
+            EmailIdempotencyKey.objects.filter(scope=scope, key=key).update(response=response)
+        entry = {'request_hash': request_hash, 'email_log_id': email_log_id, 'response': response}
+        self._remember(scope, key, entry, get_idempotency_settings()['TTL_SECONDS'])
+
+    def purge_expired(self, batch_size=1000):
+        """Delete expired keys in batches; returns the number removed."""
+        removed = 0
+        while True:
+            ids = list(EmailIdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+                       .values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return removed
+            removed += EmailIdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, memory_entries=len(self._memory))
+
+
+idempotency_store = IdempotencyStore()
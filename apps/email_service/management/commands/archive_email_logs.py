@@ -0,0 +1,46 @@
+# apps/email_service/management/commands/archive_email_logs.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.email_service.archive import archive_email_logs, get_archive_settings
+
+
+class Command(BaseCommand):
+    help = "Move EmailLog rows past retention to compressed NDJSON archive files, in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Archive logs older than this many days (default EMAIL_ARCHIVE['RETENTION_DAYS'])")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Rows archived and deleted per chunk")
+        parser.add_argument('--max-chunks', type=int, default=None, help="Stop after this many chunks")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between chunks to leave room for the hot path")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would be archived")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_archive_settings()['RETENTION_DAYS']
+
+        if options['dry_run']:
+            counts = archive_email_logs(older_than_days=days, dry_run=True)
+            self.stdout.write(f"{counts['archived']} email logs older than {days} days would be archived")
+            return
+
+        totals = {'archived': 0, 'deleted': 0, 'chunks': 0}
+        try:
+            while options['max_chunks'] is None or totals['chunks'] < options['max_chunks']:
+                counts = archive_email_logs(older_than_days=days, chunk_size=options['chunk_size'], max_chunks=1)
+                if not counts['chunks']:
+                    break
+                for key, value in counts.items():
+                    totals[key] += value
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"Archived chunk: {counts}")
+                if options['pause']:
+                    time.sleep(options['pause'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Email logs archived: {totals['archived']} rows in {totals['chunks']} chunks, {totals['deleted']} deleted"
+        ))
@@ -0,0 +1,51 @@
+# apps/email_service/management/commands/backfill_email_rollups.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.email_service.models import EmailLog
+from apps.email_service.rollups import hour_bucket, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the hourly email statistics rollups from EmailLog, one day at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="ISO datetime; defaults to the oldest EmailLog")
+        parser.add_argument('--until', help="ISO datetime; defaults to the newest EmailLog")
+        parser.add_argument('--days-per-batch', type=int, default=1,
+                            help="Days recomputed per transaction")
+
+    def _parse(self, value, name):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"Invalid --{name}: {value!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def handle(self, *args, **options):
+        bounds = EmailLog.objects.aggregate(oldest=Min('created_at'), newest=Max('created_at'))
+        since = self._parse(options['since'], 'since') if options['since'] else bounds['oldest']
+        until = self._parse(options['until'], 'until') if options['until'] else bounds['newest']
+        if since is None or until is None:
+            self.stdout.write("No email logs to roll up.")
+            return
+
+        # Whole hours only, so no rollup row is replaced with a partial count
+        start = hour_bucket(since)
+        end = hour_bucket(until) + timedelta(hours=1)
+        step = timedelta(days=max(options['days_per_batch'], 1))
+
+        written = 0
+        while start < end:
+            batch_end = min(start + step, end)
+            written += rebuild_rollups(since=start, until=batch_end)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Rolled up {start:%Y-%m-%d %H:00} - {batch_end:%Y-%m-%d %H:00}")
+            start = batch_end
+
+        self.stdout.write(self.style.SUCCESS(f"Email rollups rebuilt: {written} rollup rows written"))
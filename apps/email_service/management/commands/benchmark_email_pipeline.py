@@ -0,0 +1,53 @@
+# apps/email_service/management/commands/benchmark_email_pipeline.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.email_service.benchmark import BENCHMARK_PATHS, EmailPipelineBenchmark
+from apps.email_service.smtp_sink import LocalSMTPSink
+
+
+class Command(BaseCommand):
+    help = ("Benchmark the single, bulk and direct send paths against a local in-process SMTP sink "
+            "and print the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', default=','.join(BENCHMARK_PATHS),
+                            help=f"Comma-separated paths to run (default {','.join(BENCHMARK_PATHS)})")
+        parser.add_argument('--count', type=int, default=200, help="Emails sent per path")
+        parser.add_argument('--concurrency', type=int, default=1, help="Threads sending in parallel")
+        parser.add_argument('--bulk-chunk-size', type=int, default=None,
+                            help="Recipients per bulk chunk (default EMAIL_BULK_CHUNK_SIZE)")
+        parser.add_argument('--smtp-latency', type=float, default=0.0,
+                            help="Seconds the sink waits before accepting each message")
+        parser.add_argument('--allocation-sample', type=int, default=20,
+                            help="Emails per path re-run under tracemalloc for allocation figures (0 disables)")
+        parser.add_argument('--email-type', default='benchmark', help="email_type tagging the benchmark's logs")
+        parser.add_argument('--keep-logs', action='store_true', help="Keep the EmailLog rows the run creates")
+        parser.add_argument('--output', default=None, help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        unknown = set(paths) - set(BENCHMARK_PATHS)
+        if unknown:
+            raise CommandError(f"Unknown paths: {', '.join(sorted(unknown))}")
+        if options['count'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--count and --concurrency must be positive")
+
+        with LocalSMTPSink(latency=options['smtp_latency']) as sink:
+            benchmark = EmailPipelineBenchmark(
+                sink,
+                concurrency=options['concurrency'],
+                bulk_chunk_size=options['bulk_chunk_size'],
+                email_type=options['email_type'],
+                keep_logs=options['keep_logs'],
+            )
+            report = benchmark.run(paths, count=options['count'], allocation_sample=options['allocation_sample'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,52 @@
+# apps/email_service/management/commands/drain_email_outbox.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.email_service import tasks  # noqa: F401 - registers the email tasks with Celery
+from apps.email_service.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = ("Publish email tasks parked in the outbox while the Celery broker was unavailable, "
+            "and scheduled sends once their send_at is due.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Entries claimed per batch")
+        parser.add_argument('--lease-seconds', type=int, default=None,
+                            help="How long a claimed entry is hidden from other drainers")
+        parser.add_argument('--direct-fallback', action='store_true',
+                            help="Run the tasks in this process while the broker is still down")
+        parser.add_argument('--loop', action='store_true', help="Keep draining until interrupted")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between passes when nothing is due (with --loop)")
+
+    def handle(self, *args, **options):
+        totals = {'claimed': 0, 'published': 0, 'executed': 0, 'deferred': 0}
+
+        try:
+            while True:
+                counts = drain_outbox(
+                    batch_size=options['batch_size'],
+                    direct_fallback=options['direct_fallback'],
+                    lease_seconds=options['lease_seconds'],
+                )
+                for key, value in counts.items():
+                    totals[key] += value
+
+                if counts['claimed'] and options['verbosity'] > 1:
+                    self.stdout.write(f"Outbox batch: {counts}")
+
+                if not options['loop']:
+                    if counts['claimed'] < options['batch_size']:
+                        break
+                    continue
+                if not counts['claimed'] or counts['deferred'] == counts['claimed']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {totals['published']} published, {totals['executed']} executed directly, "
+            f"{totals['deferred']} deferred"
+        ))
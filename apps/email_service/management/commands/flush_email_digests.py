@@ -0,0 +1,43 @@
+# apps/email_service/management/commands/flush_email_digests.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.email_service.digest import flush_due_digests, get_digest_settings
+
+
+class Command(BaseCommand):
+    help = "Send every digest whose window has closed as a single email."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Digests flushed per batch (default EMAIL_DIGEST['FLUSH_BATCH_SIZE'])")
+        parser.add_argument('--loop', action='store_true', help="Keep flushing until interrupted")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Seconds to sleep when nothing is due (with --loop; default the digest bucket size)")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or get_digest_settings()['BUCKET_SECONDS']
+        totals = {'digests': 0, 'notifications': 0, 'emails': 0}
+
+        try:
+            while True:
+                counts = flush_due_digests(batch_size=options['batch_size'])
+                for key, value in counts.items():
+                    totals[key] += value
+
+                if counts['digests'] and options['verbosity'] > 1:
+                    self.stdout.write(f"Digest batch: {counts}")
+
+                if counts['digests']:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Digests flushed: {totals['digests']} ({totals['notifications']} notifications) "
+            f"sent as {totals['emails']} emails"
+        ))
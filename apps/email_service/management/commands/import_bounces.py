@@ -0,0 +1,38 @@
+# apps/email_service/management/commands/import_bounces.py
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.email_service.bounces import FORMATS, FORMAT_AUTO, import_bounce_reports
+from apps.email_service.models import EmailSuppression
+
+
+class Command(BaseCommand):
+    help = "Suppress the addresses reported in bounce and complaint messages stored in mbox files or maildirs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="mbox files or maildir directories to read")
+        parser.add_argument('--format', choices=FORMATS, default=FORMAT_AUTO,
+                            help="Mailbox format; by default directories are maildirs and files are mbox")
+        parser.add_argument('--scope', default=EmailSuppression.SCOPE_ALL,
+                            help="email_type to suppress the addresses for (default: every email type)")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Addresses written per batch (default EMAIL_SUPPRESSION['IMPORT_BATCH_SIZE'])")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be suppressed")
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            try:
+                counts = import_bounce_reports(
+                    path,
+                    fmt=options['format'],
+                    scope=options['scope'],
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+            except FileNotFoundError as e:
+                raise CommandError(str(e))
+
+            verb = "would be suppressed" if options['dry_run'] else "suppressed"
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {counts['messages']} messages read, {counts['reports']} bounce reports, "
+                f"{counts['addresses']} addresses {verb}"
+            ))
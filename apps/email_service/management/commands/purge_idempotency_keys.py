@@ -0,0 +1,15 @@
+# apps/email_service/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from apps.email_service.idempotency import idempotency_store
+
+
+class Command(BaseCommand):
+    help = "Delete expired send-email idempotency keys in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Keys deleted per batch")
+
+    def handle(self, *args, **options):
+        removed = idempotency_store.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired idempotency keys removed: {removed}"))
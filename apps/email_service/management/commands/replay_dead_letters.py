@@ -0,0 +1,50 @@
+# apps/email_service/management/commands/replay_dead_letters.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from apps.email_service.deadletter import replay_dead_letters
+from apps.email_service.retry import ERROR_CLASSES
+
+
+class Command(BaseCommand):
+    help = "Re-enqueue dead-lettered emails matching the filters, spread out at the replay rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email-type', default=None, help="Only replay this email_type")
+        parser.add_argument('--error-class', choices=ERROR_CLASSES, default=None, help="Only replay this error class")
+        parser.add_argument('--since', default=None, help="Only dead letters created at or after this ISO datetime")
+        parser.add_argument('--until', default=None, help="Only dead letters created before this ISO datetime")
+        parser.add_argument('--limit', type=int, default=None, help="Replay at most this many dead letters")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Dead letters claimed per chunk (default EMAIL_DEAD_LETTER['REPLAY_CHUNK_SIZE'])")
+        parser.add_argument('--rate', type=float, default=None,
+                            help="Emails per second to spread the replay over (default EMAIL_DEAD_LETTER['REPLAY_RATE'])")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many dead letters match")
+
+    def _datetime(self, value, name):
+        if value is None:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"--{name} must be an ISO datetime")
+        return parsed
+
+    def handle(self, *args, **options):
+        counts = replay_dead_letters(
+            email_type=options['email_type'],
+            error_class=options['error_class'],
+            since=self._datetime(options['since'], 'since'),
+            until=self._datetime(options['until'], 'until'),
+            limit=options['limit'],
+            chunk_size=options['chunk_size'],
+            rate=options['rate'],
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{counts['letters']} dead letters ({counts['emails']} emails) would be replayed")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Dead letters replayed: {counts['letters']} ({counts['emails']} emails) in {counts['chunks']} chunks, "
+            f"{counts['celery']} published, {counts['scheduled']} scheduled, {counts['outbox']} parked in the outbox"
+        ))
@@ -0,0 +1,249 @@
+# apps/email_service/metrics.py
+import atexit
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import EmailLatencyBucket
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0,
+)
+
+DEFAULT_METRICS_SETTINGS = {
+    'FLUSH_INTERVAL': 5.0,
+}
+
+
+def get_metrics_settings():
+    metrics_settings = dict(DEFAULT_METRICS_SETTINGS)
+    metrics_settings.update(getattr(settings, 'EMAIL_METRICS', {}))
+    return metrics_settings
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are interpolated inside the bucket."""
+
+    def __init__(self, counts=None, total=0.0):
+        self.counts = list(counts) if counts else [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+
+    def percentile(self, q):
+        count = self.count
+        if not count:
+            return None
+        rank = q / 100.0 * count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else lower * 2
+                return lower + (upper - lower) * max(rank - seen, 0) / bucket_count
+            seen += bucket_count
+        return LATENCY_BUCKETS[-1]
+
+    def summary(self):
+        count = self.count
+
+        def rounded(value):
+            return round(value, 4) if value is not None else None
+
+        return {
+            'count': count,
+            'mean': rounded(self.total / count) if count else None,
+            'p50': rounded(self.percentile(50)),
+            'p95': rounded(self.percentile(95)),
+            'p99': rounded(self.percentile(99)),
+        }
+
+
+class MetricsRecorder:
+    """
+    Latency histograms shared by every web and worker process.
+
+    Observations are accumulated in process and added to EmailLatencyBucket
+    with one UPDATE per touched bucket at most every FLUSH_INTERVAL seconds, so
+    recording costs a dict update on the hot path. Readers rebuild a histogram
+    from the bucket rows.
+    """
+
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        # (metric, label, bucket) -> observation count, and their total in microseconds
+        self._counts = Counter()
+        self._sums = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval if self._flush_interval is not None else get_metrics_settings()['FLUSH_INTERVAL']
+
+    def observe(self, metric, label, seconds):
+        seconds = max(seconds, 0.0)
+        key = (metric, label, bisect.bisect_left(LATENCY_BUCKETS, seconds))
+        with self._lock:
+            self._counts[key] += 1
+            self._sums[key] += int(seconds * 1_000_000)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            sums, self._sums = self._sums, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return
+
+        remaining = list(counts)
+        try:
+            while remaining:
+                key = remaining[0]
+                self._apply(key, counts[key], sums[key])
+                remaining.pop(0)
+        except Exception as exc:
+            # Keep the observations not yet written for the next flush rather than losing them
+            logger.warning("Failed to flush latency metrics for %d buckets: %s", len(remaining), exc)
+            with self._lock:
+                for key in remaining:
+                    self._counts[key] += counts[key]
+                    self._sums[key] += sums[key]
+
+    def _apply(self, key, count, sum_us):
+        metric, label, bucket = key
+        lookup = {'metric': metric, 'label': label, 'bucket': bucket}
+        updates = {'count': F('count') + count, 'sum_us': F('sum_us') + sum_us}
+        if EmailLatencyBucket.objects.filter(**lookup).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                EmailLatencyBucket.objects.create(count=count, sum_us=sum_us, **lookup)
+        except IntegrityError:
+            EmailLatencyBucket.objects.filter(**lookup).update(**updates)
+
+    def _histograms(self, metric, labels=None):
+        rows = EmailLatencyBucket.objects.filter(metric=metric)
+        if labels is not None:
+            rows = rows.filter(label__in=labels)
+        histograms = {}
+        for label, bucket, count, sum_us in rows.values_list('label', 'bucket', 'count', 'sum_us'):
+            histogram = histograms.setdefault(label, Histogram())
+            histogram.counts[bucket] += count
+            histogram.total += sum_us / 1_000_000
+        return histograms
+
+    def labels(self, metric):
+        return list(EmailLatencyBucket.objects.filter(metric=metric).order_by('label')
+                    .values_list('label', flat=True).distinct())
+
+    def histogram(self, metric, label):
+        return self._histograms(metric, [label]).get(label, Histogram())
+
+    def summary(self, metric, labels=None):
+        """{label: {count, mean, p50, p95, p99}} for every label seen (or the given ones)."""
+        self.flush()
+        histograms = self._histograms(metric, labels)
+        return {label: histograms.get(label, Histogram()).summary()
+                for label in (labels or sorted(histograms))}
+
+    def reset(self, metric):
+        with self._lock:
+            for pending in (self._counts, self._sums):
+                for key in [key for key in pending if key[0] == metric]:
+                    del pending[key]
+        EmailLatencyBucket.objects.filter(metric=metric).delete()
+
+
+metrics = MetricsRecorder()
+
+LANE_LATENCY = 'lane_latency'
+
+# Stages of a single email; each is a histogram labelled by email_type
+STAGE_QUEUE_WAIT = 'queue_wait'
+STAGE_DB = 'db'
+STAGE_RENDER = 'render'
+STAGE_SMTP = 'smtp'
+STAGE_TOTAL = 'total'
+PIPELINE_STAGES = (STAGE_QUEUE_WAIT, STAGE_DB, STAGE_RENDER, STAGE_SMTP, STAGE_TOTAL)
+
+
+def stage_metric(stage):
+    return f'stage:{stage}'
+
+
+def observe_stage(stage, email_type, seconds):
+    metrics.observe(stage_metric(stage), email_type or 'generic', seconds)
+
+
+class stage_timer:
+    """Context manager timing one pipeline stage of an email: `with stage_timer(STAGE_SMTP, email_type): ...`"""
+    __slots__ = ('stage', 'email_type', 'started')
+
+    def __init__(self, stage, email_type):
+        self.stage = stage
+        self.email_type = email_type
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe_stage(self.stage, self.email_type, time.perf_counter() - self.started)
+        return False
+
+
+def stage_summary(email_types=None):
+    """{stage: {email_type: {count, mean, p50, p95, p99}}} for every pipeline stage."""
+    return {stage: metrics.summary(stage_metric(stage), email_types) for stage in PIPELINE_STAGES}
+
+
+def message_header(request, name):
+    """A custom message header from a Celery task request (worker or eager)."""
+    value = request.get(name)
+    if value is None:
+        value = (request.get('headers') or {}).get(name)
+    return value
+
+
+def record_lane_latency(lane, request):
+    """Record enqueue-to-send latency for a lane from the task's `enqueued_at` header (epoch seconds)."""
+    enqueued_at = message_header(request, 'enqueued_at')
+    if enqueued_at:
+        metrics.observe(LANE_LATENCY, lane, time.time() - float(enqueued_at))
+
+
+def record_queue_wait(email_type, request):
+    """Record how long a task waited in the broker before a worker started it."""
+    enqueued_at = message_header(request, 'enqueued_at')
+    if enqueued_at:
+        observe_stage(STAGE_QUEUE_WAIT, email_type, time.time() - float(enqueued_at))
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _flush_metrics(**kwargs):
+    metrics.flush()
+
+
+atexit.register(metrics.flush)
@@ -0,0 +1,238 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:28
+
+import django.db.models.deletion
+import django.db.models.functions.text
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailConfiguration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('support_email', models.EmailField(blank=True, help_text='Support email address', max_length=254)),
+                ('support_phone_number', models.CharField(blank=True, help_text='Support phone number', max_length=20)),
+                ('brand_name', models.CharField(default='KidsDesignCompany', help_text='Brand name for emails', max_length=100)),
+                ('brand_logo', models.ImageField(blank=True, help_text='Brand logo image', null=True, upload_to='email_logos/')),
+                ('terms_of_service', models.URLField(blank=True, help_text='Terms of service URL')),
+                ('site_url', models.URLField(blank=True, help_text='Main website URL')),
+                ('email_backend', models.CharField(default='django.core.mail.backends.smtp.EmailBackend', help_text='Email backend to use', max_length=100)),
+                ('smtp_host', models.CharField(blank=True, help_text='SMTP server hostname', max_length=255)),
+                ('smtp_port', models.PositiveIntegerField(default=587, help_text='SMTP server port')),
+                ('smtp_username', models.CharField(blank=True, help_text='SMTP username', max_length=255)),
+                ('smtp_password', models.CharField(blank=True, help_text='SMTP password', max_length=255)),
+                ('smtp_use_tls', models.BooleanField(default=True, help_text='Use TLS for SMTP connection')),
+                ('smtp_use_ssl', models.BooleanField(default=False, help_text='Use SSL for SMTP connection')),
+                ('facebook_link', models.URLField(blank=True, help_text='Facebook page URL')),
+                ('instagram_link', models.URLField(blank=True, help_text='Instagram profile URL')),
+                ('twitter_link', models.URLField(blank=True, help_text='Twitter/X profile URL')),
+                ('linkedin_link', models.URLField(blank=True, help_text='LinkedIn profile URL')),
+                ('tiktok_link', models.URLField(blank=True, help_text='TikTok profile URL')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Email Configuration',
+                'verbose_name_plural': 'Email Configuration',
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=255)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('email_log_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('email_type', models.CharField(max_length=50)),
+                ('recipients', models.PositiveIntegerField(default=1)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('error_class', models.CharField(blank=True, max_length=20, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+                ('replay_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['replayed_at', 'email_type', 'created_at'], name='deadletter_type_idx'), models.Index(fields=['replayed_at', 'error_class', 'created_at'], name='deadletter_class_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('email_type', models.CharField(blank=True, default='', max_length=50)),
+                ('digest_key', models.CharField(max_length=100)),
+                ('flush_at', models.DateTimeField()),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['flush_at', 'id'],
+                'indexes': [models.Index(fields=['flush_at', 'id'], name='emaildigest_flush_idx')],
+                'constraints': [models.UniqueConstraint(fields=('email', 'email_type', 'digest_key'), name='unique_open_email_digest')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=255)),
+                ('request_hash', models.CharField(max_length=64)),
+                ('email_log_id', models.BigIntegerField(blank=True, null=True)),
+                ('response', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='unique_email_idempotency_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailLatencyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50)),
+                ('label', models.CharField(max_length=100)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('sum_us', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['metric', 'label', 'bucket'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'label', 'bucket'), name='unique_email_latency_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('email_type', models.CharField(max_length=50)),
+                ('subject', models.CharField(max_length=255)),
+                ('action', models.CharField(max_length=100)),
+                ('message', models.TextField()),
+                ('otp', models.CharField(blank=True, max_length=10, null=True)),
+                ('link', models.URLField(blank=True, null=True)),
+                ('link_text', models.CharField(blank=True, max_length=100, null=True)),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('processing', 'processing'), ('sent', 'sent'), ('failed', 'failed')], default='queued', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error_class', models.CharField(blank=True, max_length=20, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='emaillog_created_id_idx'), models.Index(fields=['status', 'created_at', 'id'], name='emaillog_status_created_idx'), models.Index(fields=['email_type', 'created_at', 'id'], name='emaillog_type_created_idx'), models.Index(django.db.models.functions.text.Lower('email'), models.F('created_at'), models.F('id'), name='emaillog_email_lower_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailServiceUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('accepted', models.BigIntegerField(default=0)),
+                ('rejected', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', 'service'],
+                'constraints': [models.UniqueConstraint(fields=('service', 'day'), name='unique_email_service_usage')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailStatsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('email_type', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['hour', 'email_type', 'status'],
+                'indexes': [models.Index(fields=['email_type', 'hour'], name='email_servi_email_t_847a25_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'email_type', 'status'), name='unique_email_stats_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailSuppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254)),
+                ('scope', models.CharField(default='*', max_length=50)),
+                ('reason', models.CharField(choices=[('hard_bounce', 'hard bounce'), ('complaint', 'complaint'), ('unsubscribe', 'unsubscribe'), ('manual', 'manual')], default='manual', max_length=20)),
+                ('source', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['email', 'scope'],
+                'constraints': [models.UniqueConstraint(fields=('email', 'scope'), name='unique_email_suppression')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_type', models.CharField(max_length=50)),
+                ('version', models.PositiveIntegerField(blank=True)),
+                ('html', models.TextField(blank=True, default='')),
+                ('text', models.TextField(blank=True, default='')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['email_type', '-version'],
+                'constraints': [models.UniqueConstraint(fields=('email_type', 'version'), name='unique_email_template_version')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailDigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('fields', models.JSONField(default=dict)),
+                ('occurrences', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('digest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='email_service.emaildigest')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('digest', 'fingerprint'), name='unique_email_digest_item')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=255)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('send_at', models.DateTimeField(blank=True, null=True)),
+                ('headers', models.JSONField(blank=True, default=dict)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_entries', to='email_service.emaillog')),
+            ],
+            options={
+                'ordering': ['available_at', 'id'],
+                'indexes': [models.Index(fields=['available_at', 'id'], name='email_servi_availab_347df6_idx')],
+            },
+        ),
+    ]
@@ -1,16 +1,24 @@
 # apps/email_service/models.py
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 import os
 
+from .config_cache import bump_config_version
+from .template_registry import bump_template_version
+
 
 class EmailLog(models.Model):
     STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
     STATUS_SENT = 'sent'
     STATUS_FAILED = 'failed'
 
     STATUS_CHOICES = [
         (STATUS_QUEUED, 'queued'),
+        (STATUS_PROCESSING, 'processing'),
         (STATUS_SENT, 'sent'),
         (STATUS_FAILED, 'failed'),
     ]
@@ -27,12 +35,304 @@ class EmailLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     sent_at = models.DateTimeField(null=True, blank=True)
     error = models.TextField(null=True, blank=True)
+    # Send attempts so far and the retry class (permanent/transient/throttled) of the last failure
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_class = models.CharField(max_length=20, null=True, blank=True)
 
     def __str__(self):
         return f"{self.email} - {self.subject} ({self.status})"
 
     class Meta:
         ordering = ['-created_at']
+        # Keyset pagination walks (created_at, id); the filtered variants let
+        # status/email_type narrow the same index range instead of scanning.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='emaillog_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='emaillog_status_created_idx'),
+            models.Index(fields=['email_type', 'created_at', 'id'], name='emaillog_type_created_idx'),
+            # Case-insensitive recipient lookups (LOWER(email) = ...) without a scan
+            models.Index(Lower('email'), F('created_at'), F('id'), name='emaillog_email_lower_idx'),
+        ]
+
+
+
+class EmailStatsRollup(models.Model):
+    """
+    Number of EmailLog rows per (creation hour, email_type, status).
+
+    Kept up to date incrementally by apps/email_service/rollups.py as logs are
+    created and change status, so the stats endpoints never scan EmailLog.
+    Rebuild with `manage.py backfill_email_rollups`.
+    """
+    hour = models.DateTimeField()
+    email_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.email_type or '-'} {self.status}: {self.count}"
+
+    class Meta:
+        ordering = ['hour', 'email_type', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'email_type', 'status'], name='unique_email_stats_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['email_type', 'hour']),
+        ]
+
+
+class EmailIdempotencyKey(models.Model):
+    """
+    Idempotency-Key seen on send-email, per caller, with the response it produced.
+
+    `email_log_id` is a plain column rather than a foreign key so keys outlive
+    archived logs until they expire.
+    """
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    email_log_id = models.BigIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} -> {self.email_log_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_email_idempotency_key'),
+        ]
+
+
+class EmailOutbox(models.Model):
+    """
+    Celery messages that could not be published because the broker was unavailable,
+    sends scheduled for later with `send_at`, and task retries with a long back-off.
+
+    Rows are written in the same transaction as their EmailLog and removed once
+    `drain_email_outbox` has handed them to the broker. A scheduled row keeps
+    its `send_at`; `available_at` is its due time until a drainer leases it.
+    """
+    task_name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    email_log = models.ForeignKey(EmailLog, on_delete=models.CASCADE, null=True, blank=True, related_name='outbox_entries')
+    available_at = models.DateTimeField(default=timezone.now)
+    send_at = models.DateTimeField(null=True, blank=True)
+    # Message headers and Celery retry count of a task retry parked here until its back-off ends
+    headers = models.JSONField(default=dict, blank=True)
+    retries = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task_name} (log {self.email_log_id}, attempts {self.attempts})"
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['available_at', 'id']),
+        ]
+
+class EmailDeadLetter(models.Model):
+    """
+    A send task whose retries ran out, kept with its task kwargs so it can be replayed.
+
+    Single emails carry their `email_log_id`; a failed bulk chunk is one row
+    whose kwargs hold every recipient. `email_log_id` is a plain column so dead
+    letters survive archiving of their log. Replayed rows keep `replayed_at`.
+    """
+    task_name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    email_log_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    email_type = models.CharField(max_length=50)
+    recipients = models.PositiveIntegerField(default=1)
+    error = models.TextField(null=True, blank=True)
+    error_class = models.CharField(max_length=20, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+    replay_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.task_name} (log {self.email_log_id}, {self.error_class})"
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        # Replay selects pending rows by type or error class over a time range
+        indexes = [
+            models.Index(fields=['replayed_at', 'email_type', 'created_at'], name='deadletter_type_idx'),
+            models.Index(fields=['replayed_at', 'error_class', 'created_at'], name='deadletter_class_idx'),
+        ]
+
+
+class EmailServiceUsage(models.Model):
+    """Emails accepted and rate-limited per calling service and day, flushed from in-process counters."""
+    service = models.CharField(max_length=100)
+    day = models.DateField()
+    accepted = models.BigIntegerField(default=0)
+    rejected = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.service} {self.day}: {self.accepted} accepted, {self.rejected} rejected"
+
+    class Meta:
+        ordering = ['-day', 'service']
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'day'], name='unique_email_service_usage'),
+        ]
+
+
+class EmailLatencyBucket(models.Model):
+    """
+    One bucket of a latency histogram (lane latency or a pipeline stage, per label).
+
+    Every web and worker process adds its observations here with one UPDATE
+    per bucket at most every EMAIL_METRICS['FLUSH_INTERVAL'] seconds; see
+    apps/email_service/metrics.py. `sum_us` is the total, in microseconds, of
+    the observations counted in the bucket.
+    """
+    metric = models.CharField(max_length=50)
+    label = models.CharField(max_length=100)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+    sum_us = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.metric} {self.label} [{self.bucket}]: {self.count}"
+
+    class Meta:
+        ordering = ['metric', 'label', 'bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'label', 'bucket'], name='unique_email_latency_bucket'),
+        ]
+
+
+class EmailSuppression(models.Model):
+    """
+    An address that must not be emailed, for every email type (scope '*') or for one email_type.
+
+    Addresses are stored lower-cased. `updated_at` lets each process fold new
+    rows into its in-memory Bloom filter without rereading the table.
+    """
+    SCOPE_ALL = '*'
+
+    REASON_HARD_BOUNCE = 'hard_bounce'
+    REASON_COMPLAINT = 'complaint'
+    REASON_UNSUBSCRIBE = 'unsubscribe'
+    REASON_MANUAL = 'manual'
+
+    REASON_CHOICES = [
+        (REASON_HARD_BOUNCE, 'hard bounce'),
+        (REASON_COMPLAINT, 'complaint'),
+        (REASON_UNSUBSCRIBE, 'unsubscribe'),
+        (REASON_MANUAL, 'manual'),
+    ]
+
+    email = models.CharField(max_length=254)
+    scope = models.CharField(max_length=50, default=SCOPE_ALL)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default=REASON_MANUAL)
+    source = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.email} ({self.scope}, {self.reason})"
+
+    class Meta:
+        ordering = ['email', 'scope']
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'scope'], name='unique_email_suppression'),
+        ]
+
+
+class EmailDigest(models.Model):
+    """
+    Notifications to one recipient with the same (email_type, digest_key), waiting to go out as one email.
+
+    The first message opens the digest; `flush_at` is the end of its window
+    rounded up to the flush bucket, so the flusher reads the due digests with
+    a range scan over few distinct index values. Flushed digests are deleted.
+    """
+    email = models.EmailField()
+    email_type = models.CharField(max_length=50, blank=True, default='')
+    digest_key = models.CharField(max_length=100)
+    flush_at = models.DateTimeField()
+    items = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.email} {self.email_type}/{self.digest_key}: {self.items} items at {self.flush_at}"
+
+    class Meta:
+        ordering = ['flush_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['email', 'email_type', 'digest_key'], name='unique_open_email_digest'),
+        ]
+        indexes = [
+            models.Index(fields=['flush_at', 'id'], name='emaildigest_flush_idx'),
+        ]
+
+
+class EmailDigestItem(models.Model):
+    """One distinct message of a digest; identical repeats only bump `occurrences`."""
+    digest = models.ForeignKey(EmailDigest, on_delete=models.CASCADE, related_name='entries')
+    fingerprint = models.CharField(max_length=64)
+    fields = models.JSONField(default=dict)
+    occurrences = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest_id}: {self.fields.get('subject')} x{self.occurrences}"
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['digest', 'fingerprint'], name='unique_email_digest_item'),
+        ]
+
+
+class EmailTemplate(models.Model):
+    """
+    One version of the templates of an email_type.
+
+    The highest active version is used; a blank `html` or `text` falls back to
+    the generic template for that part. A version's content is not meant to
+    change once saved: workers compile each version exactly once, after the
+    shared template version stamp (row count and latest `updated_at`) changes.
+    """
+    email_type = models.CharField(max_length=50)
+    version = models.PositiveIntegerField(blank=True)
+    html = models.TextField(blank=True, default='')
+    text = models.TextField(blank=True, default='')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.email_type} v{self.version}"
+
+    def save(self, *args, **kwargs):
+        if not self.version:
+            latest = EmailTemplate.objects.filter(email_type=self.email_type).aggregate(
+                latest=models.Max('version'))['latest']
+            self.version = (latest or 0) + 1
+        super().save(*args, **kwargs)
+        bump_template_version()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        bump_template_version()
+        return result
+
+    class Meta:
+        ordering = ['email_type', '-version']
+        constraints = [
+            models.UniqueConstraint(fields=['email_type', 'version'], name='unique_email_template_version'),
+        ]
 
 
 class EmailConfiguration(models.Model):
@@ -72,6 +372,7 @@ class EmailConfiguration(models.Model):
             raise ValidationError("Only one EmailConfiguration instance is allowed")
         
         super().save(*args, **kwargs)
+        bump_config_version()
 
     def get_brand_logo_url(self):
         """Get the brand logo URL, handling both relative and absolute paths"""
@@ -0,0 +1,125 @@
+# apps/email_service/outbox.py
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .broker_health import broker_breaker, publish_task
+from .models import EmailOutbox
+
+
+def add_to_outbox(task, args=None, kwargs=None, email_log=None, available_at=None, send_at=None,
+                  headers=None, retries=0):
+    """Persist a task message for later publication; call inside the EmailLog's transaction."""
+    return EmailOutbox.objects.create(
+        task_name=task.name,
+        args=list(args or []),
+        kwargs=dict(kwargs or {}),
+        email_log=email_log,
+        available_at=available_at or send_at or timezone.now(),
+        send_at=send_at,
+        headers=dict(headers or {}),
+        retries=retries,
+    )
+
+
+def schedule_task(task, send_at, args=None, kwargs=None, email_log=None, headers=None, retries=0):
+    """
+    Park `task` in the outbox until `send_at`; call inside the EmailLog's transaction.
+
+    Nothing reaches the broker before the drainer claims the row once it is
+    due, so a far-off send never sits unacked in a worker's prefetch buffer
+    the way a long Celery countdown does. `headers` and `retries` are
+    published with the message, so a parked task retry keeps its back-off
+    state and retry count.
+    """
+    return add_to_outbox(task, args=args, kwargs=kwargs, email_log=email_log, send_at=send_at,
+                         headers=headers, retries=retries)
+
+
+def dispatch_task(task, args=None, kwargs=None, email_log=None):
+    """
+    Publish `task` to the broker, or park it in the outbox when the broker is unavailable.
+
+    Returns the processing method: 'celery' or 'outbox'.
+    """
+    if publish_task(task, args=args, kwargs=kwargs):
+        return 'celery'
+    add_to_outbox(task, args=args, kwargs=kwargs, email_log=email_log)
+    return 'outbox'
+
+
+def claim_outbox_batch(batch_size=100, lease_seconds=None):
+    """
+    Claim up to `batch_size` due outbox entries.
+
+    Rows are locked with SKIP LOCKED where the database supports it so several
+    drainers never pick the same rows, then leased by pushing `available_at`
+    forward: a drainer that dies mid-batch simply lets the lease expire.
+    """
+    if lease_seconds is None:
+        lease_seconds = getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 60)
+    now = timezone.now()
+
+    with transaction.atomic():
+        queryset = EmailOutbox.objects.filter(available_at__lte=now).order_by('available_at', 'id')
+        if connection.features.has_select_for_update:
+            queryset = queryset.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            )
+        entries = list(queryset[:batch_size])
+        if entries:
+            EmailOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+                available_at=now + timedelta(seconds=lease_seconds),
+                attempts=F('attempts') + 1,
+            )
+    return entries
+
+
+def drain_outbox(batch_size=100, direct_fallback=False, lease_seconds=None):
+    """
+    Publish one batch of due outbox entries, including scheduled sends whose `send_at` has passed.
+
+    Entries are published through the broker circuit breaker, so publication
+    resumes by itself once the broker is reachable again. With
+    `direct_fallback` the task is executed in this process instead while the
+    broker is down.
+
+    Returns a dict with the claimed/published/executed/deferred counts.
+    """
+    counts = {'claimed': 0, 'published': 0, 'executed': 0, 'deferred': 0}
+    entries = claim_outbox_batch(batch_size=batch_size, lease_seconds=lease_seconds)
+    counts['claimed'] = len(entries)
+
+    for entry in entries:
+        task = current_app.tasks.get(entry.task_name)
+        if task is None:
+            EmailOutbox.objects.filter(id=entry.id).update(last_error=f"Unknown task: {entry.task_name}")
+            counts['deferred'] += 1
+            continue
+
+        # Latency is measured from when the request was accepted (or fell due), not from the drain
+        headers = dict(entry.headers, enqueued_at=(entry.send_at or entry.created_at).timestamp())
+        options = {'retries': entry.retries} if entry.retries else {}
+        if broker_breaker.is_available() and publish_task(task, args=entry.args, kwargs=entry.kwargs,
+                                                          headers=headers, **options):
+            entry.delete()
+            counts['published'] += 1
+        elif direct_fallback:
+            try:
+                task.apply(args=entry.args, kwargs=entry.kwargs, headers=headers, **options)
+            except Exception as e:
+                EmailOutbox.objects.filter(id=entry.id).update(last_error=str(e))
+                counts['deferred'] += 1
+                continue
+            entry.delete()
+            counts['executed'] += 1
+        else:
+            # Leave it leased; it becomes due again when the lease expires.
+            EmailOutbox.objects.filter(id=entry.id).update(last_error='Broker unavailable')
+            counts['deferred'] += 1
+
+    return counts
@@ -1,4 +1,12 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from drf_yasg import openapi
 
 
@@ -7,6 +15,111 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id).
+
+    Each page continues strictly after the (created_at, id) of the previous
+    page's last row, so it reads one index range of page_size + 1 rows
+    whatever its depth; there is no COUNT(*) and no OFFSET. The cursor is an
+    opaque base64 token holding that position and the scan direction.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size, descending=True):
+        self.page_size = page_size
+        self.descending = descending
+
+    def encode_cursor(self, row, reverse):
+        position = {'c': row.created_at.isoformat(), 'i': row.pk, 'r': int(reverse)}
+        token = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token.rstrip('='))
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return datetime.fromisoformat(position['c']), int(position['i']), bool(position['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        # A "previous" cursor scans backwards from the first row of the current page
+        scan_descending = self.descending != reverse
+        if scan_descending:
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            queryset = queryset.order_by('created_at', 'id')
+
+        if cursor:
+            created_at, pk, _ = cursor
+            op = 'lt' if scan_descending else 'gt'
+            # (created_at, id) < (c, i), written so the created_at bound is an index range
+            queryset = queryset.filter(
+                Q(**{f'created_at__{op}e': created_at}),
+                Q(**{f'created_at__{op}': created_at}) | Q(**{f'id__{op}': pk}),
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_url = None
+        self.previous_url = None
+        if rows:
+            if has_more or reverse:
+                self.next_url = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_url = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_url,
+            'previous': self.previous_url,
+            'results': data,
+        })
+
+
+class EmailLogPagination(CustomPagination):
+    """
+    Page-number pagination by default; keyset pagination on (created_at, id)
+    when the client opts in with `?pagination=cursor` or sends a `cursor`.
+
+    Keyset mode supports `ordering=-created_at` (default) and `ordering=created_at`.
+    """
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        return (request.query_params.get(self.mode_query_param) == 'cursor'
+                or KeysetPagination.cursor_query_param in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if not self.use_keyset(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        ordering = request.query_params.get('ordering', '-created_at')
+        if ordering not in ('created_at', '-created_at'):
+            raise ValidationError("Cursor pagination only supports ordering by 'created_at' or '-created_at'")
+        self.keyset = KeysetPagination(self.get_page_size(request), descending=ordering == '-created_at')
+        return self.keyset.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
 PAGINATION_PARAMS = [
     openapi.Parameter(
         'page',
@@ -19,5 +132,17 @@ PAGINATION_PARAMS = [
         openapi.IN_QUERY,
         description="Items per page (max: 100)",
         type=openapi.TYPE_INTEGER
+    ),
+    openapi.Parameter(
+        'pagination',
+        openapi.IN_QUERY,
+        description="Set to 'cursor' for keyset pagination (email logs only)",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'cursor',
+        openapi.IN_QUERY,
+        description="Opaque cursor from the 'next'/'previous' link of a cursor-paginated response",
+        type=openapi.TYPE_STRING
     )
 ]
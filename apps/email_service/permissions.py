@@ -1,13 +1,20 @@
 # apps/email_service/permissions.py
+import logging
+
 import jwt
 from rest_framework import permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.conf import settings
 
+from config.cache import verified_token_cache
+
+logger = logging.getLogger(__name__)
+
 class IsSuperuser(permissions.BasePermission):
     def has_permission(self, request, view):
-        print(f"Checking IsSuperuser: user={request.user}, authenticated={request.user.is_authenticated}, superuser={request.user.is_superuser}")
+        logger.debug("Checking IsSuperuser: user=%s, authenticated=%s, superuser=%s",
+                     request.user, request.user.is_authenticated, request.user.is_superuser)
         return request.user and request.user.is_authenticated and request.user.is_superuser
 
 class IsMicroserviceJWT(permissions.BasePermission):
@@ -16,80 +23,77 @@ class IsMicroserviceJWT(permissions.BasePermission):
     def has_permission(self, request, view):
         # Get the JWT token from microservice-specific header
         jwt_token = request.headers.get('Support-Microservice-Auth')
-        print(f"Microservice JWT: Received Support-Microservice-Auth header")
 
         if not jwt_token:
-            print("Missing Support-Microservice-Auth header")
+            logger.debug("Missing Support-Microservice-Auth header")
             raise AuthenticationFailed('Missing microservice authentication header')
 
         try:
             # Get the JWT secret from settings
             jwt_secret = settings.SUPPORT_JWT_SECRET_KEY
-            print(f"SUPPORT_JWT_SECRET_KEY configured: {bool(jwt_secret)}")
 
             if not jwt_secret:
-                print("SUPPORT_JWT_SECRET_KEY not configured in settings")
+                logger.error("SUPPORT_JWT_SECRET_KEY not configured in settings")
                 raise AuthenticationFailed('Microservice JWT secret key not configured')
 
-            # Decode and verify the JWT token
-            payload = jwt.decode(
-                jwt_token, 
-                jwt_secret, 
-                algorithms=['HS256'],
-                options={'verify_exp': True}
-            )
-            
-            print(f"Microservice JWT Payload: {payload}")
+            # Decode and verify the JWT token, unless it was already verified with this secret
+            payload = verified_token_cache.get('microservice', jwt_secret, jwt_token)
+            if payload is None:
+                payload = jwt.decode(
+                    jwt_token, 
+                    jwt_secret, 
+                    algorithms=['HS256'],
+                    options={'verify_exp': True}
+                )
+                verified_token_cache.set('microservice', jwt_secret, jwt_token, payload, payload.get('exp'))
             
             # Verify this is a microservice token
             if payload.get('type') != 'microservice':
-                print("Invalid microservice token type")
+                logger.info("Invalid microservice token type: %s", payload.get('type'))
                 raise AuthenticationFailed('Invalid microservice token type')
             
             # Store microservice info in request for logging
             request.microservice_name = payload.get('service', 'unknown')
-            print(f"Authenticated microservice: {request.microservice_name}")
-            
-            print("Microservice JWT Authentication successful")
+            logger.debug("Authenticated microservice: %s", request.microservice_name)
             return True
             
         except jwt.ExpiredSignatureError:
-            print("Microservice JWT token has expired")
+            logger.info("Microservice JWT token has expired")
             raise AuthenticationFailed('Microservice token has expired')
         except jwt.InvalidTokenError as e:
-            print(f"Invalid microservice JWT token: {str(e)}")
+            logger.info("Invalid microservice JWT token: %s", e)
             raise AuthenticationFailed(f'Invalid microservice token: {str(e)}')
         except Exception as e:
-            print(f"Microservice JWT Authentication failed: {str(e)}")
+            logger.warning("Microservice JWT Authentication failed: %s", e)
             raise AuthenticationFailed(f'Microservice authentication failed: {str(e)}')
 
 class AllowAnySendEmail(permissions.BasePermission):
     """Allow email sending with microservice JWT or superuser JWT."""
     
     def has_permission(self, request, view):
-        print(f"Checking AllowAnySendEmail for action: {view.action}")
+        logger.debug("Checking AllowAnySendEmail for action: %s", view.action)
         
-        if view.action == 'send_email':
+        if view.action in ('send_email', 'send_bulk_email'):
             # Try microservice authentication first
             try:
                 microservice_auth = IsMicroserviceJWT().has_permission(request, view)
                 if microservice_auth:
-                    print("AllowAnySendEmail: Authenticated via microservice JWT")
+                    logger.debug("AllowAnySendEmail: Authenticated via microservice JWT")
                     return True
             except AuthenticationFailed as e:
-                print(f"Microservice auth failed: {str(e)}")
+                logger.debug("Microservice auth failed: %s", e)
                 # Continue to try superuser auth
             
             # Try superuser authentication
             try:
                 superuser_auth = IsSuperuser().has_permission(request, view)
                 if superuser_auth:
-                    print("AllowAnySendEmail: Authenticated via superuser JWT")
+                    logger.debug("AllowAnySendEmail: Authenticated via superuser JWT")
                     return True
             except AuthenticationFailed as e:
-                print(f"Superuser auth failed: {str(e)}")
+                logger.debug("Superuser auth failed: %s", e)
             
-            print("AllowAnySendEmail: Both authentication methods failed")
+            logger.info("AllowAnySendEmail: Both authentication methods failed")
             return False
         
         # For other actions, only allow superusers
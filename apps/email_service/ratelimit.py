@@ -0,0 +1,194 @@
+# apps/email_service/ratelimit.py
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    'ENABLED': True,
+    # RATE is tokens refilled per second, BURST the bucket size
+    'SERVICE': {'RATE': 50.0, 'BURST': 200},
+    'RECIPIENT': {'RATE': 20 / 3600, 'BURST': 20},
+    # Per-service overrides of SERVICE, e.g. {'billing': {'RATE': 200, 'BURST': 1000}}
+    'SERVICE_OVERRIDES': {},
+    'MEMORY_BUCKETS': 10000,
+}
+
+KIND_SERVICE = 'service'
+KIND_RECIPIENT = 'recipient'
+
+
+def get_rate_limit_settings():
+    rate_limit_settings = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+    rate_limit_settings.update(getattr(settings, 'EMAIL_RATE_LIMITS', {}))
+    return rate_limit_settings
+
+
+def caller_scope(request):
+    """The calling microservice, or `user:<id>` for superuser requests."""
+    return getattr(request, 'microservice_name', None) or f"user:{getattr(request.user, 'id', '')}"
+
+
+def take_token(state, now, rate, burst, cost=1):
+    """
+    Token-bucket step: refill `state` = (tokens, updated_at) up to `now` and take `cost` tokens.
+
+    A cost above `burst` is allowed from a full bucket and leaves it in debt,
+    so a large batch is paced by the refill rate instead of never fitting.
+    Returns (allowed, new_state, retry_after_seconds).
+    """
+    tokens, updated_at = state if state is not None else (float(burst), now)
+    tokens = min(float(burst), tokens + max(now - updated_at, 0.0) * rate)
+    needed = min(cost, burst)
+    if tokens >= needed:
+        return True, (tokens - cost, now), 0.0
+    return False, (tokens, now), (needed - tokens) / rate if rate else math.inf
+
+
+def take_all_tokens(states, entries, now):
+    """
+    Take tokens from every bucket of `entries` = [(key, rate, burst, cost)], or from none.
+
+    `states` holds the current state of each bucket. Returns (index of the
+    first bucket short of tokens or None, retry_after_seconds, new states).
+    """
+    new_states = []
+    for index, (state, (key, rate, burst, cost)) in enumerate(zip(states, entries)):
+        allowed, new_state, retry_after = take_token(state, now, rate, burst, cost)
+        if not allowed:
+            return index, retry_after, None
+        new_states.append(new_state)
+    return None, 0.0, new_states
+
+
+class MemoryBucketStore:
+    """Per-process buckets; exact, bounded by LRU eviction."""
+
+    def __init__(self, maxsize):
+        self._buckets = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def take_all(self, entries, now):
+        with self._lock:
+            states = [self._buckets.get(key) for key, *_ in entries]
+            failed, retry_after, new_states = take_all_tokens(states, entries, now)
+            if failed is None:
+                for (key, *_), state in zip(entries, new_states):
+                    self._buckets[key] = state
+        return failed, retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in the Django cache, shared by every process using the same cache.
+
+    The read-modify-write is not atomic across processes, so concurrent
+    requests can overshoot a bucket slightly; a bucket left alone long enough
+    to refill completely simply expires.
+    """
+
+    def take_all(self, entries, now):
+        states = [cache.get(key) for key, *_ in entries]
+        failed, retry_after, new_states = take_all_tokens(states, entries, now)
+        if failed is None:
+            for (key, rate, burst, _), state in zip(entries, new_states):
+                cache.set(key, state, timeout=math.ceil((burst - state[0]) / rate) + 1 if rate else None)
+        return failed, retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets per calling service and per recipient.
+
+    Buckets live in the shared cache; when the cache is unreachable the limiter
+    falls back to per-process buckets rather than failing open or closed.
+    """
+    prefix = 'email_service:ratelimit'
+
+    def __init__(self):
+        self._memory = None
+        self._cache_store = CacheBucketStore()
+        self._cache_failed = False
+
+    @property
+    def memory(self):
+        if self._memory is None:
+            self._memory = MemoryBucketStore(get_rate_limit_settings()['MEMORY_BUCKETS'])
+        return self._memory
+
+    def limits_for(self, kind, identity):
+        rate_limit_settings = get_rate_limit_settings()
+        if kind == KIND_SERVICE:
+            return rate_limit_settings['SERVICE_OVERRIDES'].get(identity, rate_limit_settings['SERVICE'])
+        return rate_limit_settings['RECIPIENT']
+
+    def _key(self, kind, identity):
+        digest = hashlib.sha1(identity.encode()).hexdigest()
+        return f'{self.prefix}:{kind}:{digest}'
+
+    def take_all(self, buckets):
+        """
+        Take tokens from every (kind, identity, cost) bucket, or from none of them.
+
+        Returns None when the tokens were taken, else (bucket kind, retry_after_seconds)
+        of the first bucket short of tokens.
+        """
+        entries, kinds = [], []
+        for kind, identity, cost in buckets:
+            limits = self.limits_for(kind, identity)
+            if not limits or not limits.get('BURST'):
+                continue
+            entries.append((self._key(kind, identity), limits['RATE'], limits['BURST'], cost))
+            kinds.append(kind)
+        if not entries:
+            return None
+        now = time.time()
+        try:
+            failed, retry_after = self._cache_store.take_all(entries, now)
+            self._cache_failed = False
+        except Exception:
+            if not self._cache_failed:
+                logger.warning("Rate-limit cache unavailable; using per-process buckets", exc_info=True)
+                self._cache_failed = True
+            failed, retry_after = self.memory.take_all(entries, now)
+        return None if failed is None else (kinds[failed], retry_after)
+
+    def take(self, kind, identity, cost=1):
+        """Take `cost` tokens from a bucket; returns (allowed, retry_after_seconds)."""
+        limited = self.take_all([(kind, identity, cost)])
+        return (True, 0.0) if limited is None else (False, limited[1])
+
+    def check_send(self, scope, recipient):
+        """
+        Take one token from the caller's and the recipient's buckets, or none if either is empty.
+
+        Returns None when the send may go ahead, else (bucket kind, retry_after_seconds).
+        """
+        if not get_rate_limit_settings()['ENABLED']:
+            return None
+        return self.take_all([(KIND_SERVICE, scope, 1), (KIND_RECIPIENT, recipient.strip().lower(), 1)])
+
+    def check_bulk(self, scope, count):
+        """Take one token per recipient of a bulk send from the caller's bucket; same result as check_send."""
+        if not get_rate_limit_settings()['ENABLED'] or not count:
+            return None
+        return self.take_all([(KIND_SERVICE, scope, count)])
+
+    def reset(self):
+        if self._memory is not None:
+            self._memory.clear()
+        self._cache_failed = False
+
+
+rate_limiter = RateLimiter()
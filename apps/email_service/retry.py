@@ -0,0 +1,109 @@
+# apps/email_service/retry.py
+import random
+import re
+import smtplib
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+ERROR_CLASSES = (PERMANENT, TRANSIENT, THROTTLED)
+
+# Message header carrying the previous retry delay, which decorrelated jitter grows from
+RETRY_DELAY_HEADER = 'retry_delay'
+
+DEFAULT_RETRY_SETTINGS = {
+    'BASE_DELAY': {TRANSIENT: 30, THROTTLED: 300},
+    'MAX_DELAY': {TRANSIENT: 1800, THROTTLED: 3600},
+    'MAX_RETRIES': {PERMANENT: 0, TRANSIENT: 5, THROTTLED: 8},
+}
+
+# 4xx replies that mean "slow down" rather than "try again"
+THROTTLE_PATTERN = re.compile(r'\b4\.7\.\d+|rate|throttl|too many|try again later|quota', re.IGNORECASE)
+
+# Prefixes email_failure() gives errors that retrying cannot fix
+PERMANENT_ERROR_PREFIXES = ('Validation error', 'Template error', 'Configuration error')
+
+
+def get_retry_settings():
+    retry_settings = {key: dict(value) for key, value in DEFAULT_RETRY_SETTINGS.items()}
+    for key, value in getattr(settings, 'EMAIL_RETRY_POLICY', {}).items():
+        retry_settings.setdefault(key, {}).update(value)
+    return retry_settings
+
+
+def classify_smtp_reply(code, message=b''):
+    """Error class of an SMTP reply: 5xx permanent, throttling 4xx throttled, other 4xx transient."""
+    if isinstance(message, bytes):
+        message = message.decode('utf-8', 'replace')
+    if 500 <= code < 600:
+        return PERMANENT
+    if code == 421 or THROTTLE_PATTERN.search(message or ''):
+        return THROTTLED
+    return TRANSIENT
+
+
+def classify_exception(exc):
+    """Error class of an exception raised while preparing or sending an email."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        classes = {classify_smtp_reply(code, message) for code, message in exc.recipients.values()}
+        if classes <= {PERMANENT}:
+            return PERMANENT
+        return THROTTLED if THROTTLED in classes else TRANSIENT
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return classify_smtp_reply(exc.smtp_code, exc.smtp_error)
+    if isinstance(exc, (ValueError, FileNotFoundError, TemplateDoesNotExist, TemplateSyntaxError)):
+        return PERMANENT
+    if isinstance(exc, (smtplib.SMTPException, OSError)):
+        # Disconnects, refused connections and timeouts
+        return TRANSIENT
+    if isinstance(exc, RuntimeError):
+        # Missing configuration or a template that fails to render
+        return PERMANENT
+    return TRANSIENT
+
+
+def classify_result(result):
+    """Error class of a failed send_generic_email() result."""
+    if result.get('error_class') in ERROR_CLASSES:
+        return result['error_class']
+    if str(result.get('error') or '').startswith(PERMANENT_ERROR_PREFIXES):
+        return PERMANENT
+    return TRANSIENT
+
+
+class RetryPolicy:
+    """
+    Per error class retry caps and delays.
+
+    Delays use decorrelated jitter: each delay is drawn uniformly from
+    [base, 3 * previous delay] and capped, so retries from one outage spread
+    out instead of firing together. Permanent errors are not retried.
+    """
+
+    def __init__(self, base_delay, max_delay, max_retries, rng=None):
+        self.base_delay = dict(base_delay)
+        self.max_delay = dict(max_delay)
+        self.max_retries = dict(max_retries)
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_settings(cls, rng=None):
+        retry_settings = get_retry_settings()
+        return cls(retry_settings['BASE_DELAY'], retry_settings['MAX_DELAY'], retry_settings['MAX_RETRIES'], rng=rng)
+
+    def max_retries_for(self, error_class):
+        return self.max_retries.get(error_class, 0)
+
+    def should_retry(self, error_class, retries):
+        """Whether another attempt is allowed after `retries` retries have already run."""
+        return retries < self.max_retries_for(error_class)
+
+    def next_delay(self, error_class, previous=None):
+        """Seconds to wait before the next attempt, given the previous delay (if any)."""
+        base = self.base_delay.get(error_class, self.base_delay[TRANSIENT])
+        cap = self.max_delay.get(error_class, self.max_delay[TRANSIENT])
+        previous = max(float(previous or base), base)
+        return round(min(cap, self.rng.uniform(base, previous * 3)), 3)
@@ -0,0 +1,94 @@
+# apps/email_service/rollups.py
+from collections import Counter
+from datetime import timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncHour
+
+from .models import EmailLog, EmailStatsRollup
+
+
+def hour_bucket(value):
+    """Truncate an aware datetime to the start of its UTC hour."""
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Add {(hour, email_type, status): delta} to the rollup counters.
+
+    Each key is one UPDATE ... SET count = count + delta; a missing row is
+    created, falling back to the UPDATE if a concurrent writer created it first.
+    Call inside the transaction that changed the EmailLog rows.
+    """
+    for (hour, email_type, status), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = {'hour': hour, 'email_type': email_type or '', 'status': status}
+        if EmailStatsRollup.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                EmailStatsRollup.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            EmailStatsRollup.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def record_created(email_logs):
+    """Count newly created EmailLog instances (after create()/bulk_create())."""
+    deltas = Counter()
+    for email_log in email_logs:
+        deltas[(hour_bucket(email_log.created_at), email_log.email_type, email_log.status)] += 1
+    apply_rollup_deltas(deltas)
+
+
+def record_transitions(current, updates):
+    """
+    Move counts between statuses for logs about to be updated.
+
+    `current` maps email_log_id -> (status, email_type, created_at) as read
+    before the update; `updates` maps email_log_id -> {field: value}.
+    """
+    deltas = Counter()
+    for email_log_id, fields in updates.items():
+        if 'status' not in fields or email_log_id not in current:
+            continue
+        old_status, email_type, created_at = current[email_log_id]
+        if old_status == fields['status']:
+            continue
+        hour = hour_bucket(created_at)
+        deltas[(hour, email_type, old_status)] -= 1
+        deltas[(hour, email_type, fields['status'])] += 1
+    apply_rollup_deltas(deltas)
+
+
+def rebuild_rollups(since=None, until=None):
+    """
+    Recompute the rollups for logs created in [since, until) from EmailLog.
+
+    `since`/`until` should fall on hour boundaries so partially covered hours
+    are not replaced with partial counts. Returns the number of rollup rows written.
+    """
+    logs = EmailLog.objects.all()
+    rollups = EmailStatsRollup.objects.all()
+    if since is not None:
+        logs = logs.filter(created_at__gte=since)
+        rollups = rollups.filter(hour__gte=since)
+    if until is not None:
+        logs = logs.filter(created_at__lt=until)
+        rollups = rollups.filter(hour__lt=until)
+
+    rows = (
+        logs.annotate(bucket=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values('bucket', 'email_type', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = EmailStatsRollup.objects.bulk_create([
+            EmailStatsRollup(hour=row['bucket'], email_type=row['email_type'], status=row['status'], count=row['total'])
+            for row in rows.iterator()
+        ], batch_size=1000)
+    return len(created)
@@ -0,0 +1,39 @@
+# apps/email_service/routing.py
+from django.conf import settings
+
+LANE_PRIORITY = 'priority'
+LANE_DEFAULT = 'default'
+LANE_BULK = 'bulk'
+
+LANE_QUEUES = {
+    LANE_PRIORITY: 'email_priority',
+    LANE_DEFAULT: 'email_default',
+    LANE_BULK: 'email_bulk',
+}
+
+GENERIC_TASK = 'apps.email_service.tasks.send_generic_email_task'
+BULK_TASK = 'apps.email_service.tasks.send_bulk_email_task'
+
+
+def _normalize(value):
+    return (value or '').strip().lower()
+
+
+def lane_for(email_type=None, action=None):
+    """The lane a single email belongs to: 'priority' for time-critical types/actions, else 'default'."""
+    priority = getattr(settings, 'EMAIL_PRIORITY_LANE', {})
+    priority_types = {_normalize(value) for value in priority.get('EMAIL_TYPES', ())}
+    priority_actions = {_normalize(value) for value in priority.get('ACTIONS', ())}
+    if _normalize(email_type) in priority_types - {''} or _normalize(action) in priority_actions - {''}:
+        return LANE_PRIORITY
+    return LANE_DEFAULT
+
+
+def route_email_task(name, args, kwargs, options, task=None, **kw):
+    """Celery router (CELERY_TASK_ROUTES): pick the queue from the email's type and action."""
+    if name == BULK_TASK:
+        return {'queue': LANE_QUEUES[LANE_BULK]}
+    if name == GENERIC_TASK:
+        kwargs = kwargs or {}
+        return {'queue': LANE_QUEUES[lane_for(kwargs.get('email_type'), kwargs.get('action'))]}
+    return None
@@ -0,0 +1,138 @@
+# apps/email_service/search.py
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import EmailLog
+
+SEARCH_TERM_RE = re.compile(r'\w[\w@.+-]*', re.UNICODE)
+
+
+def search_terms(query):
+    """Split a free-text query into plain search terms, dropping any query syntax."""
+    return SEARCH_TERM_RE.findall(query or '')[:16]
+
+
+class SQLiteFTS5Backend:
+    """
+    FTS5 index over EmailLog stored as an external-content side table.
+
+    Triggers keep the side table in step with inserts, deletes and updates of
+    the searchable columns; status-only updates do not touch the index.
+    Results are ranked with bm25, weighting subject above message.
+    """
+    vendor = 'sqlite'
+    columns = ('email', 'subject', 'message', 'email_type', 'action')
+    weights = (4.0, 3.0, 1.0, 2.0, 2.0)
+
+    def __init__(self):
+        self.table = EmailLog._meta.db_table
+        self.fts_table = f'{self.table}_fts'
+
+    def install(self, connection):
+        columns = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{column}' for column in self.columns)
+        old_values = ', '.join(f'old.{column}' for column in self.columns)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.fts_table])
+            exists = cursor.fetchone() is not None
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5("
+                f"{columns}, content='{self.table}', content_rowid='id')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN "
+                f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN "
+                f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+                f"VALUES ('delete', old.id, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} ON {self.table} BEGIN "
+                f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) "
+                f"VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            if not exists:
+                cursor.execute(f"INSERT INTO {self.fts_table}({self.fts_table}) VALUES ('rebuild')")
+
+    def match_expression(self, terms):
+        # Every term must match, as a prefix so partial words still find results
+        return ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+    def filter(self, queryset, terms):
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # extra() gives a real join against the FTS table, so MATCH drives the
+        # query and bm25 is computed once per hit instead of once per row.
+        return queryset.extra(
+            tables=[self.fts_table],
+            where=[f"{self.fts_table}.rowid = {self.table}.id", f"{self.fts_table} MATCH %s"],
+            params=[self.match_expression(terms)],
+            # bm25 is lower-is-better; negate it so every backend ranks descending
+            select={'search_rank': f"-bm25({self.fts_table}, {weights})"},
+        )
+
+
+class PostgresSearchBackend:
+    """
+    Stored, generated tsvector column on EmailLog with a GIN index.
+
+    PostgreSQL maintains the column itself on every insert and update; results
+    are ranked with ts_rank over weighted recipient/type/action, subject and message.
+    """
+    vendor = 'postgresql'
+    config = 'simple'
+
+    def __init__(self):
+        self.table = EmailLog._meta.db_table
+
+    def install(self, connection):
+        config = self.config
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{config}', coalesce(email, '') || ' ' || coalesce(email_type, '') "
+                f"|| ' ' || coalesce(action, '')), 'A') || "
+                f"setweight(to_tsvector('{config}', coalesce(subject, '')), 'B') || "
+                f"setweight(to_tsvector('{config}', coalesce(message, '')), 'C')) STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_search_gin ON {self.table} USING GIN (search_vector)"
+            )
+
+    def filter(self, queryset, terms):
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        return queryset.annotate(
+            search_match=RawSQL(
+                f"{self.table}.search_vector @@ to_tsquery('{self.config}', %s)", [tsquery],
+                output_field=BooleanField(),
+            ),
+            search_rank=RawSQL(
+                f"ts_rank({self.table}.search_vector, to_tsquery('{self.config}', %s))", [tsquery],
+                output_field=FloatField(),
+            ),
+        ).filter(search_match=True)
+
+
+SEARCH_BACKENDS = {
+    SQLiteFTS5Backend.vendor: SQLiteFTS5Backend,
+    PostgresSearchBackend.vendor: PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """The full-text backend for the database alias, or None to fall back to SearchFilter."""
+    backend_class = SEARCH_BACKENDS.get(connections[using].vendor)
+    return backend_class() if backend_class else None
+
+
+def install_search_backend(sender=None, using='default', **kwargs):
+    """post_migrate receiver creating the full-text index, its triggers and the initial contents."""
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.install(connections[using])
@@ -1,7 +1,12 @@
 # apps/email_service/serializers.py
 import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import EmailLog, EmailConfiguration
+from .deadletter import get_dead_letter_settings
+from .models import EmailLog, EmailConfiguration, EmailSuppression
+from .retry import ERROR_CLASSES
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +19,9 @@ class EmailLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'email', 'email_type', 'subject', 'action', 
             'message', 'otp', 'link', 'link_text', 'status',
-            'created_at', 'sent_at', 'error'
+            'created_at', 'sent_at', 'error', 'attempts', 'error_class'
         ]
-        read_only_fields = ['id', 'created_at', 'sent_at', 'error']
+        read_only_fields = ['id', 'created_at', 'sent_at', 'error', 'attempts', 'error_class']
 
 
 class SendEmailSerializer(serializers.Serializer):
@@ -29,6 +34,11 @@ class SendEmailSerializer(serializers.Serializer):
     otp = serializers.CharField(max_length=10, required=False, allow_blank=True, allow_null=True)
     link = serializers.URLField(required=False, allow_blank=True, allow_null=True)
     link_text = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    # Opt-in digest mode: messages with the same digest_key are coalesced per recipient and email_type
+    digest_key = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    digest_window = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    # Deliver at this time instead of now; a time already passed sends immediately
+    send_at = serializers.DateTimeField(required=False, allow_null=True)
     
     def validate_user_email(self, value):
         """Validate email format"""
@@ -41,6 +51,14 @@ class SendEmailSerializer(serializers.Serializer):
         # Set default link_text if link is provided but link_text is empty
         if data.get('link') and not data.get('link_text'):
             data['link_text'] = 'Click Here'
+
+        send_at = data.get('send_at')
+        if send_at is not None:
+            if data.get('digest_key'):
+                raise serializers.ValidationError({'send_at': "send_at cannot be combined with digest_key"})
+            max_ahead = getattr(settings, 'EMAIL_SEND_AT_MAX_AHEAD_DAYS', 90)
+            if send_at > timezone.now() + timedelta(days=max_ahead):
+                raise serializers.ValidationError({'send_at': f"send_at can be at most {max_ahead} days ahead"})
         
         return data
     
@@ -50,13 +68,56 @@ class SendEmailSerializer(serializers.Serializer):
         validated_data = super().to_internal_value(data)
         
         # Only clean up empty strings to None for consistency
-        for field in ['email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text']:
+        for field in ['email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text', 'digest_key']:
             if field in validated_data and validated_data[field] == '':
                 validated_data[field] = None
         
         return validated_data
 
 
+class BulkRecipientSerializer(serializers.Serializer):
+    """A single recipient of a bulk send, with optional per-recipient template context"""
+
+    user_email = serializers.EmailField(required=True)
+    context = serializers.DictField(required=False, default=dict)
+
+    def validate_user_email(self, value):
+        return value.lower().strip()
+
+
+class BulkSendEmailSerializer(serializers.Serializer):
+    """Shared email fields plus the list of recipients for a bulk send"""
+
+    recipients = BulkRecipientSerializer(many=True, allow_empty=False)
+    email_type = serializers.CharField(max_length=50, required=False, allow_blank=True, allow_null=True)
+    subject = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    action = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    message = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    otp = serializers.CharField(max_length=10, required=False, allow_blank=True, allow_null=True)
+    link = serializers.URLField(required=False, allow_blank=True, allow_null=True)
+    link_text = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+
+    def validate_recipients(self, value):
+        max_recipients = getattr(settings, 'EMAIL_BULK_MAX_RECIPIENTS', 5000)
+        if len(value) > max_recipients:
+            raise serializers.ValidationError(f"At most {max_recipients} recipients are allowed per request")
+        return value
+
+    def validate(self, data):
+        if data.get('link') and not data.get('link_text'):
+            data['link_text'] = 'Click Here'
+        return data
+
+    def to_internal_value(self, data):
+        validated_data = super().to_internal_value(data)
+
+        for field in ['email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text']:
+            if field in validated_data and validated_data[field] == '':
+                validated_data[field] = None
+
+        return validated_data
+
+
 class EmailStatsSerializer(serializers.Serializer):
     """Serializer for email statistics"""
     
@@ -75,6 +136,103 @@ class EmailTypeStatsSerializer(serializers.Serializer):
     success_rate = serializers.FloatField(read_only=True)
 
 
+class EmailTimeSeriesQuerySerializer(serializers.Serializer):
+    """Query parameters of the email statistics time series"""
+
+    BUCKET_CHOICES = ['hour', 'day', 'week', 'month']
+
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=BUCKET_CHOICES, default='day')
+    email_type = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+    def validate(self, data):
+        data['until'] = data.get('until') or timezone.now()
+        data['since'] = data.get('since') or data['until'] - timedelta(days=7)
+        if data['since'] >= data['until']:
+            raise serializers.ValidationError("'since' must be earlier than 'until'")
+        max_points = getattr(settings, 'EMAIL_STATS_MAX_BUCKETS', 2000)
+        bucket_span = {'hour': timedelta(hours=1), 'day': timedelta(days=1),
+                       'week': timedelta(weeks=1), 'month': timedelta(days=28)}[data['bucket']]
+        if (data['until'] - data['since']) / bucket_span > max_points:
+            raise serializers.ValidationError(f"Range too large for '{data['bucket']}' buckets (max {max_points} points)")
+        return data
+
+
+class EmailTimeSeriesPointSerializer(serializers.Serializer):
+    """One bucket of the email statistics time series"""
+
+    bucket_start = serializers.DateTimeField(read_only=True)
+    total = serializers.IntegerField(read_only=True)
+    sent = serializers.IntegerField(read_only=True)
+    failed = serializers.IntegerField(read_only=True)
+    queued = serializers.IntegerField(read_only=True)
+    processing = serializers.IntegerField(read_only=True)
+
+
+class EmailUsageQuerySerializer(serializers.Serializer):
+    """Query parameters of the per-service usage endpoint"""
+
+    service = serializers.CharField(max_length=100, required=False)
+    since = serializers.DateField(required=False)
+    until = serializers.DateField(required=False)
+
+    def validate(self, data):
+        data['until'] = data.get('until') or timezone.localdate()
+        data['since'] = data.get('since') or data['until']
+        if data['since'] > data['until']:
+            raise serializers.ValidationError("'since' must not be later than 'until'")
+        return data
+
+
+class EmailSuppressionSerializer(serializers.ModelSerializer):
+    """Serializer for EmailSuppression model"""
+
+    class Meta:
+        model = EmailSuppression
+        fields = ['email', 'scope', 'reason', 'source', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class SuppressionChangeSerializer(serializers.Serializer):
+    """Addresses to suppress or release, for every email type or a single email_type"""
+
+    emails = serializers.ListField(child=serializers.EmailField(), min_length=1, max_length=1000)
+    scope = serializers.CharField(max_length=50, required=False)
+    reason = serializers.ChoiceField(choices=EmailSuppression.REASON_CHOICES, default=EmailSuppression.REASON_MANUAL)
+
+
+class EmailStatusLookupSerializer(serializers.Serializer):
+    """Email log ids whose delivery status is polled in one request"""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1)
+
+    def validate_ids(self, value):
+        max_ids = getattr(settings, 'EMAIL_STATUS_LOOKUP_MAX_IDS', 5000)
+        if len(value) > max_ids:
+            raise serializers.ValidationError(f"At most {max_ids} ids are allowed per request")
+        # Sorted and unique, so the same set of ids always yields the same map and ETag
+        return sorted(set(value))
+
+
+class DeadLetterReplaySerializer(serializers.Serializer):
+    """Filters selecting the dead letters to replay"""
+
+    email_type = serializers.CharField(max_length=50, required=False)
+    error_class = serializers.ChoiceField(choices=ERROR_CLASSES, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if data.get('since') and data.get('until') and data['since'] >= data['until']:
+            raise serializers.ValidationError("'since' must be earlier than 'until'")
+        max_letters = get_dead_letter_settings()['REPLAY_MAX_PER_REQUEST']
+        data['limit'] = min(data.get('limit') or max_letters, max_letters)
+        return data
+
+
 class EmailConfigurationSerializer(serializers.ModelSerializer):
     """Serializer for EmailConfiguration model"""
 
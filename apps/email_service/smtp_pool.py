@@ -0,0 +1,353 @@
+# apps/email_service/smtp_pool.py
+import os
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from .config_cache import get_config_snapshot
+
+DEFAULT_POOL_SETTINGS = {
+    'MAX_SIZE': 4,
+    'MAX_MESSAGES_PER_CONNECTION': 100,
+    'MAX_IDLE_SECONDS': 60,
+    'HEALTH_CHECK_AFTER_SECONDS': 10,
+    'CHECKOUT_TIMEOUT': 30,
+    'TIMEOUT': 10,
+    # (host, port) of a plain SMTP server every pooled connection goes to instead, e.g. a local sink
+    'SERVER': None,
+}
+
+
+# Per-message SMTP errors after which smtplib has already issued RSET.
+MESSAGE_REJECTED_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+def get_pool_settings():
+    pool_settings = dict(DEFAULT_POOL_SETTINGS)
+    pool_settings.update(getattr(settings, 'EMAIL_SMTP_POOL', {}))
+    return pool_settings
+
+
+def smtp_params_from_snapshot(snapshot, timeout=None, server=None):
+    """
+    Connection parameters for the pool.
+
+    An explicit `server` (host, port) wins; then the SMTP fields stored on
+    EmailConfiguration when `smtp_host` is set; otherwise the EMAIL_* settings
+    are used through the configured backend.
+    """
+    if server:
+        host, port = server
+        return {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': host,
+            'port': port,
+            'username': None,
+            'password': None,
+            'use_tls': False,
+            'use_ssl': False,
+            'timeout': timeout,
+        }
+    if snapshot.smtp_host:
+        return {
+            'backend': snapshot.email_backend or settings.EMAIL_BACKEND,
+            'host': snapshot.smtp_host,
+            'port': snapshot.smtp_port,
+            'username': snapshot.smtp_username or None,
+            'password': snapshot.smtp_password or None,
+            'use_tls': snapshot.smtp_use_tls and not snapshot.smtp_use_ssl,
+            'use_ssl': snapshot.smtp_use_ssl,
+            'timeout': timeout,
+        }
+    return {'backend': settings.EMAIL_BACKEND, 'timeout': timeout}
+
+
+class PooledConnection:
+    __slots__ = ('backend', 'created_at', 'last_used', 'messages_sent')
+
+    def __init__(self, backend):
+        now = time.monotonic()
+        self.backend = backend
+        self.created_at = now
+        self.last_used = now
+        self.messages_sent = 0
+
+    def is_alive(self):
+        smtp = getattr(self.backend, 'connection', None)
+        if smtp is None:
+            # Non-SMTP backends (locmem, console, ...) have nothing to probe.
+            return True
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.backend.close()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    """
+    Per-process pool of open email backend connections.
+
+    Connections are reused LIFO so the warmest TLS session is handed out first,
+    probed with NOOP when they have been idle for a while, recycled after
+    MAX_MESSAGES_PER_CONNECTION messages and transparently re-opened when the
+    server drops them.
+    """
+
+    def __init__(self, params, max_size=4, max_messages_per_connection=100, max_idle_seconds=60,
+                 health_check_after_seconds=10, checkout_timeout=30):
+        self.params = dict(params)
+        self.max_size = max_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._metrics = {
+            'created': 0,
+            'reused': 0,
+            'closed': 0,
+            'recycled': 0,
+            'expired': 0,
+            'health_check_failures': 0,
+            'reconnects': 0,
+            'messages_sent': 0,
+            'checkout_waits': 0,
+        }
+
+    @classmethod
+    def from_settings(cls, params):
+        pool_settings = get_pool_settings()
+        return cls(
+            params,
+            max_size=pool_settings['MAX_SIZE'],
+            max_messages_per_connection=pool_settings['MAX_MESSAGES_PER_CONNECTION'],
+            max_idle_seconds=pool_settings['MAX_IDLE_SECONDS'],
+            health_check_after_seconds=pool_settings['HEALTH_CHECK_AFTER_SECONDS'],
+            checkout_timeout=pool_settings['CHECKOUT_TIMEOUT'],
+        )
+
+    def _open(self):
+        params = dict(self.params)
+        backend_path = params.pop('backend')
+        backend = get_connection(backend=backend_path, fail_silently=False, **params)
+        backend.open()
+        return PooledConnection(backend)
+
+    def _discard(self, conn, metric='closed'):
+        conn.close()
+        with self._condition:
+            self._metrics[metric] += 1
+
+    def acquire(self):
+        """Check out a healthy connection, opening a new one if the pool has room."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._condition:
+                conn = self._idle.pop() if self._idle else None
+                if conn is None and self._in_use >= self.max_size:
+                    self._metrics['checkout_waits'] += 1
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise TimeoutError("Timed out waiting for a pooled SMTP connection")
+                    continue
+                self._in_use += 1
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._condition:
+                    self._metrics['created'] += 1
+                return conn
+
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.max_idle_seconds:
+                self._discard(conn, 'expired')
+            elif idle_for > self.health_check_after_seconds and not conn.is_alive():
+                self._discard(conn, 'health_check_failures')
+            else:
+                with self._condition:
+                    self._metrics['reused'] += 1
+                return conn
+            # Give the slot back and try the next idle connection (or a fresh one).
+            self._release_slot()
+
+    def _release_slot(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, closing it if broken or worn out."""
+        conn.last_used = time.monotonic()
+        if discard:
+            self._discard(conn)
+        elif conn.messages_sent >= self.max_messages_per_connection:
+            self._discard(conn, 'recycled')
+        else:
+            with self._condition:
+                if not self._closed:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+        self._release_slot()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a PooledConnection for several sends."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def send_on(self, conn, messages):
+        """Send `messages` over an already checked-out connection."""
+        sent = conn.backend.send_messages(messages) or 0
+        conn.messages_sent += sent
+        with self._condition:
+            self._metrics['messages_sent'] += sent
+        return sent
+
+    def send_messages(self, messages):
+        """
+        Send `messages` over a pooled connection.
+
+        A connection the server has silently dropped is replaced once before
+        the error is propagated.
+        """
+        conn = self.acquire()
+        try:
+            sent = self.send_on(conn, messages)
+        except smtplib.SMTPServerDisconnected:
+            self.release(conn, discard=True)
+            with self._condition:
+                self._metrics['reconnects'] += 1
+            conn = self.acquire()
+            try:
+                sent = self.send_on(conn, messages)
+            except Exception:
+                self.release(conn, discard=True)
+                raise
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+        return sent
+
+    def send_each(self, messages):
+        """
+        Send each message separately over one pooled connection.
+
+        Returns a list aligned with `messages` holding None for delivered
+        messages and the exception for the others, so one bad recipient does
+        not fail the whole batch. A dropped connection is replaced and the
+        message retried once. Any other error (a timeout, a failed reconnect or
+        checkout) ends the batch: that message and the ones after it get the
+        exception, and the messages already delivered keep their None.
+        """
+        results = []
+        conn = None
+        try:
+            conn = self.acquire()
+            for message in messages:
+                for attempt in (1, 2):
+                    try:
+                        self.send_on(conn, [message])
+                        results.append(None)
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        self.release(conn, discard=True)
+                        conn = None
+                        with self._condition:
+                            self._metrics['reconnects'] += 1
+                        conn = self.acquire()
+                        if attempt == 2:
+                            results.append(e)
+                    except MESSAGE_REJECTED_ERRORS as e:
+                        # The server answered and reset the transaction; the connection is still usable.
+                        results.append(e)
+                        break
+        except Exception as e:
+            if conn is not None:
+                self.release(conn, discard=True)
+            results.extend([e] * (len(messages) - len(results)))
+            return results
+        self.release(conn)
+        return results
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._condition:
+            return dict(self._metrics, idle=len(self._idle), in_use=self._in_use, max_size=self.max_size)
+
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+def get_smtp_pool():
+    """
+    Return this process' SMTP pool, rebuilding it after a fork or when the
+    cached EmailConfiguration snapshot points at a different server.
+    """
+    global _pool, _pool_pid
+    pool_settings = get_pool_settings()
+    params = smtp_params_from_snapshot(get_config_snapshot(), timeout=pool_settings['TIMEOUT'],
+                                       server=pool_settings['SERVER'])
+    pid = os.getpid()
+
+    pool = _pool
+    if pool is not None and _pool_pid == pid and pool.params == params:
+        return pool
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == pid and _pool.params == params:
+            return _pool
+        stale = _pool if _pool_pid == pid else None
+        _pool = SMTPConnectionPool.from_settings(params)
+        _pool_pid = pid
+    if stale is not None:
+        stale.close()
+    return _pool
+
+
+def reset_smtp_pool():
+    """Close and forget this process' pool."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, _pool, _pool_pid = _pool, None, None
+    if pool is not None:
+        pool.close()
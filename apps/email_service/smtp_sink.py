@@ -0,0 +1,120 @@
+# apps/email_service/smtp_sink.py
+import socketserver
+import threading
+import time
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: accepts every message and keeps only counters."""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        sink = self.server.sink
+        sink._connection_opened()
+        messages_on_connection = 0
+        self._reply('220 localhost SMTP sink ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.wfile.write(b'250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif verb == 'HELO':
+                self._reply('250 localhost')
+            elif verb in ('MAIL', 'RSET'):
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[-1].strip().strip('<>').lower()
+                if address in sink.rejected_recipients:
+                    self._reply('550 5.1.1 Mailbox unavailable')
+                else:
+                    self._reply('250 OK')
+            elif verb == 'NOOP':
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink._message_received(size)
+                messages_on_connection += 1
+                self._reply('250 OK: queued')
+                if sink.disconnect_after and messages_on_connection >= sink.disconnect_after:
+                    return
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LocalSMTPSink:
+    """
+    In-process SMTP server that swallows messages, for tests and benchmarks.
+
+    `latency` adds a fixed delay per accepted message to stand in for a real relay.
+
+    Usage:
+        with LocalSMTPSink() as sink:
+            ... send to ('127.0.0.1', sink.port) ...
+            sink.messages_received
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, disconnect_after=None, rejected_recipients=(), latency=0.0):
+        self.host = host
+        self.latency = latency
+        self.disconnect_after = disconnect_after
+        self.rejected_recipients = {address.lower() for address in rejected_recipients}
+        self.messages_received = 0
+        self.bytes_received = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingSMTPServer((host, port), _SMTPSinkHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def _connection_opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def _message_received(self, size):
+        with self._lock:
+            self.messages_received += 1
+            self.bytes_received += size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,199 @@
+# apps/email_service/status_buffer.py
+import atexit
+import logging
+import threading
+import time
+
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import EmailLog
+from .rollups import record_transitions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_SETTINGS = {
+    'WRITE_BEHIND': True,
+    'MAX_SIZE': 200,
+    'MAX_DELAY': 1.0,
+}
+
+
+def get_buffer_settings():
+    buffer_settings = dict(DEFAULT_BUFFER_SETTINGS)
+    buffer_settings.update(getattr(settings, 'EMAIL_STATUS_BUFFER', {}))
+    return buffer_settings
+
+
+def write_status_updates(updates):
+    """
+    Apply {email_log_id: {field: value}} in as few queries as possible.
+
+    Updates touching the same set of fields are written together with one
+    bulk_update per group. Status changes are applied to the hourly stats
+    rollups in the same transaction.
+    """
+    groups = {}
+    for email_log_id, fields in updates.items():
+        groups.setdefault(tuple(sorted(fields)), []).append(EmailLog(id=email_log_id, **fields))
+
+    status_ids = [email_log_id for email_log_id, fields in updates.items() if 'status' in fields]
+    batch_size = get_buffer_settings()['MAX_SIZE']
+    with transaction.atomic():
+        if status_ids:
+            current = {
+                email_log_id: (status, email_type, created_at)
+                for email_log_id, status, email_type, created_at in EmailLog.objects.select_for_update()
+                .filter(id__in=status_ids).values_list('id', 'status', 'email_type', 'created_at')
+            }
+            record_transitions(current, updates)
+        for field_names, email_logs in groups.items():
+            EmailLog.objects.bulk_update(email_logs, list(field_names), batch_size=batch_size)
+
+
+class EmailStatusBuffer:
+    """
+    Write-behind buffer of EmailLog status transitions for Celery workers.
+
+    Transitions for the same log coalesce (queued -> processing -> sent becomes
+    a single write) and are flushed with bulk_update once MAX_SIZE logs are
+    pending or the oldest pending transition is MAX_DELAY seconds old. Pending
+    transitions are flushed when the worker process shuts down.
+    """
+
+    def __init__(self, max_size=None, max_delay=None):
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._pending = {}
+        self._oldest_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._enabled = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {'recorded': 0, 'coalesced': 0, 'flushes': 0, 'rows_written': 0, 'flush_errors': 0}
+
+    @property
+    def max_size(self):
+        return self._max_size if self._max_size is not None else get_buffer_settings()['MAX_SIZE']
+
+    @property
+    def max_delay(self):
+        return self._max_delay if self._max_delay is not None else get_buffer_settings()['MAX_DELAY']
+
+    @property
+    def enabled(self):
+        return self._enabled and get_buffer_settings()['WRITE_BEHIND']
+
+    def enable(self, start_flusher=True):
+        """Turn buffering on for this process (called when a worker process starts)."""
+        self._enabled = True
+        if start_flusher and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_flusher, name='email-status-flusher', daemon=True)
+            self._thread.start()
+
+    def disable(self):
+        """Flush what is pending and go back to synchronous writes."""
+        self._enabled = False
+        self._stop.set()
+        self.flush()
+
+    def record(self, email_log_id, **fields):
+        with self._lock:
+            entry = self._pending.get(email_log_id)
+            if entry is None:
+                self._pending[email_log_id] = dict(fields)
+                if self._oldest_at is None:
+                    self._oldest_at = time.monotonic()
+            else:
+                entry.update(fields)
+                self._metrics['coalesced'] += 1
+            self._metrics['recorded'] += 1
+            due = len(self._pending) >= self.max_size
+
+        if due:
+            self.flush()
+
+    def _is_stale(self):
+        with self._lock:
+            return self._oldest_at is not None and time.monotonic() - self._oldest_at >= self.max_delay
+
+    def flush(self):
+        """Write every pending transition; on failure they are kept for the next flush."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._oldest_at = None
+            if not pending:
+                return 0
+
+            try:
+                write_status_updates(pending)
+            except Exception:
+                logger.exception("Failed to flush %d EmailLog status updates", len(pending))
+                with self._lock:
+                    self._metrics['flush_errors'] += 1
+                    # Newer transitions recorded during the failed flush win.
+                    for email_log_id, fields in pending.items():
+                        self._pending[email_log_id] = {**fields, **self._pending.get(email_log_id, {})}
+                    if self._oldest_at is None:
+                        self._oldest_at = time.monotonic()
+                return 0
+
+            with self._lock:
+                self._metrics['flushes'] += 1
+                self._metrics['rows_written'] += len(pending)
+            return len(pending)
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.max_delay / 2 or 0.1):
+            if self._is_stale():
+                self.flush()
+                close_old_connections()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, pending=len(self._pending), enabled=self.enabled)
+
+
+status_buffer = EmailStatusBuffer()
+
+
+def update_email_status(email_log_id, status, **fields):
+    """
+    Record an EmailLog status transition.
+
+    Inside a Celery worker with write-behind enabled the transition is buffered
+    and coalesced; everywhere else (or with EMAIL_STATUS_BUFFER['WRITE_BEHIND']
+    off) it is written immediately.
+    """
+    if status_buffer.enabled:
+        status_buffer.record(email_log_id, status=status, **fields)
+    else:
+        write_status_updates({email_log_id: dict(fields, status=status)})
+
+
+def update_email_statuses(updates):
+    """Record many transitions given as {email_log_id: {'status': ..., **fields}}."""
+    if status_buffer.enabled:
+        for email_log_id, fields in updates.items():
+            status_buffer.record(email_log_id, **fields)
+    elif updates:
+        write_status_updates(updates)
+
+
+@worker_init.connect
+@worker_process_init.connect
+def _enable_status_buffer(**kwargs):
+    status_buffer.enable()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _flush_status_buffer(**kwargs):
+    status_buffer.flush()
+
+
+atexit.register(status_buffer.flush)
@@ -0,0 +1,203 @@
+# apps/email_service/suppression.py
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import EmailSuppression
+
+DEFAULT_SUPPRESSION_SETTINGS = {
+    'ENABLED': True,
+    # Sizing of the Bloom filter; it is rebuilt larger once the table outgrows it
+    'EXPECTED_ENTRIES': 100000,
+    'FALSE_POSITIVE_RATE': 0.001,
+    # Seconds between incremental syncs from the table, and between full rebuilds (which drop removed rows)
+    'REFRESH_INTERVAL': 30,
+    'REBUILD_INTERVAL': 3600,
+    # Rows committed late by a long transaction can carry an older updated_at; re-read this many seconds
+    'SYNC_OVERLAP': 60,
+    'IMPORT_BATCH_SIZE': 500,
+}
+
+
+def get_suppression_settings():
+    suppression_settings = dict(DEFAULT_SUPPRESSION_SETTINGS)
+    suppression_settings.update(getattr(settings, 'EMAIL_SUPPRESSION', {}))
+    return suppression_settings
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def _member(email, scope):
+    return f'{scope}\x00{email}'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives, about `error_rate` false positives at `capacity`."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        # Re-adding an item (or a false positive) leaves the bits and the count unchanged
+        if item in self:
+            return
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SuppressionList:
+    """
+    Process-local Bloom filter in front of EmailSuppression.
+
+    A negative answer from the filter is definitive, so the common case costs
+    a few hash probes; only filter hits are confirmed against the table. Rows
+    added since the last sync are folded in every REFRESH_INTERVAL seconds.
+    Removed rows cannot be cleared from a Bloom filter and stay as false
+    positives (resolved by the table) until the next full rebuild.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_through = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _build(self, suppression_settings):
+        capacity = max(suppression_settings['EXPECTED_ENTRIES'], EmailSuppression.objects.count() * 2)
+        bloom = BloomFilter(capacity, suppression_settings['FALSE_POSITIVE_RATE'])
+        synced_through = EmailSuppression.objects.aggregate(latest=Max('updated_at'))['latest']
+        for email, scope in EmailSuppression.objects.values_list('email', 'scope').iterator(chunk_size=5000):
+            bloom.add(_member(email, scope))
+        self._filter, self._synced_through = bloom, synced_through
+        self._built_at = time.monotonic()
+
+    def _sync(self, suppression_settings):
+        rows = EmailSuppression.objects.order_by()
+        if self._synced_through is not None:
+            rows = rows.filter(
+                updated_at__gte=self._synced_through - timedelta(seconds=suppression_settings['SYNC_OVERLAP'])
+            )
+        for email, scope, updated_at in rows.values_list('email', 'scope', 'updated_at').iterator(chunk_size=5000):
+            self._filter.add(_member(email, scope))
+            if self._synced_through is None or updated_at > self._synced_through:
+                self._synced_through = updated_at
+
+    def refresh(self, force=False):
+        """Bring the filter up to date with the table: a full rebuild when due, else only recent rows."""
+        suppression_settings = get_suppression_settings()
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._filter is not None and now - self._synced_at < suppression_settings['REFRESH_INTERVAL']:
+                return
+            rebuild_due = now - self._built_at >= suppression_settings['REBUILD_INTERVAL']
+            if force or self._filter is None or rebuild_due or self._filter.count > self._filter.capacity:
+                self._build(suppression_settings)
+            else:
+                self._sync(suppression_settings)
+            self._synced_at = now
+
+    def _candidates(self, emails, email_type):
+        """Addresses the filter cannot rule out for `email_type`."""
+        self.refresh()
+        scopes = [EmailSuppression.SCOPE_ALL] + ([email_type] if email_type else [])
+        bloom = self._filter
+        return {email for email in emails if any(_member(email, scope) in bloom for scope in scopes)}
+
+    def suppressed(self, emails, email_type=None):
+        """
+        {address: EmailSuppression} for those of `emails` suppressed for `email_type`, keyed lower-cased.
+
+        The table is read only for filter hits, with a single IN query.
+        """
+        if not get_suppression_settings()['ENABLED']:
+            return {}
+        candidates = self._candidates({normalize_email(email) for email in emails}, email_type)
+        if not candidates:
+            return {}
+        scopes = [EmailSuppression.SCOPE_ALL] + ([email_type] if email_type else [])
+        matches = {}
+        for suppression in EmailSuppression.objects.filter(email__in=candidates, scope__in=scopes):
+            matches.setdefault(suppression.email, suppression)
+        return matches
+
+    def lookup(self, email, email_type=None):
+        """The EmailSuppression blocking `email` for `email_type`, or None."""
+        return self.suppressed([email], email_type).get(normalize_email(email))
+
+    def add(self, emails, scope):
+        """Put rows just written by this process into the filter without waiting for the next sync."""
+        with self._lock:
+            if self._filter is not None:
+                for email in emails:
+                    self._filter.add(_member(email, scope))
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._synced_through = None
+            self._synced_at = self._built_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            bloom = self._filter
+            return {
+                'entries': bloom.count if bloom else 0,
+                'capacity': bloom.capacity if bloom else 0,
+                'bits': bloom.size if bloom else 0,
+                'hashes': bloom.hashes if bloom else 0,
+                'synced_through': self._synced_through,
+            }
+
+
+suppression_list = SuppressionList()
+
+
+def suppressed_error(suppression):
+    """The error stored on an EmailLog whose recipient turned out to be suppressed."""
+    return f"Recipient suppressed: {suppression.reason}"
+
+
+def suppress(emails, scope=EmailSuppression.SCOPE_ALL, reason=EmailSuppression.REASON_MANUAL, source=''):
+    """Add or update suppressions for `emails` in `scope`; returns the number of distinct addresses written."""
+    emails = sorted({normalize_email(email) for email in emails if normalize_email(email)})
+    if not emails:
+        return 0
+    EmailSuppression.objects.bulk_create(
+        [EmailSuppression(email=email, scope=scope, reason=reason, source=source) for email in emails],
+        update_conflicts=True,
+        unique_fields=['email', 'scope'],
+        update_fields=['reason', 'source', 'updated_at'],
+    )
+    suppression_list.add(emails, scope)
+    return len(emails)
+
+
+def unsuppress(emails, scope=None):
+    """Delete suppressions for `emails`, in one scope or all of them; returns the number of rows removed."""
+    rows = EmailSuppression.objects.filter(email__in={normalize_email(email) for email in emails})
+    if scope is not None:
+        rows = rows.filter(scope=scope)
+    return rows.delete()[0]
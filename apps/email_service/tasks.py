@@ -1,16 +1,84 @@
 # apps/email_service/tasks.py
-from celery import shared_task, current_app
-from .utils import send_generic_email
+from celery import shared_task
+from celery.exceptions import Retry
+from django.conf import settings
+from .utils import (
+    send_generic_email,
+    validate_recipient,
+    build_email_context,
+    render_email,
+    build_email_message,
+    email_failure,
+)
+from .smtp_pool import MESSAGE_REJECTED_ERRORS, get_smtp_pool
+from .broker_health import broker_breaker
+from .deadletter import record_dead_letter
 from .models import EmailLog
+from .outbox import schedule_task
+from .metrics import (
+    STAGE_DB,
+    STAGE_TOTAL,
+    message_header,
+    observe_stage,
+    record_lane_latency,
+    record_queue_wait,
+    stage_timer,
+)
+from .retry import PERMANENT, RETRY_DELAY_HEADER, RetryPolicy, classify_exception, classify_result
+from .rollups import record_created
+from .routing import LANE_BULK, lane_for
+from .status_buffer import update_email_status, update_email_statuses
+from .suppression import normalize_email, suppressed_error, suppression_list
+from django.db import transaction
 from django.utils import timezone
-from typing import Dict, Any, Optional
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+import json
+import time
+
+# Fields a bulk recipient's context may override; any other context key is passed to the template.
+BULK_OVERRIDABLE_FIELDS = ('subject', 'action', 'message', 'otp', 'link', 'link_text')
+
+def create_email_log(**fields):
+    """Create an EmailLog and count it in the hourly stats rollups."""
+    with transaction.atomic():
+        email_log = EmailLog.objects.create(**fields)
+        record_created([email_log])
+    return email_log
+
+def retry_with_policy(task, policy, error_class, exc, args=None, kwargs=None):
+    """
+    Re-enqueue `task` after the policy's jittered delay for `error_class`.
+
+    The delay travels in a message header so the next attempt can grow from it;
+    `enqueued_at` is moved to when the retry becomes due so lane latency does not
+    count the back-off. `args`/`kwargs` replace the task's arguments for the
+    retry. Use as `raise retry_with_policy(...)`.
+
+    A delay longer than EMAIL_RETRY_OUTBOX_DELAY seconds is parked in the
+    outbox until due instead of a Celery countdown, which would hold the
+    message unacked in a worker's prefetch buffer for the whole back-off.
+    """
+    delay = policy.next_delay(error_class, message_header(task.request, RETRY_DELAY_HEADER))
+    if delay > getattr(settings, 'EMAIL_RETRY_OUTBOX_DELAY', 60):
+        schedule_task(task, timezone.now() + timedelta(seconds=delay),
+                      args=task.request.args if args is None else args,
+                      kwargs=task.request.kwargs if kwargs is None else kwargs,
+                      headers={RETRY_DELAY_HEADER: delay}, retries=task.request.retries + 1)
+        return Retry(exc=exc, when=delay)
+    headers = dict(task.request.headers or {}, **{RETRY_DELAY_HEADER: delay, 'enqueued_at': time.time() + delay})
+    return task.retry(args=args, kwargs=kwargs, exc=exc, countdown=delay,
+                      max_retries=policy.max_retries_for(error_class), headers=headers)
+
+def final_error(error, error_class):
+    """The error stored once no further attempt will be made."""
+    if error_class == PERMANENT:
+        return f"Permanent failure: {error}"
+    return f"Max retries exceeded: {error}"
 
 def is_celery_healthy():
-    try:
-        current_app.connection().ensure_connection(max_retries=0)
-        return True
-    except Exception:
-        return False
+    """Cached broker health from the circuit breaker; never opens a broker connection."""
+    return broker_breaker.is_available()
 
 def send_direct_email(
     user_email: str,
@@ -43,16 +111,13 @@ def send_direct_email(
     Returns:
         Dict containing status, email_log_id, and error details if applicable
     """
-    start_time = timezone.now()
-    email_log = None
+    started = time.perf_counter()
     
     try:
-        # Get or create email log
-        if email_log_id:
-            try:
-                email_log = EmailLog.objects.get(id=email_log_id)
-            except EmailLog.DoesNotExist:
-                email_log = EmailLog.objects.create(
+        # Create the email log only when the caller did not already do so
+        if not email_log_id:
+            with stage_timer(STAGE_DB, email_type):
+                email_log_id = create_email_log(
                     email=user_email,
                     email_type=email_type,
                     subject=subject,
@@ -62,19 +127,7 @@ def send_direct_email(
                     link=link,
                     link_text=link_text,
                     status='processing'
-                )
-        else:
-            email_log = EmailLog.objects.create(
-                email=user_email,
-                email_type=email_type,
-                subject=subject,
-                action=action,
-                message=message,
-                otp=otp,
-                link=link,
-                link_text=link_text,
-                status='processing'
-            )
+                ).id
         
         # Send email using the utility function
         result = send_generic_email(
@@ -91,23 +144,22 @@ def send_direct_email(
         
         # Update log based on result
         if result['status'] == 'success':
-            email_log.status = 'sent'
-            email_log.sent_at = timezone.now()
-            email_log.save(update_fields=['status', 'sent_at'])
+            with stage_timer(STAGE_DB, email_type):
+                update_email_status(email_log_id, 'sent', sent_at=timezone.now(), attempts=1)
+            observe_stage(STAGE_TOTAL, email_type, time.perf_counter() - started)
             
             return {
                 "status": "success",
-                "email_log_id": email_log.id,
+                "email_log_id": email_log_id,
                 "processing_method": "direct"
             }
         else:
-            email_log.status = 'failed'
-            email_log.error = result.get('error', 'Direct email sending failed')
-            email_log.save(update_fields=['status', 'error'])
+            update_email_status(email_log_id, 'failed', error=result.get('error', 'Direct email sending failed'),
+                                error_class=classify_result(result), attempts=1)
             
             return {
                 "status": "failure",
-                "email_log_id": email_log.id,
+                "email_log_id": email_log_id,
                 "error": result.get('error', 'Direct email sending failed'),
                 "processing_method": "direct"
             }
@@ -116,14 +168,12 @@ def send_direct_email(
         error_msg = f'Direct email sending failed: {str(e)}'
         
         # Update log on failure
-        if email_log:
-            email_log.status = 'failed'
-            email_log.error = error_msg
-            email_log.save(update_fields=['status', 'error'])
+        if email_log_id:
+            update_email_status(email_log_id, 'failed', error=error_msg, error_class=classify_exception(e), attempts=1)
         
         return {
             "status": "failure",
-            "email_log_id": email_log.id if email_log else None,
+            "email_log_id": email_log_id,
             "error": error_msg,
             "processing_method": "direct"
         }
@@ -131,15 +181,21 @@ def send_direct_email(
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_generic_email_task(self, user_email, email_type=None, subject=None, action=None, message=None, otp=None, link=None, link_text=None, email_log_id=None, **kwargs):
 
-    start_time = timezone.now()
-    email_log = None
+    started = time.perf_counter()
+    record_queue_wait(email_type, self.request)
+    policy = RetryPolicy.from_settings()
+    attempts = self.request.retries + 1
+
+    def task_kwargs():
+        # Everything needed to run this email again from the dead-letter store
+        return dict(kwargs, user_email=user_email, email_type=email_type, subject=subject, action=action,
+                    message=message, otp=otp, link=link, link_text=link_text, email_log_id=email_log_id)
 
     try:
-        if email_log_id:
-            try:
-                email_log = EmailLog.objects.get(id=email_log_id)
-            except EmailLog.DoesNotExist:
-                email_log = EmailLog.objects.create(
+        with stage_timer(STAGE_DB, email_type):
+            if not email_log_id:
+                # Create new log if no ID provided
+                email_log_id = create_email_log(
                     email=user_email,
                     email_type=email_type,
                     subject=subject,
@@ -149,23 +205,17 @@ def send_generic_email_task(self, user_email, email_type=None, subject=None, act
                     link=link,
                     link_text=link_text,
                     status='queued'
-                )
-        else:
-            # Create new log if no ID provided
-            email_log = EmailLog.objects.create(
-                email=user_email,
-                email_type=email_type,
-                subject=subject,
-                action=action,
-                message=message,
-                otp=otp,
-                link=link,
-                link_text=link_text,
-                status='queued'
-            )
-
-        email_log.status = 'processing'
-        email_log.save(update_fields=['status'])
+                ).id
+
+            # Addresses suppressed after the email was queued are dropped without an SMTP round-trip
+            suppression = suppression_list.lookup(user_email, email_type)
+            if suppression is not None:
+                error = suppressed_error(suppression)
+                update_email_status(email_log_id, 'failed', error=error, error_class=PERMANENT, attempts=attempts)
+                return {"status": "failure", "email_log_id": email_log_id, "error": error, "error_class": PERMANENT}
+
+            # Buffered in workers: coalesces with the final status into a single write
+            update_email_status(email_log_id, 'processing')
 
         # Send email with all parameters
         result = send_generic_email(
@@ -182,42 +232,222 @@ def send_generic_email_task(self, user_email, email_type=None, subject=None, act
 
         # Update log on success
         if result['status'] == 'success':
-            email_log.status = 'sent'
-            email_log.sent_at = timezone.now()
-            email_log.save(update_fields=['status', 'sent_at'])
+            with stage_timer(STAGE_DB, email_type):
+                update_email_status(email_log_id, 'sent', sent_at=timezone.now(), attempts=attempts)
             
             # Log performance metrics
-            duration = (timezone.now() - start_time).total_seconds()
+            observe_stage(STAGE_TOTAL, email_type, time.perf_counter() - started)
+            record_lane_latency(lane_for(email_type, action), self.request)
 
-            return {"status": "success", "email_log_id": email_log.id}
+            return {"status": "success", "email_log_id": email_log_id}
         else:
-            email_log.status = 'failed'
-            email_log.error = result['error']
-            email_log.save(update_fields=['status', 'error'])
-            
-            # Retry on failure with exponential backoff
-            if self.request.retries < self.max_retries:
-                retry_delay = 60 * (2 ** self.request.retries)
-                raise self.retry(exc=Exception(f"Email sending failed: {result.get('error')}"), countdown=retry_delay)
+            # Retry with jittered back-off unless the error class has used up its attempts
+            error_class = classify_result(result)
+            if policy.should_retry(error_class, self.request.retries):
+                update_email_status(email_log_id, 'failed', error=result['error'],
+                                    error_class=error_class, attempts=attempts)
+                raise retry_with_policy(self, policy, error_class,
+                                        Exception(f"Email sending failed: {result.get('error')}"))
             
-            return {"status": "failure", "email_log_id": email_log.id, "error": result.get('error')}
+            update_email_status(email_log_id, 'failed', error=final_error(result.get('error'), error_class),
+                                error_class=error_class, attempts=attempts)
+            record_dead_letter(self, task_kwargs(), result.get('error'), error_class, attempts)
+            return {"status": "failure", "email_log_id": email_log_id, "error": result.get('error'),
+                    "error_class": error_class}
 
+    except Retry:
+        raise
     except Exception as e:
         error_msg = str(e)
+        error_class = classify_exception(e)
         
-        # Update log on failure before retry
-        if email_log:
-            email_log.status = 'failed'
-            email_log.error = error_msg
-            email_log.save(update_fields=['status', 'error'])
-        
-        # Retry on failure with exponential backoff
-        if self.request.retries < self.max_retries:
-            retry_delay = 60 * (2 ** self.request.retries)
-            raise self.retry(exc=e, countdown=retry_delay)
+        if policy.should_retry(error_class, self.request.retries):
+            # Update log on failure before retry
+            if email_log_id:
+                update_email_status(email_log_id, 'failed', error=error_msg, error_class=error_class, attempts=attempts)
+            raise retry_with_policy(self, policy, error_class, e)
         else:
             # Final failure after retries
-            if email_log:
-                email_log.error = f"Max retries exceeded: {error_msg}"
-                email_log.save(update_fields=['error'])
-            return {"status": "failure", "email": user_email, "error": f"Max retries exceeded: {error_msg}"}
\ No newline at end of file
+            if email_log_id:
+                update_email_status(email_log_id, 'failed', error=final_error(error_msg, error_class),
+                                    error_class=error_class, attempts=attempts)
+            record_dead_letter(self, task_kwargs(), error_msg, error_class, attempts)
+            return {"status": "failure", "email": user_email, "error": final_error(error_msg, error_class),
+                    "error_class": error_class}
+
+
+def send_bulk_email_chunk(
+    recipients: List[Dict[str, Any]],
+    email_type: Optional[str] = None,
+    subject: Optional[str] = None,
+    action: Optional[str] = None,
+    message: Optional[str] = None,
+    otp: Optional[str] = None,
+    link: Optional[str] = None,
+    link_text: Optional[str] = None,
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Render and send one chunk of a bulk request over a single pooled SMTP connection.
+
+    Recipients whose effective context is identical share one rendering, so a
+    plain broadcast renders the templates once per chunk. The chunk's EmailLog
+    rows are updated through the status buffer in one batch.
+
+    If the connection fails partway through, the delivered and rejected
+    recipients are still recorded and UndeliveredChunkError is raised with the
+    recipients that were never handed to the server.
+
+    Args:
+        recipients: Dicts with `email_log_id`, `user_email` and an optional per-recipient `context`
+        email_type, subject, action, message, otp, link, link_text: Fields shared by the whole chunk
+        **kwargs: Additional template context shared by the whole chunk
+
+    Returns:
+        Dict with the sent/failed counts and the error per failed email_log_id
+    """
+    shared_fields = {
+        'subject': subject,
+        'action': action,
+        'message': message,
+        'otp': otp,
+        'link': link,
+        'link_text': link_text,
+    }
+    rendered = {}
+    messages, message_log_ids = [], []
+    errors, error_classes = {}, {}
+    suppressed = suppression_list.suppressed([recipient['user_email'] for recipient in recipients], email_type)
+
+    for recipient in recipients:
+        log_id = recipient['email_log_id']
+        suppression = suppressed.get(normalize_email(recipient['user_email']))
+        if suppression is not None:
+            errors[log_id], error_classes[log_id] = suppressed_error(suppression), PERMANENT
+            continue
+        fields = dict(shared_fields)
+        extra = dict(kwargs)
+        for key, value in (recipient.get('context') or {}).items():
+            if key in BULK_OVERRIDABLE_FIELDS:
+                fields[key] = value
+            elif key not in ('user_email', 'email_type', 'email_log_id'):
+                extra[key] = value
+
+        try:
+            user_email = validate_recipient(recipient['user_email'])
+            render_key = json.dumps([fields, extra], sort_keys=True, default=str)
+            if render_key not in rendered:
+                rendered[render_key] = render_email(build_email_context(**fields, **extra), email_type)
+            plain_message, html_message = rendered[render_key]
+            email_subject = fields['subject'].strip() if fields['subject'] else None
+            messages.append(build_email_message(user_email, email_subject, plain_message, html_message))
+            message_log_ids.append(log_id)
+        except Exception as e:
+            failure = email_failure(recipient['user_email'], e)
+            errors[log_id], error_classes[log_id] = failure['error'], failure['error_class']
+
+    sent_ids, undelivered = [], {}
+    if messages:
+        for log_id, exc in zip(message_log_ids, get_smtp_pool().send_each(messages)):
+            if exc is None:
+                sent_ids.append(log_id)
+            elif isinstance(exc, MESSAGE_REJECTED_ERRORS):
+                errors[log_id] = f"SMTP error: {str(exc)}"
+                error_classes[log_id] = classify_exception(exc)
+            else:
+                undelivered[log_id] = exc
+
+    sent_at = timezone.now()
+    updates = {log_id: {'status': 'sent', 'sent_at': sent_at} for log_id in sent_ids}
+    updates.update({
+        log_id: {'status': 'failed', 'error': error, 'error_class': error_classes[log_id]}
+        for log_id, error in errors.items()
+    })
+    update_email_statuses(updates)
+
+    if undelivered:
+        raise UndeliveredChunkError(
+            [recipient for recipient in recipients if recipient['email_log_id'] in undelivered],
+            next(iter(undelivered.values())), sent=len(sent_ids), failed=len(errors),
+        )
+
+    return {
+        "status": "success" if not errors else ("partial" if sent_ids else "failure"),
+        "sent": len(sent_ids),
+        "failed": len(errors),
+        "errors": errors,
+    }
+
+
+class UndeliveredChunkError(Exception):
+    """Part of a bulk chunk was never handed to the SMTP server; `recipients` are the ones to send again."""
+
+    def __init__(self, recipients, cause, sent=0, failed=0):
+        super().__init__(str(cause))
+        self.recipients = recipients
+        self.cause = cause
+        self.sent = sent
+        self.failed = failed
+
+
+def mark_chunk_failed(recipients: List[Dict[str, Any]], error: str, error_class: Optional[str] = None) -> None:
+    """Mark every EmailLog of a bulk chunk as failed with the same error."""
+    update_email_statuses({
+        r['email_log_id']: {'status': 'failed', 'error': error, 'error_class': error_class} for r in recipients
+    })
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_bulk_email_task(self, recipients, email_type=None, subject=None, action=None, message=None, otp=None, link=None, link_text=None, **kwargs):
+    """
+    Celery wrapper around send_bulk_email_chunk; retries per the retry policy when the SMTP server is unreachable.
+
+    When the connection fails partway through, only the recipients that were
+    not delivered are retried, so nobody gets the same email twice.
+    """
+    try:
+        result = send_bulk_email_chunk(
+            recipients,
+            email_type=email_type,
+            subject=subject,
+            action=action,
+            message=message,
+            otp=otp,
+            link=link,
+            link_text=link_text,
+            **kwargs
+        )
+        record_lane_latency(LANE_BULK, self.request)
+        return result
+    except Exception as e:
+        sent = failed = 0
+        if isinstance(e, UndeliveredChunkError):
+            recipients, sent, failed, e = e.recipients, e.sent, e.failed, e.cause
+        error_msg = str(e)
+        error_class = classify_exception(e)
+        policy = RetryPolicy.from_settings()
+
+        if policy.should_retry(error_class, self.request.retries):
+            mark_chunk_failed(recipients, error_msg, error_class)
+            retry_kwargs = {key: value for key, value in (self.request.kwargs or {}).items() if key != 'recipients'}
+            raise retry_with_policy(self, policy, error_class, e, args=[recipients], kwargs=retry_kwargs)
+        mark_chunk_failed(recipients, final_error(error_msg, error_class), error_class)
+        record_dead_letter(self, dict(kwargs, recipients=recipients, email_type=email_type, subject=subject,
+                                      action=action, message=message, otp=otp, link=link, link_text=link_text),
+                           error_msg, error_class, self.request.retries + 1)
+        return {"status": "partial" if sent else "failure", "sent": sent, "failed": failed + len(recipients),
+                "error": final_error(error_msg, error_class), "error_class": error_class}
+
+
+@shared_task
+def flush_email_digests_task(batch_size=None):
+    """Periodic flush of due digests; schedule it with celery beat, or run `flush_email_digests --loop` instead."""
+    from .digest import flush_due_digests
+
+    totals = {'digests': 0, 'notifications': 0, 'emails': 0}
+    while True:
+        counts = flush_due_digests(batch_size=batch_size)
+        for key, value in counts.items():
+            totals[key] += value
+        if not counts['digests']:
+            return totals
@@ -0,0 +1,107 @@
+# apps/email_service/template_cache.py
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.template import Template
+
+
+class _CachedTemplate:
+    __slots__ = ('template', 'mtime', 'checked_at')
+
+    def __init__(self, template, mtime, checked_at):
+        self.template = template
+        self.mtime = mtime
+        self.checked_at = checked_at
+
+
+class CompiledTemplateCache:
+    """
+    Process-wide registry of compiled django Templates keyed by file path.
+
+    A template is parsed once and reused until the file's mtime changes. The
+    mtime itself is only re-checked every `check_interval` seconds so the hot
+    path does not even pay for an os.stat() on every email.
+    """
+
+    def __init__(self, check_interval=None):
+        self._check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'EMAIL_TEMPLATE_CHECK_INTERVAL', 2.0)
+
+    def get(self, path):
+        """Return the compiled Template for `path`, compiling or reloading it if needed."""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self.hits += 1
+                return entry.template
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template not found at {path}")
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime == mtime:
+                entry.checked_at = now
+                self.hits += 1
+                return entry.template
+
+            with open(path, 'r', encoding='utf-8') as f:
+                template = Template(f.read())
+
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._entries[path] = _CachedTemplate(template, mtime, now)
+            return template
+
+    def stats(self):
+        with self._lock:
+            return {
+                'templates': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.reloads = 0
+
+
+template_cache = CompiledTemplateCache()
+
+
+def templates_dir():
+    return os.path.join(settings.BASE_DIR, 'apps', 'email_service', 'templates')
+
+
+def generic_template_paths():
+    """Paths of the generic HTML and plain-text email templates."""
+    return (
+        os.path.join(templates_dir(), 'generic_email.html'),
+        os.path.join(templates_dir(), 'generic_email.txt'),
+    )
+
+
+def get_generic_templates():
+    """Return the compiled (html, txt) generic email templates."""
+    html_path, txt_path = generic_template_paths()
+    return template_cache.get(html_path), template_cache.get(txt_path)
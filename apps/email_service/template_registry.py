@@ -0,0 +1,240 @@
+# apps/email_service/template_registry.py
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.template import Context, Template, TemplateSyntaxError
+from django.utils.safestring import mark_safe
+
+from .config_cache import get_config_snapshot
+from .template_cache import get_generic_templates, template_cache, templates_dir
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DATABASE = 'database'
+SOURCE_FILE = 'file'
+SOURCE_GENERIC = 'generic'
+
+# Static brand parts rendered once per configuration snapshot and injected as {{ <name> }}
+FRAGMENTS = ('support_fragment', 'footer_fragment')
+
+# email_type values usable as file names
+_FILE_EMAIL_TYPE = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+@dataclass(frozen=True)
+class EmailTemplateVariant:
+    """The compiled (html, txt) templates an email_type renders with, and where they came from."""
+    email_type: Optional[str]
+    source: str
+    version: Optional[int]
+    html: Template
+    txt: Template
+
+
+def get_template_version():
+    """
+    Template version stamp shared by every process (None if there are no EmailTemplate rows).
+
+    The stamp is the row count and the latest EmailTemplate.updated_at, read
+    from the database, so a save or delete reaches web and worker processes alike.
+    """
+    from .models import EmailTemplate
+
+    stamp = EmailTemplate.objects.aggregate(rows=Count('id'), updated_at=Max('updated_at'))
+    if not stamp['rows']:
+        return None
+    return stamp['rows'], int(stamp['updated_at'].timestamp() * 1_000_000)
+
+
+def bump_template_version():
+    """
+    Reload the active EmailTemplate versions in this process; called when a row is saved or deleted.
+
+    Other processes notice the changed stamp at their next version check.
+    """
+    template_registry.invalidate()
+
+
+def email_type_template_dir():
+    return getattr(settings, 'EMAIL_TEMPLATE_DIR', os.path.join(templates_dir(), 'email_types'))
+
+
+class TemplateRegistry:
+    """
+    Resolves the templates of an email_type: the highest active EmailTemplate
+    row, else `<email_type>.html`/`.txt` under EMAIL_TEMPLATE_DIR, else the
+    generic pair.
+
+    Database templates are compiled once per (email_type, version) and kept
+    until a newer version becomes active; the set of active versions is
+    reloaded only when the shared template version stamp changes, checked at
+    most every EMAIL_TEMPLATE_CHECK_INTERVAL seconds. File templates go through
+    the mtime-checked template_cache.
+    """
+
+    def __init__(self, check_interval=None):
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._stamp = None
+        self._checked_at = 0.0
+        self._active = {}
+        self._variants = {}
+        self._files = {}
+        self._fragments = None
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'EMAIL_TEMPLATE_CHECK_INTERVAL', 2.0)
+
+    def _refresh_active(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return
+        stamp = get_template_version()
+        with self._lock:
+            if self._loaded and stamp == self._stamp:
+                self._checked_at = now
+                return
+
+        from .models import EmailTemplate
+        active = dict(
+            EmailTemplate.objects.filter(is_active=True).order_by()
+            .values('email_type').annotate(latest=Max('version')).values_list('email_type', 'latest')
+        )
+        with self._lock:
+            self._active = active
+            # Compiled versions that are no longer the active one are dropped; the rest are kept as they are
+            self._variants = {key: variant for key, variant in self._variants.items() if active.get(key[0]) == key[1]}
+            self._stamp, self._checked_at, self._loaded = stamp, now, True
+
+    def _database_variant(self, email_type, version):
+        key = (email_type, version)
+        with self._lock:
+            if key in self._variants:
+                return self._variants[key]
+
+        from .models import EmailTemplate
+        row = EmailTemplate.objects.filter(email_type=email_type, version=version).values('html', 'text').first()
+        variant = None
+        if row is not None:
+            generic_html, generic_txt = get_generic_templates()
+            try:
+                variant = EmailTemplateVariant(
+                    email_type, SOURCE_DATABASE, version,
+                    Template(row['html']) if row['html'] else generic_html,
+                    Template(row['text']) if row['text'] else generic_txt,
+                )
+            except TemplateSyntaxError:
+                # Remembered as broken so the version is not re-parsed on every email
+                logger.exception("Email template %s v%s does not compile; using fallback templates",
+                                 email_type, version)
+        with self._lock:
+            self._variants[key] = variant
+        return variant
+
+    def _file_paths(self, email_type):
+        """(html_path, txt_path or None) of a file template for `email_type`, or None; re-checked every interval."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._files.get(email_type)
+            if entry is not None and now - entry[1] < self.check_interval:
+                return entry[0]
+
+        directory = email_type_template_dir()
+        html_path = os.path.join(directory, f'{email_type}.html')
+        txt_path = os.path.join(directory, f'{email_type}.txt')
+        paths = None
+        if os.path.isfile(html_path):
+            paths = (html_path, txt_path if os.path.isfile(txt_path) else None)
+        with self._lock:
+            self._files[email_type] = (paths, now)
+        return paths
+
+    def get(self, email_type=None):
+        """The EmailTemplateVariant `email_type` renders with."""
+        if email_type:
+            self._refresh_active()
+            version = self._active.get(email_type)
+            if version is not None:
+                variant = self._database_variant(email_type, version)
+                if variant is not None:
+                    return variant
+
+            paths = self._file_paths(email_type) if _FILE_EMAIL_TYPE.match(email_type) else None
+            if paths is not None:
+                html_path, txt_path = paths
+                txt = template_cache.get(txt_path) if txt_path else get_generic_templates()[1]
+                return EmailTemplateVariant(email_type, SOURCE_FILE, None, template_cache.get(html_path), txt)
+
+        html, txt = get_generic_templates()
+        return EmailTemplateVariant(email_type, SOURCE_GENERIC, None, html, txt)
+
+    def fragments(self, context):
+        """
+        {'html': {...}, 'txt': {...}} of pre-rendered brand fragments for `context`.
+
+        The fragments only depend on the brand configuration and the year, so
+        they are rendered once per configuration snapshot; a context that
+        overrides a brand field gets them rendered for it instead.
+        """
+        snapshot = get_config_snapshot()
+        brand_context = dict(snapshot.brand_context, current_year=datetime.now().year)
+        sources = tuple(
+            template_cache.get(os.path.join(templates_dir(), 'fragments', f"{name.rsplit('_', 1)[0]}.{kind}"))
+            for kind in ('html', 'txt') for name in FRAGMENTS
+        )
+        if any(key in context and context[key] != value for key, value in brand_context.items()):
+            return self._render_fragments(sources, context)
+
+        cached = self._fragments
+        if cached is not None and cached[0] is snapshot and cached[1] == brand_context['current_year'] \
+                and cached[2] == sources:
+            return cached[3]
+        rendered = self._render_fragments(sources, brand_context)
+        self._fragments = (snapshot, brand_context['current_year'], sources, rendered)
+        return rendered
+
+    def _render_fragments(self, sources, context):
+        rendered = [mark_safe(template.render(Context(context))) for template in sources]
+        return {
+            'html': dict(zip(FRAGMENTS, rendered[:len(FRAGMENTS)])),
+            'txt': dict(zip(FRAGMENTS, rendered[len(FRAGMENTS):])),
+        }
+
+    def invalidate(self):
+        """Reload the active versions on the next lookup; compiled versions are kept if still active."""
+        with self._lock:
+            self._loaded = False
+            self._files.clear()
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._stamp = None
+            self._active = {}
+            self._variants = {}
+            self._files = {}
+            self._fragments = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active_versions': dict(self._active),
+                'compiled': len([variant for variant in self._variants.values() if variant is not None]),
+                'broken': [f'{email_type} v{version}' for (email_type, version), variant in self._variants.items()
+                           if variant is None],
+            }
+
+
+template_registry = TemplateRegistry()
@@ -0,0 +1,103 @@
+"""
+Tests for EmailLog retention and the compressed archive
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..archive import EmailLogArchive, archive_email_logs
+from ..models import EmailLog
+from .test_rollups import superuser_token
+
+
+def _old_log(email, days_old, email_type='news'):
+    log = EmailLog.objects.create(email=email, email_type=email_type, subject='Hi', action='', message='body')
+    EmailLog.objects.filter(id=log.id).update(created_at=timezone.now() - timedelta(days=days_old))
+    return log
+
+
+class ArchiveTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.archive = EmailLogArchive(self.directory)
+
+    def test_moves_old_rows_in_chunks_and_keeps_recent(self):
+        old = [_old_log(f'user{i}@example.com', days_old=100 + i % 2) for i in range(5)]
+        recent = _old_log('recent@example.com', days_old=1)
+
+        counts = archive_email_logs(older_than_days=90, chunk_size=2, archive=self.archive)
+
+        self.assertEqual(counts, {'archived': 5, 'deleted': 5, 'chunks': 3})
+        self.assertEqual(list(EmailLog.objects.values_list('id', flat=True)), [recent.id])
+
+        # One gzip NDJSON file per day, each holding several members
+        files = [os.path.join(root, name) for root, _, names in os.walk(self.directory)
+                 for name in names if name.endswith('.ndjson.gz')]
+        self.assertEqual(len(files), 2)
+        with gzip.open(files[0], 'rt') as fh:
+            self.assertTrue(all(json.loads(line)['message'] == 'body' for line in fh))
+
+        archived = self.archive.get(old[3].id)
+        self.assertEqual(archived['email'], 'user3@example.com')
+
+    def test_find_by_recipient_across_days(self):
+        first = _old_log('Shared@example.com', days_old=120)
+        second = _old_log('shared@example.com', days_old=100)
+        _old_log('other@example.com', days_old=100)
+        archive_email_logs(older_than_days=90, chunk_size=1, archive=self.archive)
+
+        found = self.archive.find_by_email('shared@example.com')
+
+        self.assertEqual([row['id'] for row in found], [second.id, first.id])
+        self.assertIsNone(self.archive.get(999999))
+
+    def test_dry_run_leaves_rows(self):
+        _old_log('user@example.com', days_old=100)
+
+        counts = archive_email_logs(older_than_days=90, archive=self.archive, dry_run=True)
+
+        self.assertEqual(counts['archived'], 1)
+        self.assertEqual(EmailLog.objects.count(), 1)
+
+
+class ArchiveCommandAndAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.settings_override = self.settings(EMAIL_ARCHIVE={'DIRECTORY': self.directory})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+    def test_command_archives_and_endpoint_reads_back(self):
+        log = _old_log('archived@example.com', days_old=100)
+
+        call_command('archive_email_logs', '--days', '90', stdout=StringIO())
+
+        self.assertFalse(EmailLog.objects.filter(id=log.id).exists())
+        response = self.client.get(reverse('email_archived_logs'), {'id': log.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], 'archived@example.com')
+
+        response = self.client.get(reverse('email_archived_logs'), {'email': 'archived@example.com'})
+        self.assertEqual([row['id'] for row in response.data['results']], [log.id])
+
+    def test_unknown_id_is_404(self):
+        response = self.client.get(reverse('email_archived_logs'), {'id': 12345})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
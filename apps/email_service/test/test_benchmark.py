@@ -0,0 +1,65 @@
+"""
+Tests for the email pipeline benchmark and its SMTP sink
+"""
+
+import json
+import smtplib
+import time
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from ..benchmark import latency_summary
+from ..models import EmailLog, EmailStatsRollup
+from ..smtp_sink import LocalSMTPSink
+
+
+class SMTPSinkTestCase(SimpleTestCase):
+
+    def test_latency_delays_each_message(self):
+        with LocalSMTPSink(latency=0.05) as sink:
+            with smtplib.SMTP(sink.host, sink.port, timeout=5) as client:
+                started = time.perf_counter()
+                client.sendmail('a@example.com', ['b@example.com'], 'Subject: hi\r\n\r\nbody\r\n')
+                client.sendmail('a@example.com', ['c@example.com'], 'Subject: hi\r\n\r\nbody\r\n')
+                elapsed = time.perf_counter() - started
+
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertEqual(sink.messages_received, 2)
+        self.assertGreater(sink.bytes_received, 0)
+
+    def test_latency_summary_nearest_rank(self):
+        summary = latency_summary([0.01 * n for n in range(1, 101)])
+
+        self.assertAlmostEqual(summary['p50'], 0.5)
+        self.assertAlmostEqual(summary['p99'], 0.99)
+        self.assertAlmostEqual(summary['max'], 1.0)
+
+
+class BenchmarkCommandTestCase(TestCase):
+
+    def test_reports_every_path_as_json_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_email_pipeline', '--count=4', '--bulk-chunk-size=3', '--allocation-sample=1',
+                     stdout=out)
+
+        report = json.loads(out.getvalue())
+        results = {result['path']: result for result in report['results']}
+        self.assertEqual(set(results), {'single', 'bulk', 'direct'})
+        for result in results.values():
+            self.assertEqual(result['emails'], 4)
+            self.assertEqual(result['failed'], 0, result['errors'])
+            self.assertGreater(result['emails_per_second'], 0)
+            self.assertGreater(result['queries_per_email'], 0)
+            self.assertIsNotNone(result['latency_per_operation']['p99'])
+            self.assertEqual(result['allocations']['sample_emails'], 1)
+        self.assertEqual(results['bulk']['operations'], 2)
+        # 4 emails per path plus one allocation sample each
+        self.assertEqual(report['smtp_sink']['messages'], 15)
+        self.assertEqual(EmailLog.objects.count(), 0)
+        self.assertFalse(EmailStatsRollup.objects.exists())
+
+    def test_unknown_path_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_email_pipeline', '--paths=single,carrier-pigeon', stdout=StringIO())
@@ -0,0 +1,68 @@
+"""
+Tests for the broker-health circuit breaker
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..broker_health import BrokerCircuitBreaker, publish_task
+
+
+class BrokerCircuitBreakerTestCase(SimpleTestCase):
+
+    def test_opens_after_failure_threshold(self):
+        breaker = BrokerCircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BrokerCircuitBreaker.CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BrokerCircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+    def test_half_open_lets_a_single_probe_through(self):
+        breaker = BrokerCircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        breaker._opened_at -= 60
+
+        self.assertEqual(breaker.state, BrokerCircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, BrokerCircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_failed_probe_reopens_circuit(self):
+        breaker = BrokerCircuitBreaker(failure_threshold=5, reset_timeout=30)
+        for _ in range(5):
+            breaker.record_failure()
+        breaker._opened_at -= 60
+
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BrokerCircuitBreaker.OPEN)
+
+
+class PublishTaskTestCase(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch('apps.email_service.broker_health.broker_breaker',
+                             BrokerCircuitBreaker(failure_threshold=1, reset_timeout=30))
+        self.breaker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_publish_failure_opens_circuit_and_skips_broker(self):
+        task = mock.Mock()
+        task.apply_async.side_effect = ConnectionRefusedError()
+
+        self.assertFalse(publish_task(task, kwargs={'a': 1}))
+        self.assertFalse(publish_task(task, kwargs={'a': 1}))
+        self.assertEqual(task.apply_async.call_count, 1)
+
+    def test_publish_success(self):
+        task = mock.Mock()
+
+        self.assertTrue(publish_task(task, kwargs={'a': 1}))
+        task.apply_async.assert_called_once_with(args=None, kwargs={'a': 1}, retry=False, headers=mock.ANY)
+        self.assertEqual(self.breaker.stats()['successes'], 1)
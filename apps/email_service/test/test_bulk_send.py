@@ -0,0 +1,197 @@
+"""
+Tests for the bulk send-email endpoint
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..broker_health import broker_breaker
+from ..models import EmailLog, EmailOutbox
+from ..outbox import drain_outbox
+from ..models import EmailDeadLetter
+from ..tasks import UndeliveredChunkError, send_bulk_email_chunk, send_bulk_email_task
+from ..utils import render_email
+
+
+def microservice_token(service='test-service'):
+    payload = {
+        'type': 'microservice',
+        'service': service,
+        'iat': datetime.now(timezone.utc),
+        'exp': datetime.now(timezone.utc) + timedelta(minutes=5),
+    }
+    return jwt.encode(payload, settings.SUPPORT_JWT_SECRET_KEY, algorithm='HS256')
+
+
+@override_settings(EMAIL_BULK_CHUNK_SIZE=2, DEFAULT_FROM_EMAIL='no-reply@example.com')
+class BulkSendEmailAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        self.url = reverse('send_bulk_email')
+        self.payload = {
+            'email_type': 'notification',
+            'subject': 'Hello',
+            'message': 'Shared message',
+            'recipients': [
+                {'user_email': 'A@example.com'},
+                {'user_email': 'b@example.com', 'context': {'otp': '1234'}},
+                {'user_email': 'c@example.com', 'context': {'order_id': 'X1'}},
+            ],
+        }
+
+    def test_bulk_send_parks_chunks_in_outbox_when_broker_down(self):
+        broker_breaker.reset()
+        with mock.patch('apps.email_service.outbox.publish_task', return_value=False):
+            response = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['processing_method'], 'outbox')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([r['email'] for r in response.data['results']],
+                         ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        with mock.patch('apps.email_service.outbox.broker_breaker.is_available', return_value=False):
+            counts = drain_outbox(direct_fallback=True)
+
+        self.assertEqual(counts['executed'], 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 3)
+        self.assertEqual(EmailLog.objects.get(email='b@example.com').otp, '1234')
+
+    @mock.patch('apps.email_service.views.send_bulk_email_task.apply_async')
+    def test_bulk_send_enqueues_one_task_per_chunk(self, apply_async):
+        broker_breaker.reset()
+        response = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(apply_async.call_count, 2)
+        first_chunk = apply_async.call_args_list[0].kwargs['args'][0]
+        self.assertEqual([r['email_log_id'] for r in first_chunk],
+                         [r['email_log_id'] for r in response.data['results'][:2]])
+        self.assertEqual(EmailLog.objects.filter(status='queued').count(), 3)
+
+    @mock.patch('apps.email_service.views.send_bulk_email_task.apply_async')
+    def test_failed_chunk_queues_nothing(self, apply_async):
+        broker_breaker.reset()
+        bulk_create = EmailLog.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise RuntimeError('db down')
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(EmailLog.objects, 'bulk_create', side_effect=failing_bulk_create):
+            response = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(calls, [2, 1])
+        self.assertFalse(EmailLog.objects.exists())
+        apply_async.assert_not_called()
+
+    def test_bulk_send_requires_recipients(self):
+        response = self.client.post(self.url, {'subject': 'Hello', 'recipients': []}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class BulkSendChunkTestCase(TestCase):
+
+    def test_identical_contexts_rendered_once(self):
+        logs = [EmailLog.objects.create(email=f'user{i}@example.com', email_type='news', subject='Hi',
+                                        action='', message='m') for i in range(3)]
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+
+        with mock.patch('apps.email_service.tasks.render_email', wraps=render_email) as render:
+            result = send_bulk_email_chunk(recipients, email_type='news', subject='Hi', message='m')
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(result['sent'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_invalid_recipient_marked_failed(self):
+        good = EmailLog.objects.create(email='ok@example.com', email_type='news', subject='Hi', action='', message='m')
+        bad = EmailLog.objects.create(email='broken', email_type='news', subject='Hi', action='', message='m')
+
+        result = send_bulk_email_chunk([
+            {'email_log_id': good.id, 'user_email': good.email},
+            {'email_log_id': bad.id, 'user_email': bad.email},
+        ], subject='Hi', message='m')
+
+        self.assertEqual(result['status'], 'partial')
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, 'failed')
+        self.assertIn('Validation error', bad.error)
+
+    def _logs(self, count):
+        return [EmailLog.objects.create(email=f'user{i}@example.com', email_type='news', subject='Hi',
+                                        action='', message='m') for i in range(count)]
+
+    def test_connection_failure_raises_with_undelivered_recipients(self):
+        logs = self._logs(3)
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+        pool = mock.Mock()
+        pool.send_each.return_value = [None, OSError('timed out'), OSError('timed out')]
+
+        with mock.patch('apps.email_service.tasks.get_smtp_pool', return_value=pool), \
+                self.assertRaises(UndeliveredChunkError) as raised:
+            send_bulk_email_chunk(recipients, subject='Hi', message='m')
+
+        self.assertEqual(raised.exception.recipients, recipients[1:])
+        self.assertEqual(raised.exception.sent, 1)
+        self.assertEqual(EmailLog.objects.get(id=logs[0].id).status, 'sent')
+
+    @override_settings(EMAIL_RETRY_OUTBOX_DELAY=3600)
+    def test_task_retries_only_undelivered_recipients(self):
+        logs = self._logs(3)
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+        undelivered = UndeliveredChunkError(recipients[2:], OSError('timed out'), sent=2)
+
+        with mock.patch('apps.email_service.tasks.send_bulk_email_chunk', side_effect=undelivered), \
+                mock.patch.object(send_bulk_email_task, 'retry', side_effect=RuntimeError('retried')) as retry:
+            with self.assertRaises(RuntimeError):
+                send_bulk_email_task.apply(args=[recipients], kwargs={'email_type': 'news', 'subject': 'Hi'},
+                                           throw=True)
+
+        self.assertEqual(retry.call_args.kwargs['args'], [recipients[2:]])
+        self.assertEqual(retry.call_args.kwargs['kwargs'], {'email_type': 'news', 'subject': 'Hi'})
+
+    @override_settings(EMAIL_RETRY_OUTBOX_DELAY=0)
+    def test_long_retry_of_undelivered_recipients_waits_in_outbox(self):
+        logs = self._logs(3)
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+        undelivered = UndeliveredChunkError(recipients[2:], OSError('timed out'), sent=2)
+
+        with mock.patch('apps.email_service.tasks.send_bulk_email_chunk', side_effect=undelivered):
+            send_bulk_email_task.apply(args=[recipients], kwargs={'email_type': 'news', 'subject': 'Hi'})
+
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.args, [recipients[2:]])
+        self.assertEqual(entry.kwargs, {'email_type': 'news', 'subject': 'Hi'})
+        self.assertEqual(entry.retries, 1)
+
+    @override_settings(EMAIL_RETRY_POLICY={'MAX_RETRIES': {'transient': 0}})
+    def test_exhausted_chunk_dead_letters_only_undelivered_recipients(self):
+        logs = self._logs(3)
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+        undelivered = UndeliveredChunkError(recipients[2:], OSError('timed out'), sent=2)
+
+        with mock.patch('apps.email_service.tasks.send_bulk_email_chunk', side_effect=undelivered):
+            result = send_bulk_email_task.apply(args=[recipients], kwargs={'subject': 'Hi'}).get()
+
+        self.assertEqual((result['status'], result['sent'], result['failed']), ('partial', 2, 1))
+        self.assertEqual(EmailDeadLetter.objects.get().kwargs['recipients'], recipients[2:])
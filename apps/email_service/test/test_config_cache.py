@@ -0,0 +1,66 @@
+"""
+Tests for the cached EmailConfiguration snapshot
+"""
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..config_cache import get_config_snapshot, invalidate_config_snapshot
+from ..models import EmailConfiguration
+
+
+@override_settings(EMAIL_CONFIG_VERSION_CHECK_INTERVAL=0)
+class EmailConfigSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        invalidate_config_snapshot()
+        self.config = EmailConfiguration.get_instance()
+        self.config.brand_name = 'Acme'
+        self.config.facebook_link = 'https://facebook.com/acme'
+        self.config.save()
+
+    def test_snapshot_precomputes_brand_context(self):
+        snapshot = get_config_snapshot()
+
+        self.assertEqual(snapshot.brand_context['brand_name'], 'Acme')
+        self.assertTrue(snapshot.brand_context['social_true'])
+        with self.assertRaises(TypeError):
+            snapshot.brand_context['brand_name'] = 'Other'
+
+    @override_settings(EMAIL_CONFIG_VERSION_CHECK_INTERVAL=60)
+    def test_snapshot_reused_without_queries(self):
+        get_config_snapshot()
+
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                get_config_snapshot()
+
+    def test_save_invalidates_snapshot(self):
+        first = get_config_snapshot()
+        self.config.brand_name = 'Renamed'
+        self.config.save()
+
+        second = get_config_snapshot()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.brand_name, 'Renamed')
+
+    def test_version_checked_once_per_interval(self):
+        with override_settings(EMAIL_CONFIG_VERSION_CHECK_INTERVAL=60):
+            get_config_snapshot()
+            EmailConfiguration.objects.filter(pk=self.config.pk).update(
+                brand_name='Elsewhere', updated_at=timezone.now() + timedelta(seconds=1))
+
+            self.assertEqual(get_config_snapshot().brand_name, 'Acme')
+
+    def test_version_bump_from_other_process_invalidates_snapshot(self):
+        first = get_config_snapshot()
+        # A save in another process only moves updated_at; this process' snapshot is not invalidated directly
+        updated_at = self.config.updated_at + timedelta(seconds=1)
+        EmailConfiguration.objects.filter(pk=self.config.pk).update(brand_name='Elsewhere', updated_at=updated_at)
+
+        second = get_config_snapshot()
+        self.assertEqual(second.version, int(updated_at.timestamp() * 1_000_000))
+        self.assertEqual(second.brand_name, 'Elsewhere')
+        self.assertIsNot(first, second)
@@ -0,0 +1,156 @@
+"""
+Tests for the dead-letter store and bulk replay
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..deadletter import replay_dead_letters
+from ..models import EmailDeadLetter, EmailLog, EmailOutbox
+from ..retry import PERMANENT, THROTTLED, TRANSIENT
+from ..tasks import send_bulk_email_task, send_generic_email_task
+from .test_rollups import superuser_token
+
+
+def _log(email_type='otp', status_value='failed'):
+    return EmailLog.objects.create(email='user@example.com', email_type=email_type, subject='Code', action='',
+                                   message='m', status=status_value)
+
+
+def _letter(log, error_class=TRANSIENT, created_at=None):
+    letter = EmailDeadLetter.objects.create(
+        task_name=send_generic_email_task.name,
+        kwargs={'user_email': log.email, 'email_type': log.email_type, 'subject': log.subject,
+                'email_log_id': log.id},
+        email_log_id=log.id,
+        email_type=log.email_type,
+        error='boom',
+        error_class=error_class,
+    )
+    if created_at:
+        EmailDeadLetter.objects.filter(id=letter.id).update(created_at=created_at)
+    return letter
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com', EMAIL_RETRY_POLICY={'MAX_RETRIES': {'transient': 0}})
+class DeadLetterRecordingTestCase(TestCase):
+
+    def test_exhausted_single_email_is_dead_lettered(self):
+        log = _log(status_value='queued')
+        failure = {'status': 'failure', 'error': 'SMTP error: timeout', 'error_class': TRANSIENT}
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value=failure):
+            send_generic_email_task.apply(kwargs={'user_email': log.email, 'email_type': 'otp', 'subject': 'Code',
+                                                  'message': 'm', 'email_log_id': log.id, 'name': 'Ada'})
+
+        letter = EmailDeadLetter.objects.get()
+        self.assertEqual((letter.email_log_id, letter.email_type, letter.error_class), (log.id, 'otp', TRANSIENT))
+        self.assertEqual(letter.kwargs['name'], 'Ada')
+        self.assertEqual(letter.kwargs['user_email'], log.email)
+
+    def test_exhausted_bulk_chunk_is_one_dead_letter(self):
+        logs = [_log('news', 'queued') for _ in range(3)]
+        recipients = [{'email_log_id': log.id, 'user_email': log.email} for log in logs]
+        with mock.patch('apps.email_service.tasks.send_bulk_email_chunk', side_effect=TimeoutError('smtp down')):
+            send_bulk_email_task.apply(kwargs={'recipients': recipients, 'email_type': 'news', 'subject': 'Hi'})
+
+        letter = EmailDeadLetter.objects.get()
+        self.assertEqual((letter.recipients, letter.email_log_id, letter.task_name), (3, None, send_bulk_email_task.name))
+
+
+class ReplayDeadLettersTestCase(TestCase):
+
+    @mock.patch('apps.email_service.deadletter.publish_task', return_value=True)
+    def test_replays_matching_letters_in_staggered_chunks(self, publish_task):
+        logs = [_log() for _ in range(5)]
+        for log in logs:
+            _letter(log)
+        _letter(_log(), error_class=PERMANENT)
+
+        counts = replay_dead_letters(error_class=TRANSIENT, chunk_size=2, rate=2)
+
+        self.assertEqual((counts['letters'], counts['chunks'], counts['celery'], counts['scheduled']), (5, 3, 2, 3))
+        self.assertNotIn('countdown', publish_task.call_args.kwargs)
+        # Later chunks wait in the outbox, due at the replay rate, instead of in worker memory
+        delays = [(entry.available_at - entry.created_at).total_seconds() for entry in EmailOutbox.objects.all()]
+        self.assertEqual([round(delay) for delay in delays], [1, 1, 2])
+        self.assertEqual(EmailLog.objects.filter(status='queued').count(), 5)
+        self.assertEqual(EmailDeadLetter.objects.filter(replayed_at__isnull=True).count(), 1)
+        self.assertEqual(replay_dead_letters(error_class=TRANSIENT)['letters'], 0)
+
+    @mock.patch('apps.email_service.deadletter.publish_task', return_value=False)
+    def test_parks_in_outbox_when_broker_unavailable(self, publish_task):
+        _letter(_log(email_type='otp'))
+        _letter(_log(email_type='news'))
+
+        counts = replay_dead_letters(email_type='news')
+
+        self.assertEqual(counts['outbox'], 1)
+        self.assertEqual(EmailOutbox.objects.get().kwargs['email_type'], 'news')
+
+    def test_time_window_and_dry_run(self):
+        now = timezone.now()
+        _letter(_log(), created_at=now - timedelta(days=2))
+        _letter(_log(), created_at=now - timedelta(hours=1))
+
+        counts = replay_dead_letters(since=now - timedelta(days=1), dry_run=True)
+
+        self.assertEqual((counts['letters'], counts['emails']), (1, 1))
+        self.assertFalse(EmailDeadLetter.objects.filter(replayed_at__isnull=False).exists())
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class DeadLetterAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+    @mock.patch('apps.email_service.deadletter.publish_task', return_value=True)
+    def test_summary_and_replay(self, publish_task):
+        _letter(_log('otp'), error_class=THROTTLED)
+        _letter(_log('news'))
+
+        summary = self.client.get(reverse('email_dead_letters'))
+        response = self.client.post(reverse('email_dead_letter_replay'), {'error_class': THROTTLED}, format='json')
+
+        self.assertEqual(len(summary.data['pending']), 2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['letters'], response.data['dry_run']), (1, False))
+        self.assertEqual(publish_task.call_args.kwargs['kwargs']['email_type'], 'otp')
+
+    def test_invalid_error_class_rejected(self):
+        response = self.client.post(reverse('email_dead_letter_replay'), {'error_class': 'cosmic-ray'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch('apps.email_service.views.publish_task', return_value=False)
+    def test_retry_email_direct_fallback_records_sent_and_closes_dead_letter(self, publish_task):
+        log = _log()
+        _letter(log)
+
+        response = self.client.post(reverse('email_retry', args=[log.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
+        self.assertIsNotNone(log.sent_at)
+        self.assertFalse(EmailDeadLetter.objects.filter(replayed_at__isnull=True).exists())
+
+    def test_retry_email_queues_before_publishing(self):
+        log = _log()
+
+        def worker_sends_at_once(task, kwargs):
+            EmailLog.objects.filter(id=kwargs['email_log_id']).update(status='sent')
+            return True
+
+        with mock.patch('apps.email_service.views.publish_task', side_effect=worker_sends_at_once):
+            response = self.client.post(reverse('email_retry', args=[log.id]))
+
+        self.assertEqual(response.data['processing_method'], 'celery')
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
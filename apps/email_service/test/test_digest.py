@@ -0,0 +1,187 @@
+"""
+Tests for digest mode on the send-email endpoint
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..broker_health import broker_breaker
+from ..digest import add_to_digest, flush_bucket, flush_due_digests
+from ..models import EmailDigest, EmailDigestItem, EmailLog, EmailOutbox
+from ..ratelimit import rate_limiter
+from ..utils import build_email_context, render_email
+from .test_bulk_send import microservice_token
+
+
+def _later(seconds=3600):
+    return timezone.now() + timedelta(seconds=seconds)
+
+
+class DigestTestCase(TestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+
+    def test_flush_bucket_rounds_up(self):
+        moment = datetime(2024, 1, 1, 12, 0, 1, tzinfo=dt_timezone.utc)
+
+        self.assertEqual(flush_bucket(moment, 10), datetime(2024, 1, 1, 12, 0, 10, tzinfo=dt_timezone.utc))
+        self.assertEqual(flush_bucket(moment.replace(second=10), 10), moment.replace(second=10))
+
+    def test_same_key_coalesced_and_repeats_deduplicated(self):
+        add_to_digest('a@example.com', 'status', 'order-1', {'subject': 'Shipped', 'message': 'm1'})
+        add_to_digest('a@example.com', 'status', 'order-1', {'subject': 'Shipped', 'message': 'm1'})
+        add_to_digest('a@example.com', 'status', 'order-1', {'subject': 'Delivered', 'message': 'm2'})
+        add_to_digest('a@example.com', 'status', 'order-2', {'subject': 'Shipped', 'message': 'm1'})
+
+        digest = EmailDigest.objects.get(digest_key='order-1')
+        self.assertEqual(EmailDigest.objects.count(), 2)
+        self.assertEqual(digest.items, 2)
+        self.assertEqual(list(digest.entries.values_list('occurrences', flat=True)), [2, 1])
+
+    def test_window_is_capped_and_bucketed(self):
+        with override_settings(EMAIL_DIGEST={'MAX_WINDOW': 120, 'BUCKET_SECONDS': 60}):
+            digest = add_to_digest('a@example.com', 'status', 'k', {'message': 'm'}, window=86400)
+
+        self.assertLessEqual(digest.flush_at, _later(180))
+        self.assertEqual(digest.flush_at.timestamp() % 60, 0)
+
+    @override_settings(EMAIL_DIGEST={'MAX_ITEMS': 2})
+    def test_full_digest_flushes_early(self):
+        add_to_digest('a@example.com', 'status', 'k', {'message': 'm1'})
+        digest = add_to_digest('a@example.com', 'status', 'k', {'message': 'm2'})
+
+        self.assertLessEqual(digest.flush_at, timezone.now())
+
+    def test_flush_sends_one_email_per_due_digest(self):
+        for i in range(3):
+            add_to_digest('a@example.com', 'status', 'k', {'subject': 'Update', 'message': f'm{i}'})
+        add_to_digest('b@example.com', 'status', 'k', {'subject': 'Solo', 'message': 'only'})
+
+        with mock.patch('apps.email_service.digest.dispatch_task', return_value='celery') as dispatch:
+            self.assertEqual(flush_due_digests(), {'digests': 0, 'notifications': 0, 'emails': 0})
+            counts = flush_due_digests(now=_later())
+
+        self.assertEqual(counts, {'digests': 2, 'notifications': 4, 'emails': 2})
+        self.assertFalse(EmailDigest.objects.exists())
+        self.assertFalse(EmailDigestItem.objects.exists())
+        sent = {call.kwargs['kwargs']['user_email']: call.kwargs['kwargs'] for call in dispatch.call_args_list}
+        self.assertEqual(sent['a@example.com']['subject'], 'Update (3 updates)')
+        self.assertEqual([item['message'] for item in sent['a@example.com']['digest_items']], ['m0', 'm1', 'm2'])
+        self.assertEqual(sent['b@example.com']['subject'], 'Solo')
+        self.assertNotIn('digest_items', sent['b@example.com'])
+        self.assertEqual(EmailLog.objects.count(), 2)
+
+    def test_otp_and_context_kept_when_coalesced(self):
+        add_to_digest('a@example.com', 'login', 'k', {'message': 'Sign-in code', 'otp': '111111'},
+                      context={'device': 'phone'})
+        add_to_digest('a@example.com', 'login', 'k', {'message': 'Sign-in code', 'otp': '222222'},
+                      context={'device': 'laptop'})
+
+        with mock.patch('apps.email_service.digest.dispatch_task', return_value='celery') as dispatch:
+            flush_due_digests(now=_later())
+
+        sent = dispatch.call_args.kwargs['kwargs']
+        self.assertEqual([item['otp'] for item in sent['digest_items']], ['111111', '222222'])
+        self.assertEqual(sent['device'], 'laptop')
+        plain, html = render_email(build_email_context(**{k: v for k, v in sent.items()
+                                                          if k not in ('user_email', 'email_type', 'email_log_id')}))
+        self.assertIn('Your OTP is: 222222', plain)
+        self.assertIn('<span class="otp">111111</span>', html)
+
+    def test_flush_parks_emails_in_outbox_when_broker_down(self):
+        add_to_digest('a@example.com', 'status', 'k', {'message': 'm'})
+        broker_breaker.record_failure()
+        self.addCleanup(broker_breaker.reset)
+
+        flush_due_digests(now=_later())
+
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_command(self):
+        add_to_digest('a@example.com', 'status', 'k', {'message': 'm'})
+        EmailDigest.objects.update(flush_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+
+        with mock.patch('apps.email_service.digest.dispatch_task', return_value='celery'):
+            call_command('flush_email_digests', stdout=out)
+
+        self.assertIn('Digests flushed: 1 (1 notifications) sent as 1 emails', out.getvalue())
+
+    def test_digest_items_rendered(self):
+        context = build_email_context(subject='2 updates', message='You have 2 new notifications.', digest_items=[
+            {'subject': 'Shipped', 'message': 'Your order shipped', 'count': 2},
+            {'subject': 'Delivered', 'message': 'Your order arrived', 'count': 1},
+        ])
+
+        plain, html = render_email(context)
+
+        self.assertIn('- Shipped: Your order shipped (2x)', plain)
+        self.assertIn('<strong>Delivered</strong>', html)
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+@mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+class DigestSendEmailAPITestCase(APITestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+        cache.clear()
+        rate_limiter.reset()
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        self.url = reverse('send_email')
+        self.payload = {'user_email': 'user@example.com', 'email_type': 'status', 'subject': 'Order update',
+                        'message': 'Shipped', 'digest_key': 'order-1'}
+
+    def test_digested_without_log_or_task(self, dispatch_task):
+        first = self.client.post(self.url, self.payload, format='json')
+        second = self.client.post(self.url, dict(self.payload, message='Delivered'), format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['status'], 'digested')
+        self.assertEqual(second.data['pending'], 2)
+        self.assertFalse(EmailLog.objects.exists())
+        dispatch_task.assert_not_called()
+
+    def test_digest_fields_not_passed_as_template_context(self, dispatch_task):
+        self.client.post(self.url, dict(self.payload, digest_key='', action='update'), format='json')
+
+        self.assertNotIn('digest_key', dispatch_task.call_args.kwargs['kwargs'])
+        self.assertFalse(EmailDigest.objects.exists())
+
+    def test_idempotency_key_rejected(self, dispatch_task):
+        response = self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(EMAIL_RATE_LIMITS={'SERVICE': {'RATE': 0.01, 'BURST': 100}, 'RECIPIENT': {'RATE': 0.01, 'BURST': 1}})
+    def test_digest_send_is_rate_limited(self, dispatch_task):
+        first = self.client.post(self.url, self.payload, format='json')
+        second = self.client.post(self.url, dict(self.payload, message='Delivered'), format='json')
+
+        self.assertEqual(first.data['status'], 'digested')
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(EmailDigest.objects.get().items, 1)
+
+    def test_otp_with_digest_key_is_sent_with_the_code(self, dispatch_task):
+        response = self.client.post(self.url, dict(self.payload, otp='123456',
+                                                   additional_data={'device': 'phone'}), format='json')
+
+        with mock.patch('apps.email_service.digest.dispatch_task', return_value='celery') as dispatch:
+            flush_due_digests(now=_later())
+
+        self.assertEqual(response.data['status'], 'digested')
+        sent = dispatch.call_args.kwargs['kwargs']
+        self.assertEqual(sent['otp'], '123456')
+        self.assertEqual(sent['additional_data'], {'device': 'phone'})
+        self.assertNotIn('digest_key', sent)
+        self.assertEqual(EmailLog.objects.get().otp, '123456')
@@ -0,0 +1,87 @@
+"""
+Tests for Idempotency-Key handling on the send-email endpoint
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..broker_health import broker_breaker
+from ..idempotency import idempotency_store
+from ..models import EmailIdempotencyKey, EmailLog
+from .test_bulk_send import microservice_token
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+@mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+class IdempotentSendEmailAPITestCase(APITestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+        idempotency_store.clear()
+        cache.clear()
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        self.url = reverse('send_email')
+        self.payload = {'user_email': 'user@example.com', 'email_type': 'otp', 'subject': 'Code',
+                        'action': 'login', 'message': 'Your code', 'otp': '123456'}
+
+    def test_repeat_returns_original_response_without_sending_again(self, dispatch_task):
+        first = self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        second = self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(EmailLog.objects.count(), 1)
+        self.assertEqual(dispatch_task.call_count, 1)
+
+    def test_replay_served_from_database_after_cache_loss(self, dispatch_task):
+        first = self.client.post(self.url, dict(self.payload, idempotency_key='body-key'), format='json')
+        idempotency_store.clear()
+        cache.clear()
+
+        second = self.client.post(self.url, dict(self.payload, idempotency_key='body-key'), format='json')
+
+        self.assertEqual(second.data['email_log_id'], first.data['email_log_id'])
+        self.assertEqual(dispatch_task.call_count, 1)
+        self.assertNotIn('idempotency_key', dispatch_task.call_args.kwargs['kwargs'])
+
+    def test_key_reused_with_different_body_rejected(self, dispatch_task):
+        self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        response = self.client.post(self.url, dict(self.payload, otp='999999'), format='json',
+                                    HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(EmailLog.objects.count(), 1)
+
+    def test_keys_are_scoped_per_service(self, dispatch_task):
+        self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token('billing'))
+        self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(EmailLog.objects.count(), 2)
+
+    def test_expired_key_sends_again(self, dispatch_task):
+        self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        EmailIdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        idempotency_store.clear()
+        cache.clear()
+
+        response = self.client.post(self.url, self.payload, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(EmailLog.objects.count(), 2)
+        self.assertEqual(EmailIdempotencyKey.objects.count(), 1)
+
+    def test_requests_without_key_are_not_deduplicated(self, dispatch_task):
+        self.client.post(self.url, self.payload, format='json')
+        self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(EmailLog.objects.count(), 2)
+        self.assertEqual(EmailIdempotencyKey.objects.count(), 0)
@@ -0,0 +1,109 @@
+"""
+Tests for the non-blocking structured logging pipeline
+"""
+
+import json
+import logging
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from config.log import JsonFormatter, NonBlockingQueueHandler, SamplingFilter
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+def _record(name='apps.email_service.permissions', level=logging.INFO, msg='hello %s', args=('world',), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class NonBlockingQueueHandlerTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.handler = NonBlockingQueueHandler(targets=[{'class': 'logging.NullHandler'}], queue_size=2)
+        self.target = ListHandler()
+        self.handler.targets = [self.target]
+        self.addCleanup(self.handler.stop)
+
+    def test_records_reach_targets_on_listener_thread(self):
+        threads = []
+        self.target.emit = lambda record: (threads.append(threading.current_thread()),
+                                           self.target.messages.append(record.getMessage()))
+
+        self.handler.handle(_record())
+        self.handler.stop()
+
+        self.assertEqual(self.target.messages, ['hello world'])
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_message_not_formatted_on_calling_thread(self):
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+        argument = mock.Mock(__str__=mock.Mock(return_value='lazy'))
+
+        with mock.patch.object(self.handler, '_ensure_listener'):
+            self.handler.handle(_record(args=(argument,)))
+
+        argument.__str__.assert_not_called()
+        self.assertEqual(self.handler.queue.get_nowait().args, (argument,))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        with mock.patch.object(self.handler, '_ensure_listener'):
+            for _ in range(5):
+                self.handler.handle(_record())
+
+        self.assertEqual(self.handler.queue.qsize(), 2)
+        self.assertEqual(self.handler.dropped, 3)
+
+    def test_listener_restarted_after_fork(self):
+        self.handler.handle(_record())
+        inherited_queue = self.handler.queue
+
+        with mock.patch('config.log.os.getpid', return_value=-1):
+            self.handler.handle(_record())
+            self.assertIsNot(self.handler.queue, inherited_queue)
+            self.handler.stop()
+
+        self.assertEqual(len(self.target.messages), 2)
+
+
+class SamplingFilterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.filter = SamplingFilter(rates={'apps.email_service': 0.0, 'apps.email_service.views': 1.0})
+
+    def test_longest_prefix_wins(self):
+        self.assertFalse(self.filter.filter(_record('apps.email_service.permissions')))
+        self.assertTrue(self.filter.filter(_record('apps.email_service.views')))
+        self.assertTrue(self.filter.filter(_record('apps.email_servicex')))
+
+    def test_warnings_always_kept(self):
+        self.assertTrue(self.filter.filter(_record('apps.email_service.permissions', level=logging.WARNING)))
+
+    def test_partial_rate_samples(self):
+        sampling = SamplingFilter(rates={'apps': 0.25})
+
+        with mock.patch('config.log.random.random', side_effect=[0.1, 0.9]):
+            self.assertTrue(sampling.filter(_record()))
+            self.assertFalse(sampling.filter(_record()))
+
+
+class JsonFormatterTestCase(SimpleTestCase):
+
+    def test_structured_fields(self):
+        entry = json.loads(JsonFormatter().format(_record(service='billing')))
+
+        self.assertEqual(entry['message'], 'hello world')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'apps.email_service.permissions')
+        self.assertEqual(entry['service'], 'billing')
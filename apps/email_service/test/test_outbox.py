@@ -0,0 +1,95 @@
+"""
+Tests for the transactional email outbox
+"""
+
+from unittest import mock
+
+from django.core import mail
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..broker_health import broker_breaker
+from ..models import EmailLog, EmailOutbox
+from ..outbox import claim_outbox_batch, drain_outbox
+from .test_bulk_send import microservice_token
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class EmailOutboxTestCase(APITestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+        self.addCleanup(broker_breaker.reset)
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        self.payload = {
+            'user_email': 'user@example.com',
+            'email_type': 'otp',
+            'subject': 'Your code',
+            'action': 'verify',
+            'message': 'Use the code below',
+            'otp': '123456',
+        }
+
+    def _open_circuit(self):
+        broker_breaker.record_failure()
+        self.assertFalse(broker_breaker.is_available())
+
+    def test_send_email_writes_outbox_when_broker_down(self):
+        self._open_circuit()
+
+        with mock.patch('apps.email_service.views.send_generic_email_task.apply_async') as apply_async:
+            response = self.client.post(reverse('send_email'), self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response.data['processing_method'], 'outbox')
+        apply_async.assert_not_called()
+        self.assertEqual(len(mail.outbox), 0)
+
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.email_log_id, response.data['email_log_id'])
+        self.assertEqual(entry.kwargs['email_log_id'], response.data['email_log_id'])
+
+    def test_failed_publish_falls_back_to_outbox(self):
+        with mock.patch('apps.email_service.views.send_generic_email_task.apply_async',
+                        side_effect=ConnectionRefusedError()):
+            response = self.client.post(reverse('send_email'), self.payload, format='json')
+
+        self.assertEqual(response.data['processing_method'], 'outbox')
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+        self.assertFalse(broker_breaker.is_available())
+
+    def test_drain_publishes_once_broker_returns(self):
+        self._open_circuit()
+        self.client.post(reverse('send_email'), self.payload, format='json')
+        broker_breaker.reset()
+
+        with mock.patch('apps.email_service.tasks.send_generic_email_task.apply_async') as apply_async:
+            counts = drain_outbox()
+
+        self.assertEqual(counts['published'], 1)
+        self.assertEqual(apply_async.call_count, 1)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_drain_defers_while_broker_down(self):
+        self._open_circuit()
+        self.client.post(reverse('send_email'), self.payload, format='json')
+
+        counts = drain_outbox()
+
+        self.assertEqual(counts['deferred'], 1)
+        self.assertEqual(EmailOutbox.objects.get().attempts, 1)
+        # The claimed entry is leased and not handed out again straight away
+        self.assertEqual(claim_outbox_batch(), [])
+
+    def test_drain_direct_fallback_sends_email(self):
+        self._open_circuit()
+        response = self.client.post(reverse('send_email'), self.payload, format='json')
+
+        counts = drain_outbox(direct_fallback=True)
+
+        self.assertEqual(counts['executed'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailLog.objects.get(id=response.data['email_log_id']).status, 'sent')
@@ -0,0 +1,76 @@
+"""
+Tests for page-number and keyset pagination of the email logs endpoint
+"""
+
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import EmailLog
+from .test_rollups import superuser_token
+
+
+class EmailLogPaginationAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        self.url = reverse('email_logs')
+        base = timezone.now() - timedelta(hours=1)
+        self.logs = []
+        for i in range(5):
+            log = EmailLog.objects.create(email=f'user{i}@example.com', email_type='news' if i % 2 else 'otp',
+                                          subject='Hi', action='', message='m')
+            # Two pairs share a timestamp so ties are broken by id
+            EmailLog.objects.filter(id=log.id).update(created_at=base + timedelta(minutes=i // 2))
+            self.logs.append(log)
+        self.newest_first = list(EmailLog.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def _walk(self, params):
+        ids = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_page_number_clients_unchanged(self):
+        response = self.client.get(self.url, {'page': 2, 'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        ids, _ = self._walk({'pagination': 'cursor', 'page_size': 2})
+
+        self.assertEqual(ids, self.newest_first)
+
+    def test_cursor_ascending_order(self):
+        ids, _ = self._walk({'pagination': 'cursor', 'page_size': 2, 'ordering': 'created_at'})
+
+        self.assertEqual(ids, list(reversed(self.newest_first)))
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertEqual([row['id'] for row in back.data['results']],
+                         [row['id'] for row in first.data['results']])
+        self.assertIsNone(first.data['previous'])
+
+    def test_filters_apply_in_cursor_mode(self):
+        ids, _ = self._walk({'pagination': 'cursor', 'page_size': 1, 'email_type': 'news'})
+
+        self.assertEqual(sorted(ids), sorted(log.id for log in self.logs if log.email_type == 'news'))
+
+    def test_invalid_cursor_rejected(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,197 @@
+"""
+Tests for send rate limits and per-service usage accounting
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import EmailLog, EmailServiceUsage
+from ..ratelimit import KIND_RECIPIENT, KIND_SERVICE, RateLimiter, rate_limiter, take_token
+from ..usage import UsageRecorder, usage_recorder
+from .test_bulk_send import microservice_token
+from .test_rollups import superuser_token
+
+
+class TakeTokenTestCase(TestCase):
+
+    def test_new_bucket_starts_full(self):
+        allowed, state, retry_after = take_token(None, 100.0, rate=1.0, burst=3)
+
+        self.assertTrue(allowed)
+        self.assertEqual(state, (2.0, 100.0))
+        self.assertEqual(retry_after, 0.0)
+
+    def test_empty_bucket_reports_time_to_next_token(self):
+        allowed, state, retry_after = take_token((0.5, 100.0), 100.0, rate=0.25, burst=3)
+
+        self.assertFalse(allowed)
+        self.assertEqual(state, (0.5, 100.0))
+        self.assertEqual(retry_after, 2.0)
+
+    def test_refill_is_capped_at_burst(self):
+        allowed, state, _ = take_token((0.0, 0.0), 1000.0, rate=1.0, burst=3)
+
+        self.assertTrue(allowed)
+        self.assertEqual(state, (2.0, 1000.0))
+
+    def test_cost_above_burst_taken_from_full_bucket_as_debt(self):
+        allowed, state, _ = take_token(None, 100.0, rate=1.0, burst=3, cost=5)
+        refused, _, retry_after = take_token(state, 101.0, rate=1.0, burst=3, cost=1)
+
+        self.assertTrue(allowed)
+        self.assertEqual(state, (-2.0, 100.0))
+        self.assertFalse(refused)
+        self.assertEqual(retry_after, 2.0)
+
+
+@override_settings(EMAIL_RATE_LIMITS={'SERVICE': {'RATE': 1.0, 'BURST': 2}, 'RECIPIENT': {'RATE': 1.0, 'BURST': 100}})
+class RateLimiterTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.limiter = RateLimiter()
+
+    def test_service_bucket_runs_out(self):
+        self.assertIsNone(self.limiter.check_send('billing', 'a@example.com'))
+        self.assertIsNone(self.limiter.check_send('billing', 'b@example.com'))
+
+        kind, retry_after = self.limiter.check_send('billing', 'c@example.com')
+
+        self.assertEqual(kind, KIND_SERVICE)
+        self.assertGreater(retry_after, 0)
+        self.assertIsNone(self.limiter.check_send('auth', 'c@example.com'))
+
+    @override_settings(EMAIL_RATE_LIMITS={'SERVICE': {'RATE': 0.01, 'BURST': 2}, 'RECIPIENT': {'RATE': 0.01, 'BURST': 1}})
+    def test_recipient_refusal_takes_no_service_token(self):
+        self.assertIsNone(self.limiter.check_send('billing', 'a@example.com'))
+
+        self.assertEqual(self.limiter.check_send('billing', 'a@example.com')[0], KIND_RECIPIENT)
+        self.assertIsNone(self.limiter.check_send('billing', 'b@example.com'))
+
+    def test_bulk_takes_one_token_per_recipient(self):
+        self.assertIsNone(self.limiter.check_bulk('billing', 2))
+
+        self.assertEqual(self.limiter.check_bulk('billing', 1)[0], KIND_SERVICE)
+
+    @override_settings(EMAIL_RATE_LIMITS={'SERVICE': {'RATE': 1.0, 'BURST': 2},
+                                          'SERVICE_OVERRIDES': {'billing': {'RATE': 1.0, 'BURST': 5}}})
+    def test_service_override(self):
+        results = [self.limiter.check_send('billing', f'{i}@example.com') for i in range(5)]
+
+        self.assertEqual(results, [None] * 5)
+
+    def test_falls_back_to_process_buckets_when_cache_fails(self):
+        with mock.patch('apps.email_service.ratelimit.cache.get', side_effect=ConnectionError('cache down')):
+            first = self.limiter.take(KIND_SERVICE, 'billing')
+            second = self.limiter.take(KIND_SERVICE, 'billing')
+            third = self.limiter.take(KIND_SERVICE, 'billing')
+
+        self.assertEqual([first[0], second[0], third[0]], [True, True, False])
+
+    @override_settings(EMAIL_RATE_LIMITS={'ENABLED': False, 'SERVICE': {'RATE': 1.0, 'BURST': 0}})
+    def test_disabled(self):
+        self.assertIsNone(self.limiter.check_send('billing', 'a@example.com'))
+
+
+class UsageRecorderTestCase(TestCase):
+
+    def test_counts_are_buffered_until_flush(self):
+        recorder = UsageRecorder(flush_interval=3600)
+        recorder.record('billing', accepted=2)
+        recorder.record('billing', accepted=1, rejected=1)
+
+        self.assertFalse(EmailServiceUsage.objects.exists())
+        recorder.flush()
+        recorder.record('billing', accepted=4)
+        recorder.flush()
+
+        usage = EmailServiceUsage.objects.get(service='billing', day=timezone.localdate())
+        self.assertEqual((usage.accepted, usage.rejected), (7, 1))
+
+    def test_failed_flush_keeps_counts(self):
+        recorder = UsageRecorder(flush_interval=3600)
+        recorder.record('billing', accepted=3)
+        with mock.patch.object(recorder, '_apply', side_effect=RuntimeError('db down')):
+            recorder.flush()
+        recorder.flush()
+
+        self.assertEqual(EmailServiceUsage.objects.get(service='billing').accepted, 3)
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com',
+                   EMAIL_RATE_LIMITS={'SERVICE': {'RATE': 0.01, 'BURST': 2}, 'RECIPIENT': {'RATE': 0.01, 'BURST': 100}})
+@mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+class RateLimitedSendEmailAPITestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        rate_limiter.reset()
+        usage_recorder.clear()
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token('billing'))
+        self.url = reverse('send_email')
+        self.payload = {'user_email': 'user@example.com', 'email_type': 'otp', 'subject': 'Code',
+                        'action': 'login', 'message': 'Your code', 'otp': '123456'}
+
+    def test_over_limit_rejected_before_anything_is_written(self, dispatch_task):
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.url, self.payload, format='json').status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '100')
+        self.assertEqual(EmailLog.objects.count(), 2)
+        self.assertEqual(dispatch_task.call_count, 2)
+
+    @override_settings(EMAIL_RATE_LIMITS={'RECIPIENT': {'RATE': 0.01, 'BURST': 1}})
+    def test_recipient_limit(self, dispatch_task):
+        self.client.post(self.url, self.payload, format='json')
+
+        repeated = self.client.post(self.url, dict(self.payload, user_email='USER@example.com'), format='json')
+        other = self.client.post(self.url, dict(self.payload, user_email='other@example.com'), format='json')
+
+        self.assertEqual(repeated.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('recipient', repeated.data['details'])
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_usage_endpoint_reports_accepted_and_rejected(self, dispatch_task):
+        for _ in range(3):
+            self.client.post(self.url, self.payload, format='json')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        response = self.client.get(reverse('email_service_usage'), {'service': 'billing'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['usage']), 1)
+        self.assertEqual(response.data['usage'][0]['accepted'], 2)
+        self.assertEqual(response.data['usage'][0]['rejected'], 1)
+
+    def test_usage_endpoint_rejects_inverted_range(self, dispatch_task):
+        today = timezone.localdate()
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+        response = self.client.get(reverse('email_service_usage'),
+                                   {'since': today, 'until': today - timedelta(days=1)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_send_charged_per_recipient(self, dispatch_task):
+        bulk_url = reverse('send_bulk_email')
+        recipients = [{'user_email': f'user{i}@example.com'} for i in range(2)]
+
+        first = self.client.post(bulk_url, {'recipients': recipients, 'subject': 'News'}, format='json')
+        second = self.client.post(bulk_url, {'recipients': recipients, 'subject': 'News'}, format='json')
+        single = self.client.post(self.url, self.payload, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('service', second.data['details'])
+        self.assertEqual(single.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(EmailLog.objects.count(), 2)
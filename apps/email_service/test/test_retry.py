@@ -0,0 +1,156 @@
+"""
+Tests for the error-classified retry policy
+"""
+
+import random
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from ..models import EmailLog, EmailOutbox
+from ..outbox import drain_outbox
+from ..retry import (
+    PERMANENT,
+    THROTTLED,
+    TRANSIENT,
+    RetryPolicy,
+    classify_exception,
+    classify_result,
+    classify_smtp_reply,
+)
+from ..tasks import send_generic_email_task
+
+
+class ClassificationTestCase(SimpleTestCase):
+
+    def test_smtp_reply_codes(self):
+        self.assertEqual(classify_smtp_reply(550, b'5.1.1 User unknown'), PERMANENT)
+        self.assertEqual(classify_smtp_reply(421, b'Service not available'), THROTTLED)
+        self.assertEqual(classify_smtp_reply(451, b'4.7.1 Rate limited, try again later'), THROTTLED)
+        self.assertEqual(classify_smtp_reply(451, b'4.3.0 Local error in processing'), TRANSIENT)
+
+    def test_exceptions(self):
+        self.assertEqual(classify_exception(ValueError('Invalid email format')), PERMANENT)
+        self.assertEqual(classify_exception(FileNotFoundError('email.html')), PERMANENT)
+        self.assertEqual(classify_exception(smtplib.SMTPServerDisconnected()), TRANSIENT)
+        self.assertEqual(classify_exception(TimeoutError()), TRANSIENT)
+        self.assertEqual(classify_exception(smtplib.SMTPDataError(554, b'Message rejected')), PERMANENT)
+        self.assertEqual(classify_exception(
+            smtplib.SMTPRecipientsRefused({'a@example.com': (452, b'4.5.3 Too many recipients')})), THROTTLED)
+        self.assertEqual(classify_exception(
+            smtplib.SMTPRecipientsRefused({'a@example.com': (550, b'No such user')})), PERMANENT)
+
+    def test_results(self):
+        self.assertEqual(classify_result({'error': 'x', 'error_class': THROTTLED}), THROTTLED)
+        self.assertEqual(classify_result({'error': 'Validation error: Invalid email format'}), PERMANENT)
+        self.assertEqual(classify_result({'error': 'Unexpected error: boom'}), TRANSIENT)
+
+
+class RetryPolicyTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(
+            base_delay={TRANSIENT: 10, THROTTLED: 100},
+            max_delay={TRANSIENT: 60, THROTTLED: 600},
+            max_retries={PERMANENT: 0, TRANSIENT: 2, THROTTLED: 4},
+            rng=random.Random(7),
+        )
+
+    def test_caps_per_class(self):
+        self.assertFalse(self.policy.should_retry(PERMANENT, 0))
+        self.assertTrue(self.policy.should_retry(TRANSIENT, 1))
+        self.assertFalse(self.policy.should_retry(TRANSIENT, 2))
+        self.assertTrue(self.policy.should_retry(THROTTLED, 3))
+
+    def test_decorrelated_jitter_stays_within_bounds(self):
+        delay = None
+        delays = []
+        for _ in range(50):
+            delay = self.policy.next_delay(TRANSIENT, delay)
+            delays.append(delay)
+
+        self.assertTrue(all(10 <= value <= 60 for value in delays))
+        self.assertGreater(len(set(delays)), 10)
+        self.assertGreaterEqual(self.policy.next_delay(THROTTLED), 100)
+
+
+@override_settings(
+    DEFAULT_FROM_EMAIL='no-reply@example.com',
+    EMAIL_RETRY_POLICY={'MAX_RETRIES': {'transient': 2}, 'BASE_DELAY': {'transient': 1}},
+)
+class TaskRetryTestCase(TestCase):
+
+    def setUp(self):
+        self.log = EmailLog.objects.create(email='user@example.com', email_type='otp', subject='Code',
+                                           action='', message='m')
+
+    def _run(self):
+        return send_generic_email_task.apply(kwargs={
+            'user_email': 'user@example.com', 'email_type': 'otp', 'subject': 'Code', 'message': 'm',
+            'email_log_id': self.log.id,
+        })
+
+    def test_permanent_failure_not_retried(self):
+        failure = {'status': 'failure', 'error': 'Validation error: Invalid email format', 'error_class': PERMANENT}
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value=failure) as send:
+            self._run()
+
+        self.assertEqual(send.call_count, 1)
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.status, self.log.error_class, self.log.attempts), ('failed', PERMANENT, 1))
+        self.assertTrue(self.log.error.startswith('Permanent failure'))
+
+    @override_settings(EMAIL_RETRY_OUTBOX_DELAY=3600)
+    def test_transient_failure_retried_up_to_class_cap_with_growing_delay_header(self):
+        failure = {'status': 'failure', 'error': 'SMTP error: timeout', 'error_class': TRANSIENT}
+        headers = []
+        original_retry = send_generic_email_task.retry
+
+        def spy_retry(*args, **kwargs):
+            headers.append(kwargs['headers'])
+            return original_retry(*args, **kwargs)
+
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value=failure) as send, \
+                mock.patch.object(send_generic_email_task, 'retry', side_effect=spy_retry):
+            self._run()
+
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(len(headers), 2)
+        self.assertTrue(all(1 <= h['retry_delay'] <= 1800 for h in headers))
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.status, self.log.attempts), ('failed', 3))
+        self.assertTrue(self.log.error.startswith('Max retries exceeded'))
+
+    @override_settings(EMAIL_RETRY_OUTBOX_DELAY=0)
+    def test_long_retry_delay_waits_in_outbox(self):
+        failure = {'status': 'failure', 'error': 'SMTP error: timeout', 'error_class': TRANSIENT}
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value=failure) as send, \
+                mock.patch.object(send_generic_email_task, 'retry') as retry:
+            started = timezone.now()
+            self._run()
+
+        retry.assert_not_called()
+        self.assertEqual(send.call_count, 1)
+        entry = EmailOutbox.objects.get()
+        self.assertEqual((entry.task_name, entry.retries), (send_generic_email_task.name, 1))
+        self.assertEqual(entry.kwargs['email_log_id'], self.log.id)
+        self.assertGreaterEqual(entry.available_at, started + timedelta(seconds=entry.headers['retry_delay']))
+
+        EmailOutbox.objects.update(available_at=timezone.now())
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value={'status': 'success'}), \
+                mock.patch('apps.email_service.outbox.broker_breaker.is_available', return_value=False):
+            counts = drain_outbox(direct_fallback=True)
+
+        self.assertEqual(counts['executed'], 1)
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.status, self.log.attempts), ('sent', 2))
+
+    def test_success_records_attempts(self):
+        with mock.patch('apps.email_service.tasks.send_generic_email', return_value={'status': 'success'}):
+            self._run()
+
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.status, self.log.attempts), ('sent', 1))
@@ -0,0 +1,113 @@
+"""
+Tests for the hourly email statistics rollups and the stats endpoints
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ..models import EmailLog, EmailStatsRollup
+from ..rollups import hour_bucket
+from ..status_buffer import update_email_status, update_email_statuses
+from ..tasks import create_email_log
+
+
+def superuser_token():
+    token = AccessToken()
+    token['user_id'] = 1
+    token['email'] = 'admin@example.com'
+    token['is_superuser'] = True
+    return str(token)
+
+
+def _create(email_type='news', email='user@example.com'):
+    return create_email_log(email=email, email_type=email_type, subject='Hi', action='', message='m', status='queued')
+
+
+def _rollup_counts():
+    return {(r.email_type, r.status): r.count for r in EmailStatsRollup.objects.exclude(count=0)}
+
+
+class EmailStatsRollupTestCase(TestCase):
+
+    def test_counts_follow_status_transitions(self):
+        first = _create()
+        second = _create()
+        _create(email_type='otp')
+
+        update_email_status(first.id, 'sent', sent_at=timezone.now())
+        update_email_statuses({second.id: {'status': 'failed', 'error': 'boom'}})
+
+        self.assertEqual(_rollup_counts(), {
+            ('news', 'sent'): 1,
+            ('news', 'failed'): 1,
+            ('otp', 'queued'): 1,
+        })
+
+    def test_unchanged_status_does_not_move_counts(self):
+        log = _create()
+        update_email_status(log.id, 'queued', error='retrying')
+
+        self.assertEqual(_rollup_counts(), {('news', 'queued'): 1})
+
+    def test_backfill_rebuilds_from_email_log(self):
+        _create()
+        log = _create(email_type='otp')
+        EmailLog.objects.filter(id=log.id).update(status='sent')
+        EmailStatsRollup.objects.all().delete()
+
+        call_command('backfill_email_rollups', stdout=StringIO())
+
+        self.assertEqual(_rollup_counts(), {('news', 'queued'): 1, ('otp', 'sent'): 1})
+        self.assertEqual(EmailStatsRollup.objects.get(email_type='otp').hour, hour_bucket(log.created_at))
+
+
+class EmailStatsAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        for email_type, log_status in [('news', 'sent'), ('news', 'sent'), ('news', 'failed'), ('otp', 'queued')]:
+            log = _create(email_type=email_type)
+            update_email_status(log.id, log_status)
+
+    def test_stats_read_from_rollups(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('email_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_emails'], 4)
+        self.assertEqual(response.data['successful_emails'], 2)
+        self.assertEqual(response.data['failed_emails'], 1)
+        self.assertEqual(response.data['pending_emails'], 1)
+        self.assertEqual(response.data['success_rate'], 50.0)
+
+    def test_type_stats_read_from_rollups(self):
+        response = self.client.get(reverse('email_type_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row['email_type'], row['count'], row['success_rate']) for row in response.data],
+                         [('news', 3, 66.67), ('otp', 1, 0.0)])
+
+    def test_timeseries_buckets(self):
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('email_timeseries'), {'since': since, 'bucket': 'hour', 'email_type': 'news'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        point = response.data['results'][0]
+        self.assertEqual((point['total'], point['sent'], point['failed']), (3, 2, 1))
+
+    def test_timeseries_rejects_inverted_range(self):
+        now = timezone.now()
+        response = self.client.get(reverse('email_timeseries'), {
+            'since': now.isoformat(), 'until': (now - timedelta(hours=1)).isoformat(),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,94 @@
+"""
+Tests for Celery lane routing and per-lane latency metrics
+"""
+
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config.celery import app
+from ..broker_health import broker_breaker, publish_task
+from ..metrics import LANE_LATENCY, Histogram, MetricsRecorder, metrics
+from ..models import EmailLog
+from ..routing import route_email_task
+from ..tasks import send_bulk_email_task, send_generic_email_task
+from .test_rollups import superuser_token
+
+
+@override_settings(EMAIL_PRIORITY_LANE={'EMAIL_TYPES': ['otp', 'password_reset'], 'ACTIONS': ['login']})
+class RoutingTestCase(SimpleTestCase):
+
+    def _queue(self, task, **kwargs):
+        return app.amqp.router.route({}, task.name, args=(), kwargs=kwargs)['queue'].name
+
+    def test_time_critical_mail_uses_priority_lane(self):
+        self.assertEqual(self._queue(send_generic_email_task, email_type='OTP'), 'email_priority')
+        self.assertEqual(self._queue(send_generic_email_task, email_type='notice', action='login'), 'email_priority')
+
+    def test_other_mail_uses_default_and_bulk_lanes(self):
+        self.assertEqual(self._queue(send_generic_email_task, email_type='newsletter'), 'email_default')
+        self.assertEqual(self._queue(send_bulk_email_task, email_type='otp'), 'email_bulk')
+        self.assertIsNone(route_email_task('other.task', (), {}, {}))
+
+    def test_publish_stamps_enqueue_time(self):
+        broker_breaker.reset()
+        with mock.patch.object(send_generic_email_task, 'apply_async') as apply_async:
+            publish_task(send_generic_email_task, kwargs={'user_email': 'a@example.com'})
+
+        self.assertAlmostEqual(apply_async.call_args.kwargs['headers']['enqueued_at'], time.time(), delta=5)
+
+
+class HistogramTestCase(SimpleTestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for _ in range(98):
+            histogram.observe(0.02)
+        histogram.observe(3.0)
+        histogram.observe(3.0)
+
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 100)
+        self.assertLessEqual(summary['p50'], 0.025)
+        self.assertGreater(summary['p99'], 2.5)
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class LaneLatencyTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset(LANE_LATENCY)
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+    def test_task_records_latency_for_its_lane(self):
+        log = EmailLog.objects.create(email='user@example.com', email_type='otp', subject='Code', action='', message='m')
+        send_generic_email_task.apply(
+            kwargs={'user_email': log.email, 'email_type': 'otp', 'subject': 'Code', 'message': 'm',
+                    'email_log_id': log.id},
+            headers={'enqueued_at': time.time() - 0.5},
+        )
+
+        response = self.client.get(reverse('email_lane_metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        priority = response.data['lanes']['priority']
+        self.assertEqual(priority['count'], 1)
+        self.assertEqual(priority['queue'], 'email_priority')
+        self.assertGreaterEqual(priority['p50'], 0.25)
+        self.assertEqual(response.data['lanes']['bulk']['count'], 0)
+
+    def test_latency_recorded_in_another_process_is_reported(self):
+        worker_metrics = MetricsRecorder()
+        worker_metrics.observe(LANE_LATENCY, 'bulk', 2.0)
+        worker_metrics.flush()
+
+        response = self.client.get(reverse('email_lane_metrics'))
+
+        self.assertEqual(response.data['lanes']['bulk']['count'], 1)
+        self.assertEqual(response.data['lanes']['bulk']['mean'], 2.0)
@@ -0,0 +1,111 @@
+"""
+Tests for scheduled sends (send_at) on the send-email endpoint
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..broker_health import broker_breaker
+from ..models import EmailLog, EmailOutbox
+from ..outbox import drain_outbox, schedule_task
+from ..ratelimit import rate_limiter
+from ..tasks import send_generic_email_task
+from .test_bulk_send import microservice_token
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+@mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+class ScheduledSendAPITestCase(APITestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+        cache.clear()
+        rate_limiter.reset()
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        self.url = reverse('send_email')
+        self.payload = {'user_email': 'user@example.com', 'email_type': 'reminder', 'subject': 'Reminder',
+                        'action': 'remind', 'message': 'Your trial ends tomorrow'}
+
+    def test_future_send_is_parked_until_due(self, dispatch_task):
+        send_at = timezone.now() + timedelta(days=2)
+
+        response = self.client.post(self.url, dict(self.payload, send_at=send_at.isoformat()), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['processing_method'], 'scheduled')
+        dispatch_task.assert_not_called()
+        entry = EmailOutbox.objects.get()
+        self.assertEqual(entry.available_at, send_at)
+        self.assertEqual(entry.send_at, send_at)
+        self.assertEqual(entry.email_log_id, response.data['email_log_id'])
+        self.assertNotIn('send_at', entry.kwargs)
+        self.assertEqual(EmailLog.objects.get().status, 'queued')
+
+    def test_past_send_at_sends_now(self, dispatch_task):
+        send_at = timezone.now() - timedelta(minutes=1)
+
+        response = self.client.post(self.url, dict(self.payload, send_at=send_at.isoformat()), format='json')
+
+        self.assertEqual(response.data['processing_method'], 'celery')
+        dispatch_task.assert_called_once()
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    @override_settings(EMAIL_SEND_AT_MAX_AHEAD_DAYS=7)
+    def test_too_far_ahead_rejected(self, dispatch_task):
+        send_at = timezone.now() + timedelta(days=8)
+
+        response = self.client.post(self.url, dict(self.payload, send_at=send_at.isoformat()), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('send_at', response.data['details'])
+        self.assertFalse(EmailLog.objects.exists())
+
+    def test_digest_key_rejected(self, dispatch_task):
+        send_at = timezone.now() + timedelta(hours=1)
+
+        response = self.client.post(self.url, dict(self.payload, send_at=send_at.isoformat(), digest_key='k'),
+                                    format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ScheduledDrainTestCase(TestCase):
+
+    def setUp(self):
+        broker_breaker.reset()
+
+    def _schedule(self, send_at):
+        email_log = EmailLog.objects.create(email='user@example.com', email_type='reminder', action='remind', status='queued')
+        return schedule_task(send_generic_email_task, send_at, kwargs={'user_email': 'user@example.com',
+                                                                      'email_log_id': email_log.id},
+                             email_log=email_log)
+
+    def test_only_due_rows_are_published(self):
+        due = self._schedule(timezone.now() - timedelta(seconds=1))
+        self._schedule(timezone.now() + timedelta(days=1))
+
+        with mock.patch('apps.email_service.outbox.publish_task', return_value=True) as publish:
+            counts = drain_outbox()
+
+        self.assertEqual((counts['claimed'], counts['published']), (1, 1))
+        self.assertEqual(publish.call_args.kwargs['headers'], {'enqueued_at': due.send_at.timestamp()})
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_command_dispatches_due_rows(self):
+        self._schedule(timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+
+        with mock.patch('apps.email_service.outbox.publish_task', return_value=True):
+            call_command('drain_email_outbox', stdout=out)
+
+        self.assertIn('Outbox drained: 1 published', out.getvalue())
+        self.assertFalse(EmailOutbox.objects.exists())
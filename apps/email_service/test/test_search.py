@@ -0,0 +1,65 @@
+"""
+Tests for full-text search and case-normalized recipient lookups on the logs endpoint
+"""
+
+from django.db import connection
+from django.db.models import CharField
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import EmailLog
+from ..search import get_search_backend, search_terms
+from .test_rollups import superuser_token
+
+
+class EmailLogSearchAPITestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        self.url = reverse('email_logs')
+        self.invoice = EmailLog.objects.create(email='Billing@Example.com', email_type='invoice',
+                                               subject='Your invoice is ready', action='', message='Amount due')
+        self.reminder = EmailLog.objects.create(email='other@example.com', email_type='reminder',
+                                                subject='Reminder', action='', message='Your invoice is overdue')
+        EmailLog.objects.create(email='third@example.com', email_type='otp', subject='Code', action='',
+                                message='Use 1234')
+
+    def _ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.data['results']]
+
+    def test_full_text_backend_installed(self):
+        self.assertIsNotNone(get_search_backend())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM email_service_emaillog_fts")
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+    def test_subject_match_ranks_above_message_match(self):
+        self.assertEqual(self._ids({'search': 'invoice'}), [self.invoice.id, self.reminder.id])
+
+    def test_prefix_and_multiple_terms(self):
+        self.assertEqual(self._ids({'search': 'invo overdue'}), [self.reminder.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        EmailLog.objects.filter(id=self.reminder.id).update(message='Paid in full')
+        self.assertEqual(self._ids({'search': 'overdue'}), [])
+
+        self.invoice.delete()
+        self.assertEqual(self._ids({'search': 'invoice'}), [])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.assertEqual(self._ids({'search': 'invoice', 'ordering': 'created_at'}), [self.invoice.id, self.reminder.id])
+        self.assertEqual(self._ids({'search': 'invoice', 'ordering': '-created_at'}), [self.reminder.id, self.invoice.id])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(search_terms('invoice" OR *'), ['invoice', 'OR'])
+        self.assertEqual(self._ids({'search': '"(*'}), self._ids({}))
+
+    def test_email_filter_is_case_insensitive_exact(self):
+        self.assertEqual(self._ids({'email': 'billing@example.COM'}), [self.invoice.id])
+        self.assertEqual(self._ids({'email': 'billing@example'}), [])
+
+    def test_email_filter_registers_no_global_lookup(self):
+        self.assertIsNone(CharField.get_lookups().get('lower'))
@@ -0,0 +1,116 @@
+"""
+Tests for the pooled SMTP connections, run against the in-process SMTP sink
+"""
+
+from unittest import mock
+
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+
+from ..smtp_pool import SMTPConnectionPool, get_smtp_pool, reset_smtp_pool
+from ..smtp_sink import LocalSMTPSink
+
+
+def _message(to='user@example.com'):
+    return EmailMessage('Subject', 'Body', 'no-reply@example.com', [to])
+
+
+class SMTPConnectionPoolTestCase(SimpleTestCase):
+
+    def _pool(self, sink, **kwargs):
+        params = {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': sink.host,
+            'port': sink.port,
+            'use_tls': False,
+            'use_ssl': False,
+            'timeout': 5,
+        }
+        pool = SMTPConnectionPool(params, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_connection_reused_between_sends(self):
+        with LocalSMTPSink() as sink:
+            pool = self._pool(sink)
+            for _ in range(5):
+                pool.send_messages([_message()])
+
+            self.assertEqual(sink.messages_received, 5)
+            self.assertEqual(sink.connections_opened, 1)
+            self.assertEqual(pool.stats()['created'], 1)
+            self.assertEqual(pool.stats()['reused'], 4)
+
+    def test_connection_recycled_after_message_cap(self):
+        with LocalSMTPSink() as sink:
+            pool = self._pool(sink, max_messages_per_connection=2)
+            for _ in range(5):
+                pool.send_messages([_message()])
+
+            self.assertEqual(sink.messages_received, 5)
+            self.assertEqual(sink.connections_opened, 3)
+            self.assertEqual(pool.stats()['recycled'], 2)
+
+    def test_reconnects_when_server_drops_connection(self):
+        with LocalSMTPSink(disconnect_after=1) as sink:
+            pool = self._pool(sink, health_check_after_seconds=3600)
+            for _ in range(3):
+                pool.send_messages([_message()])
+
+            self.assertEqual(sink.messages_received, 3)
+            self.assertEqual(pool.stats()['reconnects'], 2)
+
+    def test_health_check_discards_dead_idle_connection(self):
+        with LocalSMTPSink(disconnect_after=1) as sink:
+            pool = self._pool(sink, health_check_after_seconds=0)
+            pool.send_messages([_message()])
+            pool.send_messages([_message()])
+
+            self.assertEqual(sink.messages_received, 2)
+            self.assertEqual(pool.stats()['health_check_failures'], 1)
+            self.assertEqual(pool.stats()['reconnects'], 0)
+
+    def test_connection_context_sends_several_messages(self):
+        with LocalSMTPSink() as sink:
+            pool = self._pool(sink)
+            with pool.connection() as conn:
+                pool.send_on(conn, [_message('a@example.com'), _message('b@example.com')])
+
+            self.assertEqual(sink.messages_received, 2)
+            self.assertEqual(pool.stats()['idle'], 1)
+            self.assertEqual(pool.stats()['in_use'], 0)
+
+    def test_send_each_keeps_results_of_messages_sent_before_a_failure(self):
+        with LocalSMTPSink() as sink:
+            pool = self._pool(sink)
+            with mock.patch.object(pool, 'send_on', side_effect=[1, OSError('timed out')]):
+                results = pool.send_each([_message('a@example.com'), _message('b@example.com'),
+                                          _message('c@example.com')])
+
+            self.assertIsNone(results[0])
+            self.assertEqual([str(exc) for exc in results[1:]], ['timed out', 'timed out'])
+            self.assertEqual(pool.stats()['in_use'], 0)
+
+    def test_send_each_reports_failed_checkout_per_message(self):
+        pool = self._pool(mock.Mock(host='localhost', port=1))
+
+        with mock.patch.object(pool, '_open', side_effect=ConnectionRefusedError('refused')):
+            results = pool.send_each([_message(), _message()])
+
+        self.assertEqual([type(exc) for exc in results], [ConnectionRefusedError, ConnectionRefusedError])
+
+
+class SMTPPoolServerSettingTestCase(SimpleTestCase):
+
+    def test_server_setting_wins_over_configured_host(self):
+        snapshot = mock.Mock(smtp_host='smtp.invalid')
+        self.addCleanup(reset_smtp_pool)
+
+        with LocalSMTPSink() as sink, \
+                override_settings(EMAIL_SMTP_POOL={'SERVER': (sink.host, sink.port), 'TIMEOUT': 5}), \
+                mock.patch('apps.email_service.smtp_pool.get_config_snapshot', return_value=snapshot):
+            reset_smtp_pool()
+            get_smtp_pool().send_messages([_message()])
+            reset_smtp_pool()
+
+        self.assertEqual(sink.messages_received, 1)
@@ -0,0 +1,62 @@
+"""
+Tests for per-stage email pipeline timing
+"""
+
+import time
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..metrics import PIPELINE_STAGES, metrics, stage_metric
+from ..models import EmailLog
+from ..tasks import send_direct_email, send_generic_email_task
+from .test_rollups import superuser_token
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class StageMetricsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        for stage in PIPELINE_STAGES:
+            metrics.reset(stage_metric(stage))
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+    def test_task_records_every_stage_by_email_type(self):
+        send_generic_email_task.apply(
+            kwargs={'user_email': 'user@example.com', 'email_type': 'otp', 'subject': 'Code', 'action': '',
+                    'message': 'm'},
+            headers={'enqueued_at': time.time() - 0.5},
+        )
+
+        response = self.client.get(reverse('email_stage_metrics'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stages = response.data['stages']
+        self.assertEqual(set(stages), set(PIPELINE_STAGES))
+        for stage in ('queue_wait', 'render', 'smtp', 'total'):
+            self.assertEqual(stages[stage]['otp']['count'], 1, stage)
+        # Log creation + processing, then the sent status
+        self.assertEqual(stages['db']['otp']['count'], 2)
+        self.assertGreaterEqual(stages['queue_wait']['otp']['p50'], 0.25)
+        self.assertIsNotNone(stages['total']['otp']['p99'])
+
+    def test_direct_path_recorded_and_filtered_by_email_type(self):
+        send_direct_email('user@example.com', email_type='welcome', subject='Hi', action='', message='m')
+        send_direct_email('user@example.com', email_type='news', subject='Hi', action='', message='m')
+
+        response = self.client.get(reverse('email_stage_metrics'), {'email_type': 'welcome'})
+
+        self.assertEqual(list(response.data['stages']['smtp']), ['welcome'])
+        self.assertEqual(response.data['stages']['total']['welcome']['count'], 1)
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 2)
+
+    def test_requires_superuser(self):
+        self.client.credentials()
+
+        response = self.client.get(reverse('email_stage_metrics'))
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
@@ -0,0 +1,84 @@
+"""
+Tests for the write-behind EmailLog status buffer
+"""
+
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import EmailLog
+from ..status_buffer import EmailStatusBuffer, status_buffer, update_email_status
+
+
+def _log(email='user@example.com'):
+    return EmailLog.objects.create(email=email, email_type='news', subject='Hi', action='', message='m')
+
+
+class EmailStatusBufferTestCase(TestCase):
+
+    def test_transitions_for_same_log_coalesce_into_one_write(self):
+        log = _log()
+        buffer = EmailStatusBuffer(max_size=10, max_delay=60)
+        buffer.record(log.id, status='processing')
+        buffer.record(log.id, status='sent', sent_at=timezone.now())
+
+        with mock.patch.object(EmailLog.objects, 'bulk_update', wraps=EmailLog.objects.bulk_update) as bulk_update:
+            self.assertEqual(buffer.flush(), 1)
+
+        self.assertEqual(bulk_update.call_count, 1)
+
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
+        self.assertIsNotNone(log.sent_at)
+        self.assertEqual(buffer.stats()['coalesced'], 1)
+
+    def test_flushes_when_max_size_reached(self):
+        logs = [_log(f'user{i}@example.com') for i in range(3)]
+        buffer = EmailStatusBuffer(max_size=3, max_delay=60)
+        buffer.record(logs[0].id, status='sent')
+        buffer.record(logs[1].id, status='sent')
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 0)
+
+        buffer.record(logs[2].id, status='failed', error='boom')
+
+        self.assertEqual(buffer.stats()['pending'], 0)
+        self.assertEqual(EmailLog.objects.filter(status='sent').count(), 2)
+        self.assertEqual(EmailLog.objects.get(id=logs[2].id).error, 'boom')
+
+    def test_failed_flush_keeps_pending_and_newer_transitions_win(self):
+        log = _log()
+        buffer = EmailStatusBuffer(max_size=10, max_delay=60)
+        buffer.record(log.id, status='processing')
+
+        with mock.patch('apps.email_service.status_buffer.write_status_updates', side_effect=RuntimeError('db down')):
+            self.assertEqual(buffer.flush(), 0)
+
+        buffer.record(log.id, status='sent')
+        self.assertEqual(buffer.stats()['pending'], 1)
+        buffer.flush()
+
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
+        self.assertEqual(buffer.stats()['flush_errors'], 1)
+
+    def test_writes_synchronously_outside_workers(self):
+        log = _log()
+        self.assertFalse(status_buffer.enabled)
+
+        update_email_status(log.id, 'failed', error='boom')
+
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'failed')
+
+    @override_settings(EMAIL_STATUS_BUFFER={'WRITE_BEHIND': False})
+    def test_write_behind_switch_disables_buffering(self):
+        log = _log()
+        status_buffer.enable(start_flusher=False)
+        self.addCleanup(status_buffer.disable)
+
+        update_email_status(log.id, 'sent')
+
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'sent')
+        self.assertEqual(status_buffer.stats()['pending'], 0)
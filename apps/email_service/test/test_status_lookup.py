@@ -0,0 +1,71 @@
+"""
+Tests for the batch email status lookup
+"""
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..models import EmailLog
+from .test_rollups import superuser_token
+
+
+class EmailStatusLookupTestCase(APITestCase):
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        self.url = reverse('email_status_lookup')
+        self.sent = EmailLog.objects.create(email='a@example.com', email_type='news', action='',
+                                            status='sent', sent_at=timezone.now())
+        self.queued = EmailLog.objects.create(email='b@example.com', email_type='news', action='', status='queued')
+
+    def _lookup(self, ids, **headers):
+        return self.client.post(self.url, {'ids': ids}, format='json', **headers)
+
+    def test_map_from_one_query(self):
+        missing = self.queued.id + 100
+
+        with self.assertNumQueries(1):
+            response = self._lookup([self.queued.id, self.sent.id, missing, self.sent.id])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = response.data['statuses']
+        self.assertEqual(list(statuses), [str(self.sent.id), str(self.queued.id), str(missing)])
+        self.assertEqual(statuses[str(self.sent.id)], {'status': 'sent', 'sent_at': self.sent.sent_at.isoformat()})
+        self.assertEqual(statuses[str(self.queued.id)], {'status': 'queued', 'sent_at': None})
+        self.assertIsNone(statuses[str(missing)])
+
+    def test_unchanged_statuses_return_304(self):
+        etag = self._lookup([self.sent.id, self.queued.id])['ETag']
+
+        response = self._lookup([self.queued.id, self.sent.id], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_status_change_changes_etag(self):
+        etag = self._lookup([self.sent.id, self.queued.id])['ETag']
+        EmailLog.objects.filter(id=self.queued.id).update(status='sent', sent_at=timezone.now())
+
+        response = self._lookup([self.sent.id, self.queued.id], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['statuses'][str(self.queued.id)]['status'], 'sent')
+
+    @override_settings(EMAIL_STATUS_LOOKUP_MAX_IDS=2)
+    def test_too_many_ids_rejected(self):
+        response = self._lookup([1, 2, 3])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', response.data['details'])
+
+    def test_requires_superuser(self):
+        self.client.credentials()
+
+        response = self._lookup([self.sent.id])
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
@@ -0,0 +1,258 @@
+"""
+Tests for the recipient suppression list and the bounce importer
+"""
+
+import mailbox
+import os
+import tempfile
+from email.message import EmailMessage
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from ..bounces import bounced_recipients, import_bounce_reports
+from ..models import EmailLog, EmailSuppression
+from ..retry import PERMANENT
+from ..suppression import BloomFilter, suppress, suppression_list
+from ..tasks import send_bulk_email_chunk, send_generic_email_task
+from .test_bulk_send import microservice_token
+from .test_rollups import superuser_token
+
+DSN = b"""From: MAILER-DAEMON@mx.example.com
+To: no-reply@example.com
+Subject: Undelivered Mail Returned to Sender
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=delivery-status; boundary="B"
+
+--B
+Content-Type: text/plain
+
+Delivery failed.
+--B
+Content-Type: message/delivery-status
+
+Reporting-MTA: dns; mx.example.com
+
+Final-Recipient: rfc822; Gone@Example.com
+Action: failed
+Status: 5.1.1
+
+Final-Recipient: rfc822; slow@example.com
+Action: delayed
+Status: 4.4.1
+
+--B--
+"""
+
+ARF = b"""From: fbl@isp.example.net
+To: abuse@example.com
+Subject: Complaint
+MIME-Version: 1.0
+Content-Type: multipart/report; report-type=feedback-report; boundary="F"
+
+--F
+Content-Type: text/plain
+
+A complaint.
+--F
+Content-Type: message/feedback-report
+
+Feedback-Type: abuse
+User-Agent: isp/1.0
+Version: 1
+Original-Rcpt-To: angry@example.com
+
+--F--
+"""
+
+
+def _message(raw):
+    return mailbox.mboxMessage(raw)
+
+
+class BloomFilterTestCase(SimpleTestCase):
+
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'user{i}@example.com')
+
+        self.assertTrue(all(f'user{i}@example.com' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}@example.com' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_re_adding_does_not_grow_count(self):
+        bloom = BloomFilter(10, 0.01)
+        bloom.add('a@example.com')
+        bloom.add('a@example.com')
+
+        self.assertEqual(bloom.count, 1)
+
+
+class SuppressionListTestCase(TestCase):
+
+    def setUp(self):
+        suppression_list.reset()
+
+    def test_scopes(self):
+        suppress(['All@Example.com'])
+        suppress(['promo@example.com'], scope='newsletter', reason=EmailSuppression.REASON_UNSUBSCRIBE)
+
+        self.assertEqual(suppression_list.lookup('all@example.com', 'otp').reason, EmailSuppression.REASON_MANUAL)
+        self.assertIsNotNone(suppression_list.lookup('promo@example.com', 'newsletter'))
+        self.assertIsNone(suppression_list.lookup('promo@example.com', 'otp'))
+
+    def test_table_only_read_for_filter_hits(self):
+        suppress(['gone@example.com'])
+        suppression_list.refresh(force=True)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(suppression_list.suppressed(['fine@example.com', 'ok@example.com']), {})
+        with self.assertNumQueries(1):
+            self.assertEqual(list(suppression_list.suppressed(['fine@example.com', 'gone@example.com'])),
+                             ['gone@example.com'])
+
+    @override_settings(EMAIL_SUPPRESSION={'REFRESH_INTERVAL': 0})
+    def test_rows_written_elsewhere_are_synced_incrementally(self):
+        suppression_list.refresh(force=True)
+        EmailSuppression.objects.create(email='other-process@example.com')
+
+        self.assertIsNotNone(suppression_list.lookup('other-process@example.com'))
+
+    def test_removed_rows_are_not_reported(self):
+        suppress(['gone@example.com'])
+        EmailSuppression.objects.all().delete()
+
+        self.assertIsNone(suppression_list.lookup('gone@example.com'))
+
+
+class BounceImportTestCase(TestCase):
+
+    def setUp(self):
+        suppression_list.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_only_permanent_failures_are_bounces(self):
+        recipients = bounced_recipients(_message(DSN))
+
+        self.assertEqual(recipients, [('gone@example.com', EmailSuppression.REASON_HARD_BOUNCE)])
+
+    def test_feedback_report_is_a_complaint(self):
+        self.assertEqual(bounced_recipients(_message(ARF)),
+                         [('angry@example.com', EmailSuppression.REASON_COMPLAINT)])
+
+    def test_x_failed_recipients_header(self):
+        message = EmailMessage()
+        message['X-Failed-Recipients'] = 'a@example.com, b@example.com'
+        message.set_content('bounced')
+
+        self.assertEqual([address for address, _ in bounced_recipients(message)], ['a@example.com', 'b@example.com'])
+
+    def test_import_mbox(self):
+        path = os.path.join(self.directory.name, 'bounces.mbox')
+        box = mailbox.mbox(path)
+        for raw in (DSN, ARF, b"From: someone@example.com\nSubject: hi\n\nnot a bounce\n"):
+            box.add(_message(raw))
+        box.close()
+
+        counts = import_bounce_reports(path, batch_size=1)
+
+        self.assertEqual(counts, {'messages': 3, 'reports': 2, 'addresses': 2})
+        self.assertEqual(dict(EmailSuppression.objects.values_list('email', 'reason')), {
+            'gone@example.com': EmailSuppression.REASON_HARD_BOUNCE,
+            'angry@example.com': EmailSuppression.REASON_COMPLAINT,
+        })
+        self.assertEqual(EmailSuppression.objects.first().source, 'bounces:bounces.mbox')
+
+    def test_import_maildir_command(self):
+        path = os.path.join(self.directory.name, 'Maildir')
+        box = mailbox.Maildir(path)
+        box.add(mailbox.MaildirMessage(DSN))
+        box.close()
+        out = StringIO()
+
+        call_command('import_bounces', path, '--scope', 'newsletter', stdout=out)
+
+        self.assertIn('1 addresses suppressed', out.getvalue())
+        self.assertEqual(EmailSuppression.objects.get().scope, 'newsletter')
+
+    def test_dry_run_writes_nothing(self):
+        path = os.path.join(self.directory.name, 'bounces.mbox')
+        box = mailbox.mbox(path)
+        box.add(_message(DSN))
+        box.close()
+
+        self.assertEqual(import_bounce_reports(path, dry_run=True)['addresses'], 1)
+        self.assertFalse(EmailSuppression.objects.exists())
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class SuppressedSendTestCase(APITestCase):
+
+    def setUp(self):
+        suppression_list.reset()
+        suppress(['gone@example.com'])
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+
+    @mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+    def test_send_email_refused_without_log(self, dispatch_task):
+        response = self.client.post(reverse('send_email'), {'user_email': 'Gone@example.com', 'email_type': 'otp',
+                                                            'subject': 'Code'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(EmailLog.objects.exists())
+        dispatch_task.assert_not_called()
+
+    @mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+    def test_bulk_send_skips_suppressed(self, dispatch_task):
+        response = self.client.post(reverse('send_bulk_email'), {
+            'email_type': 'notification', 'subject': 'Hi', 'message': 'm',
+            'recipients': [{'user_email': 'gone@example.com'}, {'user_email': 'fine@example.com'}],
+        }, format='json')
+
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['suppressed'], ['gone@example.com'])
+        self.assertEqual(list(EmailLog.objects.values_list('email', flat=True)), ['fine@example.com'])
+
+    def test_task_drops_recipient_suppressed_after_queueing(self):
+        log = EmailLog.objects.create(email='gone@example.com', email_type='otp', subject='Code', action='', message='m')
+
+        with mock.patch('apps.email_service.tasks.send_generic_email') as send:
+            send_generic_email_task.apply(kwargs={'user_email': 'gone@example.com', 'email_type': 'otp',
+                                                  'subject': 'Code', 'email_log_id': log.id})
+
+        send.assert_not_called()
+        log.refresh_from_db()
+        self.assertEqual((log.status, log.error_class), ('failed', PERMANENT))
+
+    def test_bulk_chunk_fails_suppressed_recipients(self):
+        logs = [EmailLog.objects.create(email=email, email_type='notification', subject='Hi', action='', message='m')
+                for email in ('gone@example.com', 'fine@example.com')]
+
+        result = send_bulk_email_chunk(
+            [{'email_log_id': log.id, 'user_email': log.email} for log in logs],
+            email_type='notification', subject='Hi', message='m',
+        )
+
+        self.assertEqual((result['sent'], result['failed']), (1, 1))
+        self.assertEqual([message.to for message in mail.outbox], [['fine@example.com']])
+
+    def test_admin_add_and_remove(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+        url = reverse('email_suppressions')
+
+        added = self.client.post(url, {'emails': ['x@example.com'], 'reason': 'unsubscribe'}, format='json')
+        listed = self.client.get(url, {'email': 'X@example.com'})
+        removed = self.client.delete(url, {'emails': ['x@example.com', 'gone@example.com']}, format='json')
+
+        self.assertEqual(added.data, {'suppressed': 1})
+        self.assertEqual(listed.data['results'][0]['reason'], 'unsubscribe')
+        self.assertEqual(removed.data, {'removed': 2})
+        self.assertFalse(EmailSuppression.objects.exists())
@@ -0,0 +1,64 @@
+"""
+Tests for the compiled email template cache
+"""
+
+import os
+import tempfile
+
+from django.template import Context
+from django.test import SimpleTestCase
+
+from ..template_cache import CompiledTemplateCache, get_generic_templates, template_cache
+
+
+class CompiledTemplateCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'email.txt')
+        self._write('Hello {{ name }}', mtime=1_000_000)
+        self.cache = CompiledTemplateCache(check_interval=0)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, source, mtime):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_template_compiled_once(self):
+        first = self.cache.get(self.path)
+        second = self.cache.get(self.path)
+
+        self.assertIs(first, second)
+        self.assertEqual(first.render(Context({'name': 'Ada'})), 'Hello Ada')
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_template_reloaded_when_mtime_changes(self):
+        first = self.cache.get(self.path)
+        self._write('Bye {{ name }}', mtime=2_000_000)
+        second = self.cache.get(self.path)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render(Context({'name': 'Ada'})), 'Bye Ada')
+        self.assertEqual(self.cache.stats()['reloads'], 1)
+
+    def test_mtime_not_rechecked_inside_interval(self):
+        cache = CompiledTemplateCache(check_interval=3600)
+        first = cache.get(self.path)
+        self._write('Bye {{ name }}', mtime=2_000_000)
+
+        self.assertIs(cache.get(self.path), first)
+        self.assertEqual(cache.stats()['reloads'], 0)
+
+    def test_missing_template_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            self.cache.get(os.path.join(self.tmpdir.name, 'missing.html'))
+
+    def test_generic_templates_shared(self):
+        html_template, txt_template = get_generic_templates()
+
+        self.assertEqual(get_generic_templates(), (html_template, txt_template))
+        self.assertGreaterEqual(template_cache.stats()['templates'], 2)
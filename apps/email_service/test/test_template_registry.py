@@ -0,0 +1,124 @@
+"""
+Tests for the per-email_type template registry
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from ..models import EmailTemplate
+from ..template_cache import get_generic_templates
+from ..template_registry import SOURCE_DATABASE, SOURCE_FILE, SOURCE_GENERIC, template_registry
+from ..utils import build_email_context, render_email
+
+
+class TemplateRegistryTestCase(TestCase):
+
+    def setUp(self):
+        template_registry.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = override_settings(EMAIL_TEMPLATE_DIR=self.tmpdir.name, EMAIL_TEMPLATE_CHECK_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _write(self, name, source):
+        with open(os.path.join(self.tmpdir.name, name), 'w', encoding='utf-8') as f:
+            f.write(source)
+
+    def test_unknown_type_uses_generic_templates(self):
+        variant = template_registry.get('otp')
+
+        self.assertEqual(variant.source, SOURCE_GENERIC)
+        self.assertEqual((variant.html, variant.txt), get_generic_templates())
+
+    @override_settings(EMAIL_TEMPLATE_CHECK_INTERVAL=60)
+    def test_database_version_compiled_once(self):
+        EmailTemplate.objects.create(email_type='otp', html='<b>{{ otp }}</b>', text='Code {{ otp }}')
+
+        first = template_registry.get('otp')
+        with mock.patch('apps.email_service.template_registry.Template') as compile_template, \
+                self.assertNumQueries(0):
+            second = template_registry.get('otp')
+
+        compile_template.assert_not_called()
+        self.assertIs(second, first)
+        self.assertEqual((first.source, first.version), (SOURCE_DATABASE, 1))
+
+    def test_newest_active_version_wins(self):
+        EmailTemplate.objects.create(email_type='otp', html='v1')
+        template_registry.get('otp')
+        EmailTemplate.objects.create(email_type='otp', html='v2')
+        EmailTemplate.objects.create(email_type='otp', html='v3', is_active=False)
+
+        variant = template_registry.get('otp')
+
+        self.assertEqual(variant.version, 2)
+        self.assertEqual(template_registry.stats()['compiled'], 1)
+
+    def test_version_saved_by_another_process_is_picked_up(self):
+        EmailTemplate.objects.create(email_type='otp', html='v1')
+        template_registry.get('otp')
+        # A row written elsewhere: this process' registry is not invalidated
+        EmailTemplate.objects.bulk_create([EmailTemplate(email_type='otp', version=2, html='v2')])
+
+        self.assertEqual(template_registry.get('otp').version, 2)
+
+    def test_blank_text_falls_back_to_generic_text(self):
+        EmailTemplate.objects.create(email_type='otp', html='<b>{{ otp }}</b>')
+
+        self.assertIs(template_registry.get('otp').txt, get_generic_templates()[1])
+
+    def test_broken_version_falls_back_and_is_not_reparsed(self):
+        EmailTemplate.objects.create(email_type='otp', html='{% if %}')
+
+        with self.assertLogs('apps.email_service.template_registry', level='ERROR'):
+            self.assertEqual(template_registry.get('otp').source, SOURCE_GENERIC)
+        self.assertEqual(template_registry.get('otp').source, SOURCE_GENERIC)
+        self.assertEqual(template_registry.stats()['broken'], ['otp v1'])
+
+    def test_file_templates(self):
+        self._write('welcome.html', '<p>Welcome {{ name }}</p>{{ footer_fragment }}')
+
+        variant = template_registry.get('welcome')
+
+        self.assertEqual(variant.source, SOURCE_FILE)
+        self.assertIs(variant.txt, get_generic_templates()[1])
+
+    def test_email_type_is_not_used_as_a_path(self):
+        self._write('x.html', 'x')
+
+        self.assertEqual(template_registry.get('../x').source, SOURCE_GENERIC)
+
+    def test_render_uses_registered_template_and_prerendered_footer(self):
+        self._write('welcome.html', '<p>Welcome {{ name }}</p>{{ footer_fragment }}')
+        self._write('welcome.txt', 'Welcome {{ name }}')
+        context = build_email_context(subject='Hi', name='Ada')
+
+        plain, html = render_email(context, 'welcome')
+
+        self.assertEqual(plain, 'Welcome Ada')
+        self.assertIn('<p>Welcome Ada</p>', html)
+        self.assertIn('All rights reserved.', html)
+
+    def test_generic_template_renders_additional_data(self):
+        context = build_email_context(subject='Hi', message='Order shipped',
+                                      additional_data={'order_id': 'A-42', 'carrier': 'DHL', 'note': ''})
+
+        plain, html = render_email(context, 'order_update')
+
+        self.assertIn('<strong>Order_Id:</strong> A-42', html)
+        self.assertIn('Carrier: DHL', plain)
+        self.assertNotIn('Note:', plain)
+
+    def test_brand_fragments_rendered_once_per_configuration(self):
+        context = build_email_context(subject='Hi')
+
+        first = template_registry.fragments(context)
+        self.assertIs(template_registry.fragments(context), first)
+        overridden = template_registry.fragments(dict(context, brand_name='Other Brand'))
+
+        self.assertIn('The Other Brand Team', overridden['txt']['footer_fragment'])
+        self.assertNotIn('Other Brand', first['txt']['footer_fragment'])
@@ -0,0 +1,83 @@
+"""
+Tests for the verified JWT claims cache
+"""
+
+from unittest import mock
+
+import jwt
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from config.cache import VerifiedTokenCache, verified_token_cache
+from .test_bulk_send import microservice_token
+from .test_rollups import superuser_token
+
+
+class VerifiedTokenCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = VerifiedTokenCache(maxsize=2, max_ttl=60, timer=lambda: self.now)
+
+    def test_entry_expires_at_token_exp(self):
+        self.cache.set('access', 'secret', 'token', {'sub': 1}, exp=1010)
+
+        self.assertEqual(self.cache.get('access', 'secret', 'token'), {'sub': 1})
+        self.now = 1010.0
+        self.assertIsNone(self.cache.get('access', 'secret', 'token'))
+
+    def test_ttl_capped_and_expired_or_exp_less_tokens_not_cached(self):
+        self.cache.set('access', 'secret', 'long', {}, exp=10_000)
+        self.cache.set('access', 'secret', 'expired', {}, exp=999)
+        self.cache.set('access', 'secret', 'no-exp', {}, exp=None)
+
+        self.now = 1061.0
+        self.assertIsNone(self.cache.get('access', 'secret', 'long'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_entries_scoped_by_secret_and_kind(self):
+        self.cache.set('access', 'secret', 'token', {'sub': 1}, exp=1010)
+
+        self.assertIsNone(self.cache.get('access', 'rotated', 'token'))
+        self.assertIsNone(self.cache.get('microservice', 'secret', 'token'))
+
+    def test_bounded_lru(self):
+        for token in ('a', 'b', 'c'):
+            self.cache.set('access', 'secret', token, token, exp=1010)
+
+        self.assertIsNone(self.cache.get('access', 'secret', 'a'))
+        self.assertEqual(self.cache.get('access', 'secret', 'c'), 'c')
+
+
+@override_settings(DEFAULT_FROM_EMAIL='no-reply@example.com')
+class TokenCacheAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        verified_token_cache.clear()
+
+    @mock.patch('apps.email_service.views.dispatch_task', return_value='celery')
+    def test_microservice_token_decoded_once(self, dispatch_task):
+        self.client.credentials(HTTP_SUPPORT_MICROSERVICE_AUTH=microservice_token())
+        payload = {'user_email': 'user@example.com', 'email_type': 'otp', 'subject': 'Code',
+                   'action': 'login', 'message': 'Your code', 'otp': '123456'}
+
+        with mock.patch('apps.email_service.permissions.jwt.decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                response = self.client.post(reverse('send_email'), payload, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(decode.call_count, 1)
+
+    def test_access_token_verified_once(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {superuser_token()}')
+
+        with mock.patch.object(JWTAuthentication, 'get_validated_token',
+                               autospec=True, side_effect=JWTAuthentication.get_validated_token) as verify:
+            for _ in range(2):
+                response = self.client.get(reverse('email_stats'))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(verify.call_count, 1)
@@ -5,12 +5,24 @@ from .views import EmailSendViewSet, EmailAdminViewSet, EmailConfigurationViewSe
 urlpatterns = [
     # Email sending endpoint
     path('send-email/', EmailSendViewSet.as_view({'post': 'send_email'}), name='send_email'),
+    path('send-email/bulk/', EmailSendViewSet.as_view({'post': 'send_bulk_email'}), name='send_bulk_email'),
     
     # Admin endpoints (logs and stats)
     path('logs/', EmailAdminViewSet.as_view({'get': 'list'}), name='email_logs'),
     path('stats/', EmailAdminViewSet.as_view({'get': 'email_stats'}), name='email_stats'),
+    path('stats/timeseries/', EmailAdminViewSet.as_view({'get': 'email_timeseries'}), name='email_timeseries'),
     path('type-stats/', EmailAdminViewSet.as_view({'get': 'email_type_stats'}), name='email_type_stats'),
+    path('logs/archived/', EmailAdminViewSet.as_view({'get': 'archived_logs'}), name='email_archived_logs'),
+    path('logs/status/', EmailAdminViewSet.as_view({'post': 'status_lookup'}), name='email_status_lookup'),
     path('logs/<int:pk>/retry/', EmailAdminViewSet.as_view({'post': 'retry_email'}), name='email_retry'),
+    path('metrics/lanes/', EmailAdminViewSet.as_view({'get': 'lane_metrics'}), name='email_lane_metrics'),
+    path('metrics/stages/', EmailAdminViewSet.as_view({'get': 'stage_metrics'}), name='email_stage_metrics'),
+    path('usage/', EmailAdminViewSet.as_view({'get': 'service_usage'}), name='email_service_usage'),
+    path('suppressions/', EmailAdminViewSet.as_view({
+        'get': 'suppressions', 'post': 'add_suppressions', 'delete': 'remove_suppressions',
+    }), name='email_suppressions'),
+    path('dead-letters/', EmailAdminViewSet.as_view({'get': 'dead_letters'}), name='email_dead_letters'),
+    path('dead-letters/replay/', EmailAdminViewSet.as_view({'post': 'replay_dead_letters'}), name='email_dead_letter_replay'),
     
     # Email Configuration URLs
     path('config/', EmailConfigurationViewSet.as_view({'get': 'list', 'patch': 'partial_update'}), name='email_config'),
@@ -0,0 +1,108 @@
+# apps/email_service/usage.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailServiceUsage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USAGE_SETTINGS = {
+    'FLUSH_INTERVAL': 5.0,
+}
+
+
+def get_usage_settings():
+    usage_settings = dict(DEFAULT_USAGE_SETTINGS)
+    usage_settings.update(getattr(settings, 'EMAIL_USAGE', {}))
+    return usage_settings
+
+
+class UsageRecorder:
+    """
+    Per-service, per-day counts of accepted and rate-limited emails.
+
+    Counts accumulate in process and are added to EmailServiceUsage with one
+    UPDATE per (service, day) at most every FLUSH_INTERVAL seconds, so the send
+    path only pays for a dict update.
+    """
+
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @property
+    def flush_interval(self):
+        return self._flush_interval if self._flush_interval is not None else get_usage_settings()['FLUSH_INTERVAL']
+
+    def record(self, service, accepted=0, rejected=0):
+        day = timezone.localdate()
+        with self._lock:
+            if accepted:
+                self._pending[(service, day, 'accepted')] += accepted
+            if rejected:
+                self._pending[(service, day, 'rejected')] += rejected
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+
+        deltas = {}
+        for (service, day, field), count in pending.items():
+            deltas.setdefault((service, day), {})[field] = count
+        remaining = list(deltas.items())
+        try:
+            while remaining:
+                (service, day), counts = remaining[0]
+                self._apply(service, day, counts)
+                remaining.pop(0)
+        except Exception as exc:
+            # Keep the counts not yet written for the next flush rather than losing them
+            logger.warning("Failed to flush usage counters for %d service-days: %s", len(remaining), exc)
+            with self._lock:
+                for (service, day), counts in remaining:
+                    for field, count in counts.items():
+                        self._pending[(service, day, field)] += count
+
+    def _apply(self, service, day, counts):
+        lookup = {'service': service, 'day': day}
+        updates = {field: F(field) + count for field, count in counts.items()}
+        if EmailServiceUsage.objects.filter(**lookup).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                EmailServiceUsage.objects.create(**lookup, **counts)
+        except IntegrityError:
+            EmailServiceUsage.objects.filter(**lookup).update(**updates)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+
+usage_recorder = UsageRecorder()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _flush_usage(**kwargs):
+    usage_recorder.flush()
+
+
+atexit.register(usage_recorder.flush)
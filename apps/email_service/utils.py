@@ -1,10 +1,14 @@
-import os
-from django.core.mail import send_mail
-from django.template import Template, Context
+from django.core.mail import EmailMultiAlternatives
+from django.template import Context
 from datetime import datetime
 from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
 from .pagination import PAGINATION_PARAMS
+from .template_registry import template_registry
+from .config_cache import get_config_snapshot
+from .smtp_pool import get_smtp_pool
+from .metrics import STAGE_RENDER, STAGE_SMTP, stage_timer
+from .retry import classify_exception
 
 
 def swagger_helper(tags, model):
@@ -25,105 +29,127 @@ def swagger_helper(tags, model):
 
 
 
+def validate_recipient(user_email):
+    """Validate and normalize a recipient address, raising ValueError when invalid."""
+    if not user_email or not isinstance(user_email, str):
+        raise ValueError("Invalid user_email: must be a non-empty string")
+
+    if '@' not in user_email or '.' not in user_email.split('@')[-1]:
+        raise ValueError("Invalid email format")
+
+    return user_email.strip().lower()
+
+
+def build_email_context(subject=None, action=None, message=None, otp=None, link=None, link_text=None, **kwargs):
+    """Build the template context: sanitized fields, cached brand context, then any extra kwargs."""
+    # Clean and sanitize inputs - only if provided
+    subject = subject.strip() if subject else None
+    action = action.strip() if action else None
+    message = message.strip() if message else None
+    otp = otp.strip() if otp else None
+    link = link.strip() if link else None
+    link_text = link_text.strip() if link_text else None
+
+    email_config = get_config_snapshot()
+
+    # Build dynamic context with all available data
+    context = {
+        'subject': subject or 'Notification',
+        'action': action,
+        'message': message,
+        'otp': otp,
+        'link': link,
+        'link_text': link_text,
+        'current_year': datetime.now().year,
+        # additional_data keys the generic templates skip; callers may pass their own
+        'excluded_fields': (),
+    }
+    context.update(email_config.brand_context)
+
+    # Add any additional kwargs to context
+    context.update(kwargs)
+    return context
+
+
+def render_email(context, email_type=None):
+    """Render the templates registered for `email_type`, returning (plain_message, html_message)."""
+    # Compiled templates are shared process-wide and only re-parsed when their version or file changes
+    try:
+        variant = template_registry.get(email_type)
+        fragments = template_registry.fragments(context)
+    except FileNotFoundError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to compile email templates: {str(e)}")
+
+    try:
+        html_context = Context(context)
+        html_context.update(fragments['html'])
+        html_message = variant.html.render(html_context)
+    except Exception as e:
+        raise RuntimeError(f"Failed to render HTML template: {str(e)}")
+
+    try:
+        txt_context = Context(context)
+        txt_context.update(fragments['txt'])
+        plain_message = variant.txt.render(txt_context)
+    except Exception as e:
+        raise RuntimeError(f"Failed to render text template: {str(e)}")
+
+    return plain_message, html_message
+
+
+def build_email_message(user_email, subject, plain_message, html_message):
+    """Build the multipart message sent to a single recipient."""
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
+    if not from_email:
+        raise RuntimeError("DEFAULT_FROM_EMAIL setting is not configured")
+
+    email = EmailMultiAlternatives(
+        subject=subject or 'Notification',
+        body=plain_message,
+        from_email=from_email,
+        to=[user_email],
+    )
+    email.attach_alternative(html_message, 'text/html')
+    return email
+
+
+def email_failure(user_email, exc):
+    """Map an exception raised while preparing or sending an email to a failure result."""
+    if isinstance(exc, ValueError):
+        error = f"Validation error: {str(exc)}"
+    elif isinstance(exc, FileNotFoundError):
+        error = f"Template error: {str(exc)}"
+    elif isinstance(exc, RuntimeError):
+        error = f"Configuration error: {str(exc)}"
+    else:
+        error = f"Unexpected error: {str(exc)}"
+    return {"status": "failure", "email": user_email, "error": error, "error_class": classify_exception(exc)}
+
+
 def send_generic_email(user_email, email_type=None, subject=None, action=None, message=None, otp=None, link=None, link_text=None, **kwargs):
-    from .models import EmailConfiguration
     try:
-        # Basic email validation
-        if not user_email or not isinstance(user_email, str):
-            raise ValueError("Invalid user_email: must be a non-empty string")
-
-        if '@' not in user_email or '.' not in user_email.split('@')[-1]:
-            raise ValueError("Invalid email format")
-
-        user_email = user_email.strip().lower()
-        
-        # Clean and sanitize inputs - only if provided
-        subject = subject.strip() if subject else None
-        action = action.strip() if action else None
-        message = message.strip() if message else None
-        otp = otp.strip() if otp else None
-        link = link.strip() if link else None
-        link_text = link_text.strip() if link_text else None
-
-        email_config = EmailConfiguration.get_instance()
-
-        # Build dynamic context with all available data
-        context = {
-            'subject': subject or 'Notification',
-            'action': action,
-            'message': message,
-            'otp': otp,
-            'link': link,
-            'link_text': link_text,
-            'site_url': email_config.site_url or getattr(settings, 'SITE_URL', ''),
-            'current_year': datetime.now().year,
-            'support_email': email_config.support_email,
-            'support_phone_number': email_config.support_phone_number,
-            'brand_name': email_config.brand_name or 'KidsDesignCompany',
-            'brand_logo': email_config.get_brand_logo_url(),
-            'terms_of_service': email_config.terms_of_service,
-            'social_true': email_config.has_social_links(),
-            'fb_link': email_config.facebook_link,
-            'ig_link': email_config.instagram_link,
-            'x_link': email_config.twitter_link,
-            'linkedin_link': email_config.linkedin_link,
-            'tiktok_link': email_config.tiktok_link,
-        }
-        
-        # Add any additional kwargs to context
-        context.update(kwargs)
-
-        # Template paths
-        html_template_path = os.path.join(settings.BASE_DIR, 'apps', 'email_service', 'templates', 'generic_email.html')
-        txt_template_path = os.path.join(settings.BASE_DIR, 'apps', 'email_service', 'templates', 'generic_email.txt')
-
-        # Validate template files exist
-        if not os.path.exists(html_template_path):
-            raise FileNotFoundError(f"HTML template not found at {html_template_path}")
-        if not os.path.exists(txt_template_path):
-            raise FileNotFoundError(f"Text template not found at {txt_template_path}")
-
-        # Read and render templates
-        try:
-            with open(html_template_path, 'r', encoding='utf-8') as f:
-                html_template = Template(f.read())
-            html_message = html_template.render(Context(context))
-        except Exception as e:
-            raise RuntimeError(f"Failed to render HTML template: {str(e)}")
-
-        try:
-            with open(txt_template_path, 'r', encoding='utf-8') as f:
-                txt_template = Template(f.read())
-            plain_message = txt_template.render(Context(context))
-        except Exception as e:
-            raise RuntimeError(f"Failed to render text template: {str(e)}")
-
-        # Validate email configuration
-        from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None)
-        if not from_email:
-            raise RuntimeError("DEFAULT_FROM_EMAIL setting is not configured")
-
-        # Send email
-        send_mail(
-            subject=subject or 'Notification',
-            message=plain_message,
-            from_email=from_email,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
+        user_email = validate_recipient(user_email)
+
+        with stage_timer(STAGE_RENDER, email_type):
+            context = build_email_context(
+                subject=subject,
+                action=action,
+                message=message,
+                otp=otp,
+                link=link,
+                link_text=link_text,
+                **kwargs
+            )
+            plain_message, html_message = render_email(context, email_type)
+
+        # Send email over a pooled, already-open connection
+        with stage_timer(STAGE_SMTP, email_type):
+            email = build_email_message(user_email, subject.strip() if subject else None, plain_message, html_message)
+            get_smtp_pool().send_messages([email])
 
         return {"status": "success", "email": user_email}
 
-    except ValueError as e:
-        return {"status": "failure", "email": user_email,
-                "error": f"Validation error: {str(e)}"}
-    except FileNotFoundError as e:
-        return {"status": "failure", "email": user_email,
-                "error": f"Template error: {str(e)}"}
-    except RuntimeError as e:
-        return {"status": "failure", "email": user_email,
-                "error": f"Configuration error: {str(e)}"}
     except Exception as e:
-        return {"status": "failure", "email": user_email,
-                "error": f"Unexpected error: {str(e)}"}
\ No newline at end of file
+        return email_failure(user_email, e)
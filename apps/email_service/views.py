@@ -1,21 +1,64 @@
-from rest_framework import viewsets, status, filters
+import hashlib
+import json
+import math
+
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
-from django.db.models import Count, Q
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Trunc
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from django.conf import settings
+from django.db import IntegrityError, transaction
 
-from apps.email_service.pagination import CustomPagination
+from apps.email_service.pagination import EmailLogPagination
 
-from .tasks import send_generic_email_task, is_celery_healthy, send_direct_email
+from .tasks import (
+    send_generic_email_task,
+    send_bulk_email_task,
+    send_direct_email,
+    create_email_log,
+)
+from .archive import email_log_archive
+from .broker_health import broker_breaker, publish_task
+from .deadletter import dead_letter_summary, replay_dead_letters
+from .digest import DIGEST_REQUEST_FIELDS, add_to_digest
+from .filters import EmailLogFilter, EmailLogSearchFilter, EmailLogOrderingFilter
+from .idempotency import (
+    IDEMPOTENCY_FIELD,
+    IDEMPOTENCY_HEADER,
+    get_idempotency_key,
+    idempotency_store,
+    request_fingerprint,
+)
+from .metrics import LANE_LATENCY, metrics, stage_summary
+from .outbox import add_to_outbox, dispatch_task, schedule_task
+from .ratelimit import caller_scope, rate_limiter
+from .rollups import record_created
+from .routing import LANE_QUEUES
+from .status_buffer import update_email_status
+from .suppression import normalize_email, suppress, suppression_list, unsuppress
+from .usage import usage_recorder
 from .permissions import IsSuperuser, AllowAnySendEmail
-from .models import EmailLog, EmailConfiguration
+from .models import (
+    EmailLog, EmailConfiguration, EmailDeadLetter, EmailServiceUsage, EmailStatsRollup, EmailSuppression,
+)
 from .serializers import (
     EmailLogSerializer,
     SendEmailSerializer,
+    BulkSendEmailSerializer,
     EmailStatsSerializer,
     EmailTypeStatsSerializer,
+    EmailTimeSeriesQuerySerializer,
+    EmailTimeSeriesPointSerializer,
+    EmailStatusLookupSerializer,
+    DeadLetterReplaySerializer,
+    EmailUsageQuerySerializer,
+    EmailSuppressionSerializer,
+    SuppressionChangeSerializer,
     EmailConfigurationSerializer,
 )
 from .utils import swagger_helper, send_generic_email
@@ -39,92 +82,145 @@ class EmailSendViewSet(viewsets.ViewSet):
         
         validated_data = serializer.validated_data
 
+        # A retried request with the same Idempotency-Key gets the original response back
+        try:
+            idempotency_key = get_idempotency_key(request)
+        except ValueError as e:
+            return Response({
+                'error': 'Validation failed',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        scope = caller_scope(request)
+        if idempotency_key:
+            idempotency_scope = scope
+            request_hash = request_fingerprint(request.data)
+            replay = self._idempotent_replay(idempotency_scope, idempotency_key, request_hash)
+            if replay is not None:
+                return replay
+
+        # Bounced, complained or unsubscribed addresses cost neither a rate-limit token nor a log row
+        suppression = suppression_list.lookup(validated_data['user_email'], validated_data.get('email_type'))
+        if suppression is not None:
+            return Response({
+                'error': 'Recipient suppressed',
+                'details': f'{suppression.email} is suppressed ({suppression.reason})'
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        if validated_data.get('digest_key') and idempotency_key:
+            return Response({
+                'error': 'Validation failed',
+                'details': f'{IDEMPOTENCY_HEADER} cannot be combined with digest_key; repeats are coalesced'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Per-caller and per-recipient token buckets, checked before anything is written
+        limited = rate_limiter.check_send(scope, validated_data['user_email'])
+        if limited is not None:
+            usage_recorder.record(scope, rejected=1)
+            return self._rate_limited(*limited)
+
+        # Digest mode: coalesced with the recipient's other messages for this key, sent later as one email
+        if validated_data.get('digest_key'):
+            # Fields beyond the serializer's are template context, kept with the item like in a direct send
+            context = {key: value for key, value in request.data.items() if key not in serializer.fields}
+            digest = add_to_digest(validated_data['user_email'], validated_data.get('email_type'),
+                                   validated_data['digest_key'], validated_data,
+                                   window=validated_data.get('digest_window'), context=context)
+            usage_recorder.record(scope, accepted=1)
+            return Response({
+                'status': 'digested',
+                'email_type': validated_data.get('email_type'),
+                'email': validated_data['user_email'],
+                'digest_key': digest.digest_key,
+                'flush_at': digest.flush_at,
+                'pending': digest.items,
+                'processing_method': 'digest',
+            }, status=status.HTTP_200_OK)
+
         try:
             # Log which authentication method was used
             auth_method = "microservice" if hasattr(request, 'microservice_name') else "superuser"
             microservice_name = getattr(request, 'microservice_name', 'N/A')
             
-            email_log = EmailLog.objects.create(
-                email=validated_data['user_email'],
-                email_type=validated_data.get('email_type'),
-                subject=validated_data.get('subject'),
-                action=validated_data.get('action'),
-                message=validated_data.get('message'),
-                otp=validated_data.get('otp'),
-                link=validated_data.get('link'),
-                link_text=validated_data.get('link_text'),
-                status='queued'
-            )
+            # Use Celery for asynchronous processing unless the broker circuit is open
+            task_kwargs = {
+                'user_email': validated_data['user_email'],
+                'email_type': validated_data.get('email_type'),
+                'subject': validated_data.get('subject'),
+                'action': validated_data.get('action'),
+                'message': validated_data.get('message'),
+                'otp': validated_data.get('otp'),
+                'link': validated_data.get('link'),
+                'link_text': validated_data.get('link_text'),
+            }
+            
+            # Add any additional fields from the request
+            for key, value in request.data.items():
+                if key not in task_kwargs and key not in ('user_email', 'send_at', IDEMPOTENCY_FIELD,
+                                                          *DIGEST_REQUEST_FIELDS):
+                    task_kwargs[key] = value
 
-            if is_celery_healthy():
-                # Use Celery for asynchronous processing
-                task_kwargs = {
-                    'user_email': validated_data['user_email'],
-                    'email_type': validated_data.get('email_type'),
-                    'subject': validated_data.get('subject'),
-                    'action': validated_data.get('action'),
-                    'message': validated_data.get('message'),
-                    'otp': validated_data.get('otp'),
-                    'link': validated_data.get('link'),
-                    'link_text': validated_data.get('link_text'),
-                    'email_log_id': email_log.id
-                }
-                
-                # Add any additional fields from the request
-                for key, value in request.data.items():
-                    if key not in task_kwargs and key != 'user_email':
-                        task_kwargs[key] = value
-                
-                send_generic_email_task.apply_async(kwargs=task_kwargs)
-                
-                return Response({
-                    'status': 'queued', 
-                    'email_type': validated_data.get('email_type'), 
-                    'email': validated_data['user_email'],
-                    'email_log_id': email_log.id,
-                    'auth_method': auth_method,
-                    'processing_method': 'celery'
-                }, status=status.HTTP_200_OK)
+            # A future send_at waits in the outbox until the drainer finds it due, never in the broker
+            send_at = validated_data.get('send_at')
+            scheduled = send_at is not None and send_at > timezone.now()
+
+            # When the broker is known to be down, the log and its outbox entry are committed together
+            broker_available = broker_breaker.is_available()
+            response_data = {
+                'status': 'queued', 
+                'email_type': validated_data.get('email_type'), 
+                'email': validated_data['user_email'],
+                'auth_method': auth_method,
+                'processing_method': 'scheduled' if scheduled else 'celery' if broker_available else 'outbox'
+            }
+            if scheduled:
+                response_data['send_at'] = send_at.isoformat()
+            try:
+                with transaction.atomic():
+                    email_log = create_email_log(
+                        email=validated_data['user_email'],
+                        email_type=validated_data.get('email_type'),
+                        subject=validated_data.get('subject'),
+                        action=validated_data.get('action'),
+                        message=validated_data.get('message'),
+                        otp=validated_data.get('otp'),
+                        link=validated_data.get('link'),
+                        link_text=validated_data.get('link_text'),
+                        status='queued'
+                    )
+                    task_kwargs['email_log_id'] = email_log.id
+                    response_data['email_log_id'] = email_log.id
+                    if idempotency_key:
+                        idempotency_store.claim(idempotency_scope, idempotency_key, request_hash,
+                                                email_log.id, response_data)
+                    if scheduled:
+                        schedule_task(send_generic_email_task, send_at, kwargs=task_kwargs, email_log=email_log)
+                    elif not broker_available:
+                        add_to_outbox(send_generic_email_task, kwargs=task_kwargs, email_log=email_log)
+            except IntegrityError:
+                if not idempotency_key:
+                    raise
+                # A concurrent request with the same key won; nothing was created for this one
+                replay = self._idempotent_replay(idempotency_scope, idempotency_key, request_hash)
+                if replay is not None:
+                    return replay
+                raise
+
+            # Otherwise publish after commit so the worker always finds the log
+            if scheduled:
+                processing_method = 'scheduled'
+            elif broker_available:
+                processing_method = dispatch_task(send_generic_email_task, kwargs=task_kwargs, email_log=email_log)
             else:
-                # Send email directly when Celery is unavailable
-                # Prepare additional fields from the request
-                additional_fields = {k: v for k, v in request.data.items() 
-                                   if k not in ['user_email', 'email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text']}
-                
-                # Call the direct email sending function
-                result = send_direct_email(
-                    user_email=validated_data['user_email'],
-                    email_type=validated_data.get('email_type'),
-                    subject=validated_data.get('subject'),
-                    action=validated_data.get('action'),
-                    message=validated_data.get('message'),
-                    otp=validated_data.get('otp'),
-                    link=validated_data.get('link'),
-                    link_text=validated_data.get('link_text'),
-                    email_log_id=email_log.id,
-                    **additional_fields
-                )
-                
-                # Return appropriate response based on result
-                if result['status'] == 'success':
-                    return Response({
-                        'status': 'sent', 
-                        'email_type': validated_data.get('email_type'), 
-                        'email': validated_data['user_email'],
-                        'email_log_id': email_log.id,
-                        'auth_method': auth_method,
-                        'processing_method': result['processing_method']
-                    }, status=status.HTTP_200_OK)
-                else:
-                    return Response({
-                        'status': 'failed', 
-                        'email_type': validated_data.get('email_type'), 
-                        'email': validated_data['user_email'],
-                        'email_log_id': email_log.id,
-                        'auth_method': auth_method,
-                        'processing_method': result['processing_method'],
-                        'error': result.get('error', 'Direct email sending failed')
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                processing_method = 'outbox'
+
+            claimed_method = response_data['processing_method']
+            response_data['processing_method'] = processing_method
+            if idempotency_key:
+                idempotency_store.complete(idempotency_scope, idempotency_key, request_hash, email_log.id,
+                                           response_data, changed=processing_method != claimed_method)
+
+            usage_recorder.record(scope, accepted=1)
+            return Response(response_data, status=status.HTTP_200_OK)
             
         except Exception as e:
             return Response({
@@ -133,13 +229,139 @@ class EmailSendViewSet(viewsets.ViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+    def _rate_limited(self, bucket, retry_after):
+        """429 for a send refused by the `bucket` token bucket, with a Retry-After header."""
+        response = Response({
+            'error': 'Rate limit exceeded',
+            'details': f'Too many emails for this {bucket}; retry in {math.ceil(retry_after)} seconds'
+        }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(math.ceil(retry_after))
+        return response
+
+    def _idempotent_replay(self, scope, key, request_hash):
+        """The stored response for a repeated Idempotency-Key, a 422 if it was used with another body, or None."""
+        entry = idempotency_store.lookup(scope, key)
+        if entry is None:
+            return None
+        if entry['request_hash'] != request_hash:
+            return Response({
+                'error': 'Idempotency key reused',
+                'details': f'This {IDEMPOTENCY_HEADER} was already used with a different request body'
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = Response(entry['response'], status=status.HTTP_200_OK)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    @swagger_helper("Email Send", "BulkSendEmail")
+    @action(detail=False, methods=['post'], url_path='send-email/bulk')
+    def send_bulk_email(self, request):
+        serializer = BulkSendEmailSerializer(data=request.data)
+
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        suppressed = suppression_list.suppressed(
+            [recipient['user_email'] for recipient in validated_data['recipients']], validated_data.get('email_type')
+        )
+        recipients = [recipient for recipient in validated_data['recipients']
+                      if normalize_email(recipient['user_email']) not in suppressed]
+
+        # Every recipient costs the caller one token, taken before anything is written
+        scope = caller_scope(request)
+        limited = rate_limiter.check_bulk(scope, len(recipients))
+        if limited is not None:
+            usage_recorder.record(scope, rejected=len(recipients))
+            return self._rate_limited(*limited)
+
+        shared_fields = {
+            field: validated_data.get(field)
+            for field in ['email_type', 'subject', 'action', 'message', 'otp', 'link', 'link_text']
+        }
+        # Additional fields from the request are shared template context for every recipient
+        additional_fields = {k: v for k, v in request.data.items()
+                             if k not in shared_fields and k != 'recipients'}
+
+        try:
+            auth_method = "microservice" if hasattr(request, 'microservice_name') else "superuser"
+            chunk_size = getattr(settings, 'EMAIL_BULK_CHUNK_SIZE', 100)
+            task_kwargs = {**shared_fields, **additional_fields}
+            broker_available = broker_breaker.is_available()
+            processing_methods = set()
+            chunks = []
+
+            # Every chunk's logs (and outbox entries) are committed together: a failure queues nothing
+            with transaction.atomic():
+                for start in range(0, len(recipients), chunk_size):
+                    chunk = recipients[start:start + chunk_size]
+                    email_logs = EmailLog.objects.bulk_create([
+                        EmailLog(
+                            email=recipient['user_email'],
+                            email_type=shared_fields['email_type'] or '',
+                            subject=recipient['context'].get('subject', shared_fields['subject']) or '',
+                            action=recipient['context'].get('action', shared_fields['action']) or '',
+                            message=recipient['context'].get('message', shared_fields['message']) or '',
+                            otp=recipient['context'].get('otp', shared_fields['otp']),
+                            link=recipient['context'].get('link', shared_fields['link']),
+                            link_text=recipient['context'].get('link_text', shared_fields['link_text']),
+                            status='queued'
+                        )
+                        for recipient in chunk
+                    ])
+                    record_created(email_logs)
+
+                    task_recipients = [
+                        {
+                            'email_log_id': email_log.id,
+                            'user_email': recipient['user_email'],
+                            'context': recipient['context'],
+                        }
+                        for recipient, email_log in zip(chunk, email_logs)
+                    ]
+                    if not broker_available:
+                        add_to_outbox(send_bulk_email_task, args=[task_recipients], kwargs=task_kwargs)
+                    chunks.append(task_recipients)
+
+            # Published after commit so workers always find the logs
+            for task_recipients in chunks:
+                if broker_available:
+                    processing_methods.add(dispatch_task(send_bulk_email_task, args=[task_recipients], kwargs=task_kwargs))
+                else:
+                    processing_methods.add('outbox')
+
+            results = [
+                {'email': recipient['user_email'], 'email_log_id': recipient['email_log_id']}
+                for task_recipients in chunks for recipient in task_recipients
+            ]
+
+            usage_recorder.record(scope, accepted=len(results))
+            return Response({
+                'status': 'queued',
+                'email_type': shared_fields['email_type'],
+                'count': len(results),
+                'results': results,
+                'suppressed': sorted(suppressed),
+                'auth_method': auth_method,
+                'processing_method': processing_methods.pop() if len(processing_methods) == 1 else 'mixed'
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'error': 'Failed to queue bulk email',
+                'details': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class EmailAdminViewSet(viewsets.ModelViewSet):
     """ViewSet for administrative email actions, restricted to superusers."""
     permission_classes = [IsSuperuser]
     queryset = EmailLog.objects.all()
-    pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['email', 'email_type', 'status']
+    pagination_class = EmailLogPagination
+    filter_backends = [DjangoFilterBackend, EmailLogSearchFilter, EmailLogOrderingFilter]
+    filterset_class = EmailLogFilter
     search_fields = ['email', 'subject', 'message', 'email_type', 'action']
     ordering_fields = ['created_at', 'sent_at', 'status', 'email_type']
     ordering = ['-created_at']
@@ -160,10 +382,14 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
     @swagger_helper("Email Admin", "EmailStats")
     @action(detail=False, methods=['get'], url_path='stats')
     def email_stats(self, request):
-        total_emails = EmailLog.objects.count()
-        successful_emails = EmailLog.objects.filter(status=EmailLog.STATUS_SENT).count()
-        failed_emails = EmailLog.objects.filter(status=EmailLog.STATUS_FAILED).count()
-        pending_emails = EmailLog.objects.filter(status=EmailLog.STATUS_QUEUED).count()
+        # Counts come from the hourly rollups rather than COUNT(*) scans of EmailLog
+        status_counts = dict(
+            EmailStatsRollup.objects.values_list('status').annotate(total=Sum('count')).order_by()
+        )
+        total_emails = sum(status_counts.values())
+        successful_emails = status_counts.get(EmailLog.STATUS_SENT, 0)
+        failed_emails = status_counts.get(EmailLog.STATUS_FAILED, 0)
+        pending_emails = status_counts.get(EmailLog.STATUS_QUEUED, 0)
         
         success_rate = (successful_emails / total_emails * 100) if total_emails > 0 else 0
         
@@ -181,23 +407,238 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
     @swagger_helper("Email Admin", "EmailTypeStats")
     @action(detail=False, methods=['get'], url_path='type-stats')
     def email_type_stats(self, request):
-        type_stats = EmailLog.objects.values('email_type').annotate(
-            count=Count('id'),
-            success_count=Count('id', filter=Q(status=EmailLog.STATUS_SENT))
-        ).order_by('-count')
+        type_stats = EmailStatsRollup.objects.values('email_type').annotate(
+            total=Sum('count'),
+            success_count=Sum('count', filter=Q(status=EmailLog.STATUS_SENT))
+        ).filter(total__gt=0).order_by('-total')
         
         results = []
         for stat in type_stats:
-            success_rate = (stat['success_count'] / stat['count'] * 100) if stat['count'] > 0 else 0
+            success_count = stat['success_count'] or 0
+            success_rate = (success_count / stat['total'] * 100) if stat['total'] > 0 else 0
             results.append({
                 'email_type': stat['email_type'],
-                'count': stat['count'],
+                'count': stat['total'],
                 'success_rate': round(success_rate, 2)
             })
         
         serializer = EmailTypeStatsSerializer(results, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @swagger_helper("Email Admin", "EmailTimeSeries")
+    @action(detail=False, methods=['get'], url_path='stats/timeseries')
+    def email_timeseries(self, request):
+        query = EmailTimeSeriesQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        params = query.validated_data
+        rollups = EmailStatsRollup.objects.filter(hour__gte=params['since'], hour__lt=params['until'])
+        if params.get('email_type') is not None:
+            rollups = rollups.filter(email_type=params['email_type'])
+
+        rows = (
+            rollups.annotate(bucket_start=Trunc('hour', params['bucket']))
+            .values('bucket_start', 'status')
+            .annotate(total=Sum('count'))
+            .order_by('bucket_start')
+        )
+
+        buckets = {}
+        for row in rows:
+            point = buckets.setdefault(row['bucket_start'], {
+                'bucket_start': row['bucket_start'],
+                'total': 0,
+                'sent': 0,
+                'failed': 0,
+                'queued': 0,
+                'processing': 0,
+            })
+            point['total'] += row['total']
+            if row['status'] in point:
+                point[row['status']] += row['total']
+
+        return Response({
+            'since': params['since'],
+            'until': params['until'],
+            'bucket': params['bucket'],
+            'email_type': params.get('email_type'),
+            'results': EmailTimeSeriesPointSerializer(buckets.values(), many=True).data,
+        }, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "ArchivedEmailLog")
+    @action(detail=False, methods=['get'], url_path='archived')
+    def archived_logs(self, request):
+        """Look up logs moved to cold storage by `id` or by recipient `email`."""
+        email_log_id = request.query_params.get('id')
+        email = request.query_params.get('email')
+
+        if email_log_id:
+            try:
+                archived = email_log_archive.get(int(email_log_id))
+            except ValueError:
+                return Response({'error': 'Invalid id'}, status=status.HTTP_400_BAD_REQUEST)
+            if archived is None:
+                return Response({'error': 'Archived email log not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(archived, status=status.HTTP_200_OK)
+
+        if email:
+            limit = request.query_params.get('limit', '50')
+            limit = min(int(limit), 500) if limit.isdigit() else 50
+            return Response({'results': email_log_archive.find_by_email(email, limit=limit)}, status=status.HTTP_200_OK)
+
+        return Response({
+            'error': 'Validation failed',
+            'details': "Provide 'id' or 'email'"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    @swagger_helper("Email Admin", "EmailStatusLookup")
+    @action(detail=False, methods=['post'], url_path='logs/status')
+    def status_lookup(self, request):
+        """
+        Status and sent_at of many logs at once, keyed by id; unknown or archived ids map to null.
+
+        The rows are read with one primary-key IN query. The response carries an
+        ETag of the map, and a request whose If-None-Match still matches gets an
+        empty 304 instead.
+        """
+        serializer = EmailStatusLookupSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = serializer.validated_data['ids']
+        statuses = dict.fromkeys(map(str, ids))
+        for email_log_id, email_status, sent_at in EmailLog.objects.filter(id__in=ids).values_list(
+                'id', 'status', 'sent_at'):
+            statuses[str(email_log_id)] = {
+                'status': email_status,
+                'sent_at': sent_at.isoformat() if sent_at else None,
+            }
+
+        etag = quote_etag(hashlib.sha256(
+            json.dumps(statuses, separators=(',', ':')).encode()
+        ).hexdigest()[:32])
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({'statuses': statuses}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
+    @swagger_helper("Email Admin", "LaneLatency")
+    @action(detail=False, methods=['get'], url_path='metrics/lanes')
+    def lane_metrics(self, request):
+        """Enqueue-to-send latency percentiles (seconds) per Celery lane."""
+        summary = metrics.summary(LANE_LATENCY, labels=list(LANE_QUEUES))
+        return Response({
+            'lanes': {
+                lane: dict(summary[lane], queue=queue)
+                for lane, queue in LANE_QUEUES.items()
+            }
+        }, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "StageLatency")
+    @action(detail=False, methods=['get'], url_path='metrics/stages')
+    def stage_metrics(self, request):
+        """Per-stage latency percentiles (seconds) of single emails, by email_type; ?email_type= narrows it."""
+        email_types = request.query_params.getlist('email_type') or None
+        return Response({'stages': stage_summary(email_types)}, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "ServiceUsage")
+    @action(detail=False, methods=['get'], url_path='usage')
+    def service_usage(self, request):
+        """Emails accepted and rate-limited per calling service and day; defaults to today, ?service= narrows it."""
+        query = EmailUsageQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': query.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        params = query.validated_data
+        usage_recorder.flush()
+        rows = EmailServiceUsage.objects.filter(day__gte=params['since'], day__lte=params['until'])
+        if params.get('service'):
+            rows = rows.filter(service=params['service'])
+        return Response({
+            'since': params['since'],
+            'until': params['until'],
+            'usage': list(rows.values('service', 'day', 'accepted', 'rejected')),
+        }, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "Suppressions")
+    @action(detail=False, methods=['get'], url_path='suppressions')
+    def suppressions(self, request):
+        """Suppressed addresses, newest first; ?email=, ?scope= and ?reason= narrow it, ?limit= caps it (max 500)."""
+        rows = EmailSuppression.objects.order_by('-updated_at')
+        for field in ('scope', 'reason'):
+            if request.query_params.get(field):
+                rows = rows.filter(**{field: request.query_params[field]})
+        if request.query_params.get('email'):
+            rows = rows.filter(email=normalize_email(request.query_params['email']))
+        limit = request.query_params.get('limit', '50')
+        limit = min(int(limit), 500) if limit.isdigit() else 50
+        return Response({
+            'results': EmailSuppressionSerializer(rows[:limit], many=True).data,
+            'filter': suppression_list.stats(),
+        }, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "Suppressions")
+    @action(detail=False, methods=['post'], url_path='suppressions')
+    def add_suppressions(self, request):
+        serializer = SuppressionChangeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        count = suppress(data['emails'], scope=data.get('scope') or EmailSuppression.SCOPE_ALL,
+                         reason=data['reason'], source=f"admin:{getattr(request.user, 'id', '')}")
+        return Response({'suppressed': count}, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "Suppressions")
+    @action(detail=False, methods=['delete'], url_path='suppressions')
+    def remove_suppressions(self, request):
+        """Release addresses, from one scope if given, else from every scope."""
+        serializer = SuppressionChangeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        return Response({'removed': unsuppress(data['emails'], scope=data.get('scope'))}, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "DeadLetters")
+    @action(detail=False, methods=['get'], url_path='dead-letters')
+    def dead_letters(self, request):
+        """Pending dead letters (emails whose retries ran out) per email_type and error class."""
+        return Response({'pending': dead_letter_summary()}, status=status.HTTP_200_OK)
+
+    @swagger_helper("Email Admin", "DeadLetterReplay")
+    @action(detail=False, methods=['post'], url_path='dead-letters/replay')
+    def replay_dead_letters(self, request):
+        """Re-enqueue pending dead letters matching the filters, spread out at the configured replay rate."""
+        serializer = DeadLetterReplaySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Validation failed',
+                'details': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        counts = replay_dead_letters(**serializer.validated_data)
+        return Response(dict(counts, dry_run=serializer.validated_data['dry_run']), status=status.HTTP_200_OK)
+
     @swagger_helper("Email Admin", "EmailRetry")
     @action(detail=True, methods=['post'], url_path='retry')
     def retry_email(self, request, pk=None):
@@ -227,11 +668,14 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
         }
 
         try:
-            if is_celery_healthy():
-                # Queue retry via Celery
-                send_generic_email_task.apply_async(kwargs=payload)
-                email_log.status = 'queued'
-                email_log.save(update_fields=['status'])
+            # A manual retry supersedes any pending dead letter for this log
+            EmailDeadLetter.objects.filter(email_log_id=email_log.id, replayed_at__isnull=True).update(
+                replayed_at=timezone.now(), replay_count=F('replay_count') + 1
+            )
+            # Queued before publishing so a fast worker's final status is never overwritten
+            update_email_status(email_log.id, 'queued')
+            if publish_task(send_generic_email_task, kwargs=payload):
+                # Retry queued via Celery
                 return Response({
                     'status': 'queued',
                     'email_log_id': email_log.id,
@@ -240,11 +684,9 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
                     'processing_method': 'celery'
                 }, status=status.HTTP_200_OK)
             else:
-                # Fallback: direct send
+                # Fallback: direct send; send_direct_email records 'sent' or 'failed' on the log itself
                 result = send_direct_email(**payload)
                 if result.get('status') == 'success':
-                    email_log.status = 'success'
-                    email_log.save(update_fields=['status'])
                     return Response({
                         'status': 'sent',
                         'email_log_id': email_log.id,
@@ -253,8 +695,6 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
                         'processing_method': result.get('processing_method', 'direct')
                     }, status=status.HTTP_200_OK)
                 else:
-                    email_log.status = 'failed'
-                    email_log.save(update_fields=['status'])
                     return Response({
                         'status': 'failed',
                         'email_log_id': email_log.id,
@@ -262,8 +702,7 @@ class EmailAdminViewSet(viewsets.ModelViewSet):
                         'error': result.get('error', 'Retry failed')
                     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
-            email_log.status = 'failed'
-            email_log.save(update_fields=['status'])
+            update_email_status(email_log.id, 'failed', error=str(e))
             return Response({
                 'status': 'failed',
                 'email_log_id': email_log.id,
@@ -1,6 +1,13 @@
+import logging
+
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import verified_token_cache
+
+logger = logging.getLogger(__name__)
 
 
 class CustomTokenUser(TokenUser):
@@ -9,9 +16,18 @@ class CustomTokenUser(TokenUser):
 
 
 class CustomJWTAuthentication(JWTAuthentication):
+    def get_validated_token(self, raw_token):
+        # Skip signature and claim verification for a token already verified with this signing key
+        validated_token = verified_token_cache.get('access', api_settings.SIGNING_KEY, raw_token)
+        if validated_token is None:
+            validated_token = super().get_validated_token(raw_token)
+            verified_token_cache.set('access', api_settings.SIGNING_KEY, raw_token,
+                                     validated_token, validated_token.get('exp'))
+        return validated_token
+
     def get_user(self, validated_token):
         try:
-            print("Using CustomJWTAuthentication with CustomTokenUser")  # Debug
             return CustomTokenUser(validated_token)
         except KeyError as e:
+            logger.info("Token missing required claim: %s", e)
             raise InvalidToken(f"Token missing required claim: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+import time
+
+from cachetools import TLRUCache
+from django.conf import settings
+
+DEFAULT_TOKEN_CACHE_SETTINGS = {
+    'MAX_SIZE': 10000,
+    'MAX_TTL': 3600,
+}
+
+
+def get_token_cache_settings():
+    token_cache_settings = dict(DEFAULT_TOKEN_CACHE_SETTINGS)
+    token_cache_settings.update(getattr(settings, 'JWT_VERIFIED_TOKEN_CACHE', {}))
+    return token_cache_settings
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified JWT claims, shared by every authentication path.
+
+    Entries are keyed by a SHA-256 of (kind, signing secret, raw token), so a
+    token is only trusted for the secret that verified it and rotating a secret
+    orphans every entry made with the old one. An entry lives until the token's
+    `exp` (capped at MAX_TTL seconds); tokens without `exp` are never cached.
+    """
+
+    def __init__(self, maxsize=None, max_ttl=None, timer=time.time):
+        token_cache_settings = get_token_cache_settings()
+        self.max_ttl = max_ttl if max_ttl is not None else token_cache_settings['MAX_TTL']
+        self._timer = timer
+        self._cache = TLRUCache(
+            maxsize=maxsize or token_cache_settings['MAX_SIZE'],
+            ttu=lambda key, value, now: value[0],
+            timer=timer,
+        )
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0}
+
+    def _key(self, kind, secret, token):
+        if isinstance(token, str):
+            token = token.encode()
+        return hashlib.sha256(f'{kind}\0{secret}\0'.encode() + token).digest()
+
+    def get(self, kind, secret, token):
+        """The cached claims for a token verified with `secret`, or None."""
+        with self._lock:
+            entry = self._cache.get(self._key(kind, secret, token))
+            self._metrics['hits' if entry is not None else 'misses'] += 1
+        return entry[1] if entry is not None else None
+
+    def set(self, kind, secret, token, claims, exp):
+        if not exp:
+            return
+        now = self._timer()
+        expires_at = min(float(exp), now + self.max_ttl)
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._cache[self._key(kind, secret, token)] = (expires_at, claims)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, size=len(self._cache), max_size=self._cache.maxsize)
+
+
+verified_token_cache = VerifiedTokenCache()
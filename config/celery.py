@@ -0,0 +1,16 @@
+import os
+from celery import Celery
+from dotenv import load_dotenv
+load_dotenv()
+
+django_env = os.getenv("DJANGO_ENV", "development").lower()
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", f"config.settings.{django_env}")
+
+# Queues, routing and prefetch come from the CELERY_* settings in config/settings/base.py.
+# Run the OTP/password-reset lane on its own worker so bulk traffic never sits in front of it:
+#   celery -A config worker -Q email_priority -c 4 --prefetch-multiplier=1
+#   celery -A config worker -Q email_default,email_bulk
+app = Celery("config")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
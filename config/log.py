@@ -0,0 +1,141 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+
+from django.utils.module_loading import import_string
+
+# LogRecord attributes that are not structured `extra` fields
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to a background thread that runs the real (blocking) handlers.
+
+    `emit` only puts the record on a bounded queue; when the queue is full the
+    record is dropped and counted rather than stalling the request. Messages are
+    not formatted on the calling thread: `%`-style arguments are merged by the
+    target handlers' formatters on the listener thread.
+
+    Targets are given as handler specs, e.g.
+    {'class': 'logging.StreamHandler', 'level': 'INFO'}, and share this
+    handler's formatter. The listener is restarted in a forked child (Celery
+    prefork workers), where the parent's thread does not exist.
+    """
+
+    def __init__(self, targets=(), queue_size=10000):
+        self.queue_size = queue_size
+        self.targets = [self._build_target(dict(spec)) for spec in targets]
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        super().__init__(queue.Queue(maxsize=queue_size))
+        atexit.register(self.stop)
+
+    @staticmethod
+    def _build_target(spec):
+        handler_class = import_string(spec.pop('class'))
+        level = spec.pop('level', logging.NOTSET)
+        handler = handler_class(**spec)
+        handler.setLevel(level)
+        return handler
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        for target in self.targets:
+            target.setFormatter(fmt)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._listener is not None:
+                # Forked child: the inherited queue and thread belong to the parent
+                self.queue = queue.Queue(maxsize=self.queue_size)
+            self._listener = logging.handlers.QueueListener(self.queue, *self.targets, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Leave msg/args untouched so formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """Drain the queue and stop the listener (called at exit)."""
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._pid = None
+            self._listener = None
+        for target in self.targets:
+            target.flush()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records below `always_level` per logger.
+
+    `rates` maps logger-name prefixes to the fraction kept; the longest
+    matching prefix wins and unmatched loggers use `default_rate`.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0, always_level='WARNING'):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.always_level = logging.getLevelName(always_level) if isinstance(always_level, str) else always_level
+        self._resolved = {}
+
+    def rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = self.default_rate
+            matched = ''
+            for prefix, prefix_rate in self.rates.items():
+                if (name == prefix or name.startswith(prefix + '.')) and len(prefix) > len(matched):
+                    rate, matched = prefix_rate, prefix
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= self.always_level:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra={...}` fields become top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
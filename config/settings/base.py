@@ -2,6 +2,7 @@ from datetime import timedelta
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from kombu import Queue
 
 load_dotenv()
 
@@ -133,6 +134,12 @@ FINANCE_MICROSERVICE_URL = os.getenv("FINANCE_MICROSERVICE_URL")
 SUPPORT_MICROSERVICE_URL = os.getenv("SUPPORT_MICROSERVICE_URL")
 SUPPORT_JWT_SECRET_KEY=os.getenv("SUPPORT_JWT_SECRET_KEY")
 
+# Verified JWT claims are cached per process until the token's exp (capped at MAX_TTL seconds)
+JWT_VERIFIED_TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('JWT_VERIFIED_TOKEN_CACHE_SIZE', 10000)),
+    'MAX_TTL': int(os.getenv('JWT_VERIFIED_TOKEN_CACHE_TTL', 3600)),
+}
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -144,3 +151,151 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'no-reply@yourdomain.com')
 SITE_URL = os.getenv('SITE_URL', 'https://yourdomain.com')
 
 
+
+# Seconds between mtime checks of the compiled email templates (and of the shared EmailTemplate version stamp)
+EMAIL_TEMPLATE_CHECK_INTERVAL = float(os.getenv('EMAIL_TEMPLATE_CHECK_INTERVAL', 2.0))
+# Per-email_type template files, <email_type>.html and optional <email_type>.txt, used when no EmailTemplate row is active
+EMAIL_TEMPLATE_DIR = os.getenv('EMAIL_TEMPLATE_DIR', os.path.join(BASE_DIR, 'apps', 'email_service', 'templates', 'email_types'))
+# Seconds between checks of the shared EmailConfiguration version stamp
+EMAIL_CONFIG_VERSION_CHECK_INTERVAL = float(os.getenv('EMAIL_CONFIG_VERSION_CHECK_INTERVAL', 5.0))
+
+# Per-process pool of reusable SMTP connections (see apps/email_service/smtp_pool.py)
+EMAIL_SMTP_POOL = {
+    'MAX_SIZE': int(os.getenv('EMAIL_SMTP_POOL_MAX_SIZE', 4)),
+    'MAX_MESSAGES_PER_CONNECTION': int(os.getenv('EMAIL_SMTP_POOL_MAX_MESSAGES', 100)),
+    'MAX_IDLE_SECONDS': int(os.getenv('EMAIL_SMTP_POOL_MAX_IDLE', 60)),
+    'HEALTH_CHECK_AFTER_SECONDS': int(os.getenv('EMAIL_SMTP_POOL_HEALTH_CHECK_AFTER', 10)),
+    'CHECKOUT_TIMEOUT': int(os.getenv('EMAIL_SMTP_POOL_CHECKOUT_TIMEOUT', 30)),
+    'TIMEOUT': int(os.getenv('EMAIL_SMTP_TIMEOUT', 10)),
+}
+
+# Bulk send-email endpoint
+EMAIL_BULK_MAX_RECIPIENTS = int(os.getenv('EMAIL_BULK_MAX_RECIPIENTS', 5000))
+EMAIL_BULK_CHUNK_SIZE = int(os.getenv('EMAIL_BULK_CHUNK_SIZE', 100))
+
+# Broker-health circuit breaker used instead of probing the broker on every request
+EMAIL_BROKER_BREAKER = {
+    'FAILURE_THRESHOLD': int(os.getenv('EMAIL_BROKER_FAILURE_THRESHOLD', 1)),
+    'RESET_TIMEOUT': int(os.getenv('EMAIL_BROKER_RESET_TIMEOUT', 30)),
+}
+
+# Seconds a claimed outbox entry stays hidden from other drain_email_outbox workers
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', 60))
+# Furthest ahead send-email accepts a send_at; scheduled sends wait in the outbox for `drain_email_outbox --loop`
+EMAIL_SEND_AT_MAX_AHEAD_DAYS = int(os.getenv('EMAIL_SEND_AT_MAX_AHEAD_DAYS', 90))
+
+# Write-behind buffer for EmailLog status transitions in Celery workers
+# (set EMAIL_STATUS_WRITE_BEHIND=False to write every transition synchronously)
+EMAIL_STATUS_BUFFER = {
+    'WRITE_BEHIND': os.getenv('EMAIL_STATUS_WRITE_BEHIND', 'True') == 'True',
+    'MAX_SIZE': int(os.getenv('EMAIL_STATUS_BUFFER_MAX_SIZE', 200)),
+    'MAX_DELAY': float(os.getenv('EMAIL_STATUS_BUFFER_MAX_DELAY', 1.0)),
+}
+
+# Retry policy per error class: delays (seconds) use decorrelated jitter between BASE_DELAY and MAX_DELAY;
+# permanent errors (bad recipient, template/configuration errors, 5xx replies) are not retried
+EMAIL_RETRY_POLICY = {
+    'BASE_DELAY': {
+        'transient': int(os.getenv('EMAIL_RETRY_BASE_DELAY', 30)),
+        'throttled': int(os.getenv('EMAIL_RETRY_THROTTLED_BASE_DELAY', 300)),
+    },
+    'MAX_DELAY': {
+        'transient': int(os.getenv('EMAIL_RETRY_MAX_DELAY', 1800)),
+        'throttled': int(os.getenv('EMAIL_RETRY_THROTTLED_MAX_DELAY', 3600)),
+    },
+    'MAX_RETRIES': {
+        'permanent': 0,
+        'transient': int(os.getenv('EMAIL_RETRY_MAX_RETRIES', 5)),
+        'throttled': int(os.getenv('EMAIL_RETRY_THROTTLED_MAX_RETRIES', 8)),
+    },
+}
+# Retries delayed longer than this many seconds wait in the outbox instead of a Celery countdown
+EMAIL_RETRY_OUTBOX_DELAY = int(os.getenv('EMAIL_RETRY_OUTBOX_DELAY', 60))
+
+# Replay of dead-lettered emails: later chunks are scheduled in the outbox so replayed mail arrives at REPLAY_RATE/s
+EMAIL_DEAD_LETTER = {
+    'REPLAY_CHUNK_SIZE': int(os.getenv('EMAIL_DEAD_LETTER_REPLAY_CHUNK_SIZE', 100)),
+    'REPLAY_RATE': float(os.getenv('EMAIL_DEAD_LETTER_REPLAY_RATE', 20)),
+    'REPLAY_MAX_PER_REQUEST': int(os.getenv('EMAIL_DEAD_LETTER_REPLAY_MAX_PER_REQUEST', 5000)),
+}
+
+# Token buckets checked by send_email before anything is written: RATE tokens/s refill, BURST bucket size
+EMAIL_RATE_LIMITS = {
+    'ENABLED': os.getenv('EMAIL_RATE_LIMITS_ENABLED', 'True') == 'True',
+    'SERVICE': {
+        'RATE': float(os.getenv('EMAIL_RATE_LIMIT_SERVICE_RATE', 50)),
+        'BURST': int(os.getenv('EMAIL_RATE_LIMIT_SERVICE_BURST', 200)),
+    },
+    'RECIPIENT': {
+        'RATE': float(os.getenv('EMAIL_RATE_LIMIT_RECIPIENT_PER_HOUR', 20)) / 3600,
+        'BURST': int(os.getenv('EMAIL_RATE_LIMIT_RECIPIENT_BURST', 20)),
+    },
+}
+
+# Per-service, per-day accepted/rejected counts are buffered in process and written every FLUSH_INTERVAL seconds
+EMAIL_USAGE = {
+    'FLUSH_INTERVAL': float(os.getenv('EMAIL_USAGE_FLUSH_INTERVAL', 5)),
+}
+
+# Suppressed recipients: each process keeps a Bloom filter of EmailSuppression, synced every REFRESH_INTERVAL seconds
+EMAIL_SUPPRESSION = {
+    'ENABLED': os.getenv('EMAIL_SUPPRESSION_ENABLED', 'True') == 'True',
+    'EXPECTED_ENTRIES': int(os.getenv('EMAIL_SUPPRESSION_EXPECTED_ENTRIES', 100000)),
+    'FALSE_POSITIVE_RATE': float(os.getenv('EMAIL_SUPPRESSION_FALSE_POSITIVE_RATE', 0.001)),
+    'REFRESH_INTERVAL': int(os.getenv('EMAIL_SUPPRESSION_REFRESH_INTERVAL', 30)),
+    'REBUILD_INTERVAL': int(os.getenv('EMAIL_SUPPRESSION_REBUILD_INTERVAL', 3600)),
+    'IMPORT_BATCH_SIZE': int(os.getenv('EMAIL_SUPPRESSION_IMPORT_BATCH_SIZE', 500)),
+}
+
+# Opt-in digests (send-email with digest_key): flushed by `flush_email_digests --loop` or flush_email_digests_task
+EMAIL_DIGEST = {
+    'DEFAULT_WINDOW': int(os.getenv('EMAIL_DIGEST_DEFAULT_WINDOW', 60)),
+    'MAX_WINDOW': int(os.getenv('EMAIL_DIGEST_MAX_WINDOW', 3600)),
+    'BUCKET_SECONDS': int(os.getenv('EMAIL_DIGEST_BUCKET_SECONDS', 10)),
+    'MAX_ITEMS': int(os.getenv('EMAIL_DIGEST_MAX_ITEMS', 50)),
+    'FLUSH_BATCH_SIZE': int(os.getenv('EMAIL_DIGEST_FLUSH_BATCH_SIZE', 100)),
+}
+
+# Largest number of points the stats time-series endpoint returns for one query
+EMAIL_STATS_MAX_BUCKETS = int(os.getenv('EMAIL_STATS_MAX_BUCKETS', 2000))
+# Largest number of ids one POST logs/status/ lookup accepts
+EMAIL_STATUS_LOOKUP_MAX_IDS = int(os.getenv('EMAIL_STATUS_LOOKUP_MAX_IDS', 5000))
+
+# Retention of EmailLog rows: archive_email_logs moves older rows to gzip NDJSON day files
+EMAIL_ARCHIVE = {
+    'DIRECTORY': os.getenv('EMAIL_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'email_logs')),
+    'RETENTION_DAYS': int(os.getenv('EMAIL_RETENTION_DAYS', 90)),
+    'CHUNK_SIZE': int(os.getenv('EMAIL_ARCHIVE_CHUNK_SIZE', 1000)),
+}
+
+# Idempotency-Key support on send-email: keys live TTL_SECONDS, with a bounded in-process tier
+EMAIL_IDEMPOTENCY = {
+    'TTL_SECONDS': int(os.getenv('EMAIL_IDEMPOTENCY_TTL', 24 * 60 * 60)),
+    'MEMORY_SIZE': int(os.getenv('EMAIL_IDEMPOTENCY_MEMORY_SIZE', 10000)),
+    'MEMORY_TTL_SECONDS': int(os.getenv('EMAIL_IDEMPOTENCY_MEMORY_TTL', 300)),
+}
+
+# Celery: one reserved lane for time-critical mail, one for regular mail, one for bulk chunks
+# Defaults to Celery's own default broker (local RabbitMQ over amqp, which is in requirements.txt)
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'amqp://guest@localhost//')
+CELERY_TASK_DEFAULT_QUEUE = 'email_default'
+CELERY_TASK_QUEUES = (
+    Queue('email_priority', routing_key='email_priority'),
+    Queue('email_default', routing_key='email_default'),
+    Queue('email_bulk', routing_key='email_bulk'),
+)
+CELERY_TASK_ROUTES = ('apps.email_service.routing.route_email_task',)
+# Workers reserve one message at a time so a long bulk chunk never holds an OTP behind it
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', 1))
+CELERY_TASK_ACKS_LATE = os.getenv('CELERY_TASK_ACKS_LATE', 'False') == 'True'
+
+# email_type/action values routed to the email_priority queue
+EMAIL_PRIORITY_LANE = {
+    'EMAIL_TYPES': os.getenv('EMAIL_PRIORITY_TYPES', 'otp,password_reset,verification,2fa').split(','),
+    'ACTIONS': os.getenv('EMAIL_PRIORITY_ACTIONS', 'login,reset_password,verify_email').split(','),
+}
+
+# Latency histograms are accumulated per process and added to EmailLatencyBucket every FLUSH_INTERVAL seconds
+EMAIL_METRICS = {
+    'FLUSH_INTERVAL': float(os.getenv('EMAIL_METRICS_FLUSH_INTERVAL', 5.0)),
+}
@@ -36,49 +36,77 @@ LOG_DIR = os.path.join(BASE_DIR, "logs")
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
+# Application loggers write through queue handlers so request threads never block on file I/O;
+# DEBUG/INFO from the auth path is sampled, WARNING and above is always kept.
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {message}",
-            "style": "{",
+        "json": {
+            "()": "config.log.JsonFormatter",
         },
         "simple": {
-            "format": "{levelname} {message}",
+            "format": "{levelname} {name} {message}",
             "style": "{",
         },
     },
-    "handlers": {
-        "debug_file": {
-            "level": "DEBUG",
-            "class": "logging.handlers.TimedRotatingFileHandler",
-            "filename": os.path.join(LOG_DIR, "debug.log"),
-            "when": "midnight",
-            "interval": 1,
-            "backupCount": 7,
-            "formatter": "verbose",
+    "filters": {
+        "sample": {
+            "()": "config.log.SamplingFilter",
+            "rates": {
+                "apps.email_service.permissions": 0.1,
+                "config.authentication": 0.1,
+            },
         },
-        "error_file": {
-            "level": "ERROR",
-            "class": "logging.handlers.TimedRotatingFileHandler",
-            "filename": os.path.join(LOG_DIR, "errors.log"),
-            "when": "midnight",
-            "interval": 1,
-            "backupCount": 7,
-            "formatter": "verbose",
+    },
+    "handlers": {
+        "files": {
+            "class": "config.log.NonBlockingQueueHandler",
+            "targets": [
+                {
+                    "class": "logging.handlers.TimedRotatingFileHandler",
+                    "filename": os.path.join(LOG_DIR, "debug.log"),
+                    "when": "midnight",
+                    "interval": 1,
+                    "backupCount": 7,
+                },
+                {
+                    "class": "logging.handlers.TimedRotatingFileHandler",
+                    "level": "ERROR",
+                    "filename": os.path.join(LOG_DIR, "errors.log"),
+                    "when": "midnight",
+                    "interval": 1,
+                    "backupCount": 7,
+                },
+            ],
+            "filters": ["sample"],
+            "formatter": "json",
         },
         "console": {
-            "level": "DEBUG",
-            "class": "logging.StreamHandler",
+            "class": "config.log.NonBlockingQueueHandler",
+            "targets": [{"class": "logging.StreamHandler"}],
+            "filters": ["sample"],
             "formatter": "simple",
         },
     },
     "loggers": {
         "django": {
-            "handlers": ["debug_file", "error_file", "console"],
-            "level": "DEBUG",
-            "propagate": True,
+            "handlers": ["files", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "django.db.backends": {
+            "level": "WARNING",
+        },
+        "apps": {
+            "handlers": ["files", "console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "config": {
+            "handlers": ["files", "console"],
+            "level": "INFO",
+            "propagate": False,
         },
     },
 }